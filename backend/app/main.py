@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import (
@@ -5,9 +6,20 @@ from app.routers import (
     nlp_analysis,
     hypothesis_test,
     stocks_technical_analysis,
+    stocks_chart_bundle,
     stocks_data,
-    stocks_available
+    stocks_available,
+    cache_stats,
+    jobs,
+    metrics
 )
+from app.utils import concurrency
+from app.utils.metrics import MetricsMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    concurrency.shutdown()
 
 app = FastAPI(
     title="Financial Data Analysis API",
@@ -16,6 +28,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -25,6 +38,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 api_router = APIRouter(prefix="/api")
 
@@ -44,6 +58,10 @@ api_router.include_router(
     stocks_technical_analysis.router,
     tags=["Stocks Technical Analysis"]
 )
+api_router.include_router(
+    stocks_chart_bundle.router,
+    tags=["Stocks Technical Analysis"]
+)
 api_router.include_router(
     stocks_data.router,
     tags=["Stocks Data"]
@@ -53,4 +71,16 @@ api_router.include_router(
     tags=["Available Stocks"]
 )
 
+api_router.include_router(
+    cache_stats.router,
+    tags=["Cache"]
+)
+
+api_router.include_router(
+    jobs.router,
+    tags=["Jobs"]
+)
+
 app.include_router(api_router)
+# Served outside /api where Prometheus scrapes by default
+app.include_router(metrics.router, tags=["Metrics"])
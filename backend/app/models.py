@@ -1,16 +1,47 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class StockRequest(BaseModel):
     symbol: str
     period: str = "1y"
     interval: str = "1d"
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    since: Optional[datetime] = None
+    version: Optional[str] = None
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
+    format: Optional[str] = None
 
 class TechnicalAnalysisRequest(BaseModel):
+    symbol: Optional[str] = None
+    symbols: Optional[List[str]] = None
+    period: str = "1y"
+    interval: str = "1d"
+    indicators: List[str] = ["sma", "ema", "rsi", "macd"]
+    windows: Optional[Dict[str, List[float]]] = None
+
+# Query parameters of GET /stocks/technical-analysis; custom windows need the POST body
+class TechnicalAnalysisQuery(BaseModel):
+    symbol: Optional[str] = None
+    symbols: Optional[List[str]] = None
+    period: str = "1y"
+    interval: str = "1d"
+    indicators: List[str] = ["sma", "ema", "rsi", "macd"]
+
+class ChartBundleRequest(BaseModel):
     symbol: str
     period: str = "1y"
     interval: str = "1d"
     indicators: List[str] = ["sma", "ema", "rsi", "macd"]
+    windows: Optional[Dict[str, List[float]]] = None
+    include_info: bool = False
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
+    format: Optional[str] = None
 
 class NLPAnalysisRequest(BaseModel):
     query: str
@@ -22,6 +53,12 @@ class HypothesisTestRequest(BaseModel):
     test_type: str
     period: str = "1y"
     alpha: float = 0.05
+    all_pairs: bool = False
+    join: str = "inner"
+    method: str = "parametric"
+    n_resamples: int = 10000
+    seed: Optional[int] = None
+    block_length: Optional[int] = None
 
 class VisualizationRequest(BaseModel):
     symbols: List[str]
@@ -29,3 +66,10 @@ class VisualizationRequest(BaseModel):
     period: str = "1y"
     interval: str = "1d"
     indicators: Optional[List[str]] = None
+    matrix_layout: str = "flat"
+    order: str = "input"
+    benchmark: str = "SPY"
+    rolling_windows: Optional[List[int]] = None
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
+    format: Optional[str] = None
@@ -0,0 +1,52 @@
+import os
+import threading
+from app.providers.base import MarketDataProvider, ProviderError
+from app.providers.yahoo import YahooProvider
+from app.providers.synthetic import SyntheticProvider, SYNTHETIC_MODELS
+from app.providers.replay import FileReplayProvider, record_history
+
+__all__ = [
+    "MarketDataProvider", "ProviderError", "YahooProvider", "SyntheticProvider", "SYNTHETIC_MODELS",
+    "FileReplayProvider", "record_history", "MARKET_DATA_PROVIDERS", "set_provider", "get_provider",
+]
+
+MARKET_DATA_PROVIDERS = ["yahoo", "synthetic", "replay"]
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yahoo")
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+SYNTHETIC_MODEL = os.getenv("SYNTHETIC_MODEL", "gbm")
+SYNTHETIC_LATENCY_SECONDS = float(os.getenv("SYNTHETIC_LATENCY_SECONDS", "0"))
+SYNTHETIC_ERROR_RATE = float(os.getenv("SYNTHETIC_ERROR_RATE", "0"))
+REPLAY_DIR = os.getenv("REPLAY_DIR", "data/replay")
+REPLAY_TIMEZONE = os.getenv("REPLAY_TIMEZONE", "America/New_York")
+
+_provider = None
+_lock = threading.Lock()
+
+def set_provider(provider):
+    """Use the given provider (e.g. SyntheticProvider()) for every download, or None to create one from the settings"""
+    global _provider
+    with _lock:
+        _provider = provider
+
+def get_provider():
+    """Get the market data provider shared by every request, creating it on first use"""
+    global _provider
+    with _lock:
+        if _provider is None:
+            if MARKET_DATA_PROVIDER not in MARKET_DATA_PROVIDERS:
+                raise ValueError(
+                    f"Unknown market data provider: {MARKET_DATA_PROVIDER}. "
+                    f"Supported providers: {', '.join(MARKET_DATA_PROVIDERS)}"
+                )
+            if MARKET_DATA_PROVIDER == "synthetic":
+                _provider = SyntheticProvider(
+                    seed=SYNTHETIC_SEED,
+                    model=SYNTHETIC_MODEL,
+                    latency=SYNTHETIC_LATENCY_SECONDS,
+                    error_rate=SYNTHETIC_ERROR_RATE
+                )
+            elif MARKET_DATA_PROVIDER == "replay":
+                _provider = FileReplayProvider(REPLAY_DIR, REPLAY_TIMEZONE)
+            else:
+                _provider = YahooProvider()
+        return _provider
@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+
+class ProviderError(Exception):
+    """A failed call to a market data provider"""
+
+class MarketDataProvider(ABC):
+    """Source of OHLCV bars and company information.
+
+    history returns a DataFrame shaped like yfinance history: a tz-aware DatetimeIndex and
+    Open, High, Low, Close, Volume, Dividends and Stock Splits columns, empty when the
+    provider has no bars. A period (a yfinance period string) or a start with an optional
+    end selects the bars.
+    """
+
+    name = "base"
+    # Whether history_many answers several symbols with fewer calls than one per symbol
+    supports_batch = False
+
+    @abstractmethod
+    def history(self, symbol, interval="1d", period=None, start=None, end=None):
+        """Get the bars of a symbol as a DataFrame"""
+
+    @abstractmethod
+    def info(self, symbol):
+        """Get the company information of a symbol as a yfinance-style info dict"""
+
+    def history_many(self, symbols, interval="1d", period=None, start=None, end=None):
+        """Get the history of several symbols as a dict of DataFrames"""
+        return {
+            symbol: self.history(symbol, interval, period=period, start=start, end=end)
+            for symbol in symbols
+        }
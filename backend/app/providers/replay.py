@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import threading
+import pandas as pd
+from app.providers.base import MarketDataProvider
+from app.utils.intervals import interval_seconds, period_start, to_utc
+
+REPLAY_FORMATS = [".parquet", ".csv"]
+
+class FileReplayProvider(MarketDataProvider):
+    """Replays bars recorded to files, e.g. with record_history.
+
+    Bars of a symbol and interval are read from <directory>/<SYMBOL>_<interval>.parquet or .csv,
+    and info from <directory>/<SYMBOL>_info.json. Periods count back from the last recorded bar,
+    so a recording keeps answering the same way as it ages.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory, timezone="America/New_York", latency=0.0):
+        self.directory = directory
+        self.timezone = timezone
+        self.latency = latency
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, suffix):
+        return os.path.join(self.directory, f"{symbol.upper()}_{suffix}")
+
+    def _load(self, symbol, interval):
+        """Read the recorded bars of a symbol once, or None when there is no recording"""
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        df = None
+        for extension in REPLAY_FORMATS:
+            path = self._path(symbol, interval + extension)
+            if not os.path.exists(path):
+                continue
+            if extension == ".parquet":
+                df = pd.read_parquet(path)
+            else:
+                df = pd.read_csv(path, index_col=0)
+                df.index = pd.to_datetime(df.index, utc=True)
+            index = pd.DatetimeIndex(df.index)
+            df.index = (index.tz_localize("UTC") if index.tz is None else index).tz_convert(self.timezone)
+            df.index.name = "Date"
+            df = df.sort_index()
+            break
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def history(self, symbol, interval="1d", period=None, start=None, end=None):
+        interval_seconds(interval)
+        if self.latency:
+            time.sleep(self.latency)
+        df = self._load(symbol, interval)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        if start is None:
+            start = period_start(period or "1y", df.index[-1])
+        else:
+            start = to_utc(start)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df.index >= start
+        if end is not None:
+            mask &= df.index < to_utc(end)
+        return df[mask.to_numpy()].copy()
+
+    def info(self, symbol):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self._path(symbol, "info.json")
+        if not os.path.exists(path):
+            return {"shortName": symbol.upper()}
+        with open(path) as f:
+            return json.load(f)
+
+def record_history(source, directory, symbols, interval="1d", period="max"):
+    """Record the bars and info of symbols from a provider for a FileReplayProvider"""
+    os.makedirs(directory, exist_ok=True)
+    replay = FileReplayProvider(directory)
+    for symbol in symbols:
+        df = source.history(symbol, interval, period=period)
+        df.index.name = "Date"
+        df.to_parquet(replay._path(symbol, f"{interval}.parquet"))
+        with open(replay._path(symbol, "info.json"), "w") as f:
+            json.dump(source.info(symbol), f, default=str)
@@ -0,0 +1,211 @@
+import time
+import zlib
+import random
+import threading
+import numpy as np
+import pandas as pd
+from app.providers.base import MarketDataProvider, ProviderError
+from app.utils.intervals import interval_seconds, period_start, to_utc
+
+SYNTHETIC_MODELS = ["gbm", "regime"]
+TIMEZONE = "America/New_York"
+# First trading day of every synthetic path, so any range of a symbol has the same bars
+ANCHOR = pd.Timestamp("2000-01-03")
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_MINUTES = 390
+# Daily drift, daily volatility and daily chance of leaving each regime: calm, then turbulent
+REGIMES = np.array([
+    [0.0006, 0.01, 0.02],
+    [-0.001, 0.03, 0.08],
+])
+# Bars longer than a day are aggregated from daily bars by calendar period
+PERIOD_GROUPS = {"1wk": "W", "1mo": "M", "3mo": "Q"}
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Consumer Cyclical", "Industrials"]
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+def _empty():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], tz=TIMEZONE, name="Date"))
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic offline bars for benchmarks, load tests and development.
+
+    Every bar depends only on the seed, the symbol and its timestamp. 'gbm' draws daily log returns
+    with a per-symbol drift and volatility, 'regime' switches between a calm and a turbulent regime
+    with a Markov chain. Intraday bars follow a Brownian bridge from each day's open to its close
+    during regular trading hours. latency and error_rate simulate a slow and flaky upstream.
+    """
+
+    name = "synthetic"
+    # A batch costs one simulated round trip, like a feed that serves many symbols per call
+    supports_batch = True
+
+    def __init__(self, seed=0, model="gbm", latency=0.0, error_rate=0.0):
+        if model not in SYNTHETIC_MODELS:
+            raise ValueError(f"Unknown synthetic model: {model}. Supported models: {', '.join(SYNTHETIC_MODELS)}")
+        self.seed = seed
+        self.model = model
+        self.latency = latency
+        self.error_rate = error_rate
+        self._errors = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_call(self):
+        """Wait like a remote call and fail as often as error_rate asks"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._errors.random() < self.error_rate
+        if failed:
+            raise ProviderError("Injected synthetic provider error")
+
+    def _rng(self, symbol, *keys):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.upper().encode()), *keys])
+
+    def _daily(self, symbol, last_day):
+        """Build the daily bars of a symbol from ANCHOR up to last_day, indexed by naive dates"""
+        # numpy builds business days far faster than pd.bdate_range
+        dates = np.arange(ANCHOR.to_datetime64(), (last_day + pd.Timedelta(days=1)).to_datetime64(), dtype="datetime64[D]")
+        days = pd.DatetimeIndex(dates[np.is_busday(dates)], name="Date").as_unit("ns")
+        n = len(days)
+        drift, volatility, price, volume = self._rng(symbol, 0).uniform(
+            [0.0001, 0.01, 20, 1e6],
+            [0.0005, 0.03, 300, 5e7]
+        )
+        # Each series has its own generator, so the first bars never depend on how many follow
+        shocks = self._rng(symbol, 1).standard_normal(n)
+        if self.model == "regime":
+            switches = self._rng(symbol, 2).random(n)
+            regime = np.empty(n, dtype=int)
+            state = 0
+            for i in range(n):
+                if switches[i] < REGIMES[state, 2]:
+                    state = 1 - state
+                regime[i] = state
+            mu = REGIMES[regime, 0]
+            sigma = REGIMES[regime, 1] * volatility / 0.02
+        else:
+            mu = np.full(n, drift)
+            sigma = np.full(n, volatility)
+        close = price * np.exp(np.cumsum(mu - sigma ** 2 / 2 + sigma * shocks))
+        noise = self._rng(symbol, 3).standard_normal((n, 3))
+        open_ = np.concatenate([[price], close[:-1]]) * np.exp(noise[:, 0] * sigma * 0.3)
+        return pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * np.exp(np.abs(noise[:, 1]) * sigma * 0.5),
+            "Low": np.minimum(open_, close) * np.exp(-np.abs(noise[:, 2]) * sigma * 0.5),
+            "Close": close,
+            "Volume": (volume * np.exp(self._rng(symbol, 4).normal(0, 0.4, n))).astype(np.int64),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=days)
+
+    def _intraday(self, symbol, daily, minutes):
+        """Split daily bars into bars of the given minutes over the regular session"""
+        if daily.empty:
+            return _empty().tz_localize(None)
+        count = -(-SESSION_MINUTES // minutes)
+        steps = np.arange(1, count + 1) / count
+        # Most volume trades near the open and the close
+        profile = 1 + 2 * np.linspace(-1, 1, count) ** 2
+        profile /= profile.sum()
+        offsets = SESSION_OPEN + pd.to_timedelta(np.arange(count) * minutes, unit="min")
+        # Each day draws from its own generator, so its bars never depend on the range asked for
+        draws = np.stack([
+            self._rng(symbol, 5, ordinal, minutes).standard_normal((3, count))
+            for ordinal in (daily.index - ANCHOR).days
+        ])
+        first = np.log(daily["Open"].to_numpy())[:, None]
+        last = np.log(daily["Close"].to_numpy())[:, None]
+        scale = np.log(daily["High"].to_numpy() / daily["Low"].to_numpy())[:, None] / np.sqrt(count)
+        walk = np.cumsum(draws[:, 0] * scale * 0.5, axis=1)
+        # A Brownian bridge ends every day exactly at its daily close
+        close = np.exp(first + steps * (last - first) + walk - steps * walk[:, -1:])
+        open_ = np.concatenate([np.exp(first), close[:, :-1]], axis=1)
+        volume = daily["Volume"].to_numpy()[:, None] * profile
+        return pd.DataFrame({
+            "Open": open_.ravel(),
+            "High": (np.maximum(open_, close) * np.exp(np.abs(draws[:, 1]) * scale * 0.25)).ravel(),
+            "Low": (np.minimum(open_, close) * np.exp(-np.abs(draws[:, 2]) * scale * 0.25)).ravel(),
+            "Close": close.ravel(),
+            "Volume": volume.astype(np.int64).ravel(),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=(daily.index.to_numpy()[:, None] + offsets.to_numpy()).ravel())
+
+    @staticmethod
+    def _group(daily, interval):
+        """Aggregate daily bars into bars of 5 trading days or of calendar weeks, months or quarters"""
+        if interval == "5d":
+            keys = np.arange(len(daily)) // 5
+        else:
+            keys = daily.index.to_period(PERIOD_GROUPS[interval]).start_time
+        grouped = daily.groupby(keys)
+        bars = grouped.agg({
+            "Open": "first",
+            "High": "max",
+            "Low": "min",
+            "Close": "last",
+            "Volume": "sum",
+            "Dividends": "sum",
+            "Stock Splits": "max",
+        })
+        # Every bar is labelled with its first trading day
+        bars.index = pd.DatetimeIndex(pd.Series(daily.index).groupby(np.asarray(keys)).first(), name="Date")
+        return bars
+
+    def _history(self, symbol, interval, period, start, end):
+        seconds = interval_seconds(interval)
+        now = pd.Timestamp.now(tz="UTC")
+        end = now if end is None else min(to_utc(end), now)
+        start = period_start(period or "1y", now) if start is None else to_utc(start)
+        anchor = ANCHOR.tz_localize(TIMEZONE)
+        start = anchor if start is None else max(start, anchor)
+        if start >= end:
+            return _empty()
+        local_end = end.tz_convert(TIMEZONE).tz_localize(None)
+        daily = self._daily(symbol, local_end.normalize())
+        # A day has a bar once its session has opened
+        daily = daily[daily.index + SESSION_OPEN <= local_end]
+        if seconds < 86400:
+            first_day = start.tz_convert(TIMEZONE).tz_localize(None).normalize()
+            bars = self._intraday(symbol, daily[daily.index >= first_day], seconds // 60)
+            bars = bars[bars.index <= local_end]
+        elif interval == "1d":
+            bars = daily
+        else:
+            bars = self._group(daily, interval)
+        bars.index = bars.index.tz_localize(TIMEZONE)
+        bars.index.name = "Date"
+        return bars[(bars.index >= start) & (bars.index < end)].copy()
+
+    def history(self, symbol, interval="1d", period=None, start=None, end=None):
+        self._simulate_call()
+        return self._history(symbol, interval, period, start, end)
+
+    def history_many(self, symbols, interval="1d", period=None, start=None, end=None):
+        self._simulate_call()
+        return {symbol: self._history(symbol, interval, period, start, end) for symbol in symbols}
+
+    def info(self, symbol):
+        self._simulate_call()
+        today = pd.Timestamp.now(tz=TIMEZONE).tz_localize(None).normalize()
+        year = self._daily(symbol, today).iloc[-252:]
+        price, previous = float(year["Close"].iloc[-1]), float(year["Close"].iloc[-2])
+        shares, trailing_pe, forward_pe = self._rng(symbol, 6).uniform([1e8, 8, 8], [5e9, 40, 35])
+        return {
+            "shortName": f"{symbol.upper()} Corp",
+            "longName": f"{symbol.upper()} Synthetic Corporation",
+            "sector": SECTORS[zlib.crc32(symbol.upper().encode()) % len(SECTORS)],
+            "industry": "Synthetic",
+            "website": "",
+            "marketCap": int(price * shares),
+            "trailingPE": round(float(trailing_pe), 2),
+            "forwardPE": round(float(forward_pe), 2),
+            "dividendYield": None,
+            "fiftyTwoWeekHigh": float(year["High"].max()),
+            "fiftyTwoWeekLow": float(year["Low"].min()),
+            "averageVolume": int(year["Volume"].mean()),
+            "regularMarketPrice": price,
+            "regularMarketChange": price - previous,
+            "regularMarketChangePercent": (price / previous - 1) * 100,
+        }
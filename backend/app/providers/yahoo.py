@@ -0,0 +1,16 @@
+import yfinance as yf
+from app.providers.base import MarketDataProvider
+
+class YahooProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance. Every symbol needs its own request, so batches fan out."""
+
+    name = "yahoo"
+
+    def history(self, symbol, interval="1d", period=None, start=None, end=None):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, end=end, interval=interval)
+        return ticker.history(period=period or "1y", interval=interval)
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
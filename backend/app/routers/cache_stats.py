@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.services.cache_stats_service import get_cache_stats_service
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit, miss and eviction counters of the data caches"""
+    return get_cache_stats_service()
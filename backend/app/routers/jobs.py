@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Query
+from app.models import HypothesisTestRequest, NLPAnalysisRequest, VisualizationRequest
+from app.services.jobs_service import (
+    submit_visualization_job_service,
+    submit_hypothesis_test_job_service,
+    submit_nlp_analysis_job_service,
+    get_job_service,
+    job_events_service
+)
+from app.utils.jobs import JOB_MAX_WAIT_SECONDS
+
+router = APIRouter()
+
+@router.post("/jobs/visualization", status_code=202)
+async def submit_visualization_job(request: VisualizationRequest):
+    """Queue the creation of visualization data and return its job"""
+    return await submit_visualization_job_service(request)
+
+@router.post("/jobs/hypothesis-test", status_code=202)
+async def submit_hypothesis_test_job(request: HypothesisTestRequest):
+    """Queue a statistical hypothesis test and return its job"""
+    return await submit_hypothesis_test_job_service(request)
+
+@router.post("/jobs/nlp-analysis", status_code=202)
+async def submit_nlp_analysis_job(request: NLPAnalysisRequest):
+    """Queue an NLP analysis of stocks and return its job"""
+    return await submit_nlp_analysis_job_service(request)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=JOB_MAX_WAIT_SECONDS)):
+    """Retrieve the state and, once finished, the result of a job"""
+    return await get_job_service(job_id, wait)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Follow a job until it finishes as Server-Sent Events"""
+    return await job_events_service(job_id)
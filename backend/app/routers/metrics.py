@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics_service import get_metrics_service
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Get request, upstream, compute stage and cache metrics in the Prometheus text format"""
+    return get_metrics_service()
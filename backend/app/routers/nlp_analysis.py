@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.models import NLPAnalysisRequest
-from app.services.nlp_analysis_service import nlp_analysis_service
+from app.services.nlp_analysis_service import nlp_analysis_service, nlp_analysis_stream_service
 
 router = APIRouter()
 
@@ -8,3 +8,8 @@ router = APIRouter()
 async def nlp_analysis(request: NLPAnalysisRequest):
     """Analyze stocks using NLP"""
     return await nlp_analysis_service(request)
+
+@router.post("/stocks/nlp-analysis/stream")
+async def nlp_analysis_stream(request: NLPAnalysisRequest):
+    """Analyze stocks using NLP, streaming the answer token by token as Server-Sent Events"""
+    return await nlp_analysis_stream_service(request)
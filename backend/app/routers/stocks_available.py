@@ -1,10 +1,11 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header
 
 from app.services.stocks_available_service import get_available_stocks_service
 
 router = APIRouter()
 
 @router.get("/stocks/available")
-async def get_available_stocks():
+async def get_available_stocks(if_none_match: Optional[str] = Header(None)):
     """Get the list of stocks available for analysis"""
-    return get_available_stocks_service()
+    return get_available_stocks_service(if_none_match)
@@ -0,0 +1,15 @@
+from typing import Optional
+from fastapi import APIRouter, Header
+from app.models import ChartBundleRequest
+from app.services.stocks_chart_bundle_service import chart_bundle_service
+
+router = APIRouter()
+
+@router.post("/stocks/chart-bundle")
+async def chart_bundle(
+    request: ChartBundleRequest,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Retrieve price bars and technical indicators of a stock in one response"""
+    return await chart_bundle_service(request, accept, if_none_match)
@@ -1,10 +1,24 @@
-from fastapi import APIRouter
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, Query
 from app.models import StockRequest
 from app.services.stocks_data_service import fetch_data
 
 router = APIRouter()
 
 @router.post("/stocks/data")
-async def fetch_stock_data(request: StockRequest):
+async def fetch_stock_data(
+    request: StockRequest,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
     """Retrieve historical stock data"""
-    return fetch_data(request)
+    return await fetch_data(request, accept, if_none_match)
+
+@router.get("/stocks/data")
+async def get_stock_data(
+    request: Annotated[StockRequest, Query()],
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Retrieve historical stock data with a cacheable GET request"""
+    return await fetch_data(request, accept, if_none_match)
@@ -1,10 +1,19 @@
-from fastapi import APIRouter
-from app.models import TechnicalAnalysisRequest
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, Query
+from app.models import TechnicalAnalysisRequest, TechnicalAnalysisQuery
 from app.services.stocks_technical_analysis_service import technical_analysis_service
 
 router = APIRouter()
 
 @router.post("/stocks/technical-analysis")
-async def technical_analysis(request: TechnicalAnalysisRequest):
+async def technical_analysis(request: TechnicalAnalysisRequest, if_none_match: Optional[str] = Header(None)):
     """Perform technical analysis of a stock"""
-    return await technical_analysis_service(request)
+    return await technical_analysis_service(request, if_none_match)
+
+@router.get("/stocks/technical-analysis")
+async def get_technical_analysis(
+    query: Annotated[TechnicalAnalysisQuery, Query()],
+    if_none_match: Optional[str] = Header(None)
+):
+    """Perform technical analysis of a stock with a cacheable GET request"""
+    return await technical_analysis_service(TechnicalAnalysisRequest(**query.model_dump()), if_none_match)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header
 from app.models import VisualizationRequest
 from app.services.stocks_visualization_service import create_visualization_service
 
 router = APIRouter()
 
 @router.post("/stocks/visualization")
-async def create_visualization(request: VisualizationRequest):
+async def create_visualization(request: VisualizationRequest, accept: Optional[str] = Header(None)):
     """Create data for visualization"""
-    return await create_visualization_service(request)
+    return await create_visualization_service(request, accept)
\ No newline at end of file
@@ -0,0 +1,4 @@
+from app.utils.cache import cache_stats
+
+def get_cache_stats_service():
+    return {"caches": cache_stats()}
@@ -1,16 +1,43 @@
 from fastapi import HTTPException
 from app.models import HypothesisTestRequest
-from app.utils.hypothesis_testing import run_hypothesis_test
+from app.utils.concurrency import run_blocking
+from app.utils.hypothesis_testing import run_hypothesis_test, run_pairwise_tests, run_resampling_test
+
+METHODS = ["parametric", "resampling"]
+
+def run_test(request: HypothesisTestRequest):
+    """Run the hypothesis test a request asks for"""
+    if request.method not in METHODS:
+        raise ValueError(f"Unknown method: {request.method}. Supported methods: {', '.join(METHODS)}")
+    if request.method == "resampling":
+        return run_resampling_test(
+            request.symbols,
+            request.test_type,
+            request.period,
+            request.alpha,
+            request.n_resamples,
+            request.seed,
+            request.block_length
+        )
+    if request.all_pairs:
+        return run_pairwise_tests(
+            request.symbols,
+            request.test_type,
+            request.period,
+            request.alpha,
+            request.join
+        )
+    return run_hypothesis_test(
+        request.symbols, 
+        request.test_type, 
+        request.period, 
+        request.alpha
+    )
 
 async def hypothesis_test_service(request: HypothesisTestRequest):
     """Run a statistical hypothesis test"""
     try:
-        result = run_hypothesis_test(
-            request.symbols, 
-            request.test_type, 
-            request.period, 
-            request.alpha
-        )
+        result = await run_blocking(run_test, request)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
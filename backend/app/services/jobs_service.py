@@ -0,0 +1,68 @@
+from functools import partial
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.models import HypothesisTestRequest, NLPAnalysisRequest, VisualizationRequest
+from app.services.hypothesis_test_service import run_test
+from app.services.stocks_visualization_service import build_chart_data
+from app.utils.concurrency import run_blocking
+from app.utils.data_collector import data_ttl
+from app.utils.data_preprocessor import analyze_with_nlp
+from app.utils.jobs import submit_job, wait_for_job, job_updates, job_view, PENDING
+from app.utils.serialization import negotiate_format, sse_event
+
+async def _submit(kind, request, runner, interval="1d"):
+    """Queue a job and answer 202 Accepted, or 200 when an identical job has already finished on fresh data"""
+    try:
+        job = await run_blocking(submit_job, kind, request.model_dump(), runner, data_ttl(interval))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(
+        jsonable_encoder(job_view(job)),
+        status_code=202 if job["status"] in PENDING else 200
+    )
+
+async def submit_visualization_job_service(request: VisualizationRequest):
+    """Queue the creation of visualization data"""
+    try:
+        # Job results are JSON, so binary formats get the columnar layout
+        fmt = negotiate_format(request.format)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    date_format = "string" if fmt == "records" else "epoch_ms"
+    return await _submit("visualization", request, partial(build_chart_data, request, date_format), request.interval)
+
+async def submit_hypothesis_test_job_service(request: HypothesisTestRequest):
+    """Queue a statistical hypothesis test"""
+    return await _submit("hypothesis-test", request, partial(run_test, request))
+
+async def submit_nlp_analysis_job_service(request: NLPAnalysisRequest):
+    """Queue an NLP analysis of stocks"""
+    return await _submit(
+        "nlp-analysis",
+        request,
+        partial(analyze_with_nlp, request.query, request.symbols, request.period)
+    )
+
+async def get_job_service(job_id, wait=0):
+    """Retrieve the state of a job, waiting up to `wait` seconds for it to finish"""
+    job = await wait_for_job(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_view(job)
+
+async def job_events_service(job_id):
+    """Stream the status changes of a job as Server-Sent Events"""
+    async def events():
+        async for job in job_updates(job_id):
+            if job is None:
+                yield sse_event("error", {"detail": f"Job {job_id} not found"})
+                return
+            view = jsonable_encoder(job_view(job))
+            yield sse_event("status" if job["status"] in PENDING else "done", view)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
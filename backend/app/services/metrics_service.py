@@ -0,0 +1,5 @@
+from fastapi import Response
+from app.utils.metrics import render, PROMETHEUS_MEDIA_TYPE
+
+def get_metrics_service():
+    return Response(render(), media_type=PROMETHEUS_MEDIA_TYPE)
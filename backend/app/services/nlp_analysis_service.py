@@ -1,11 +1,38 @@
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from app.models import NLPAnalysisRequest
-from app.utils.data_preprocessor import analyze_with_nlp
+from app.utils.concurrency import run_blocking
+from app.utils.data_preprocessor import analyze_with_nlp, summarize_stock_data, NLP_ANALYSIS_PROMPT
+from app.utils.llm import stream_completion
+from app.utils.serialization import sse_event
 
 async def nlp_analysis_service(request: NLPAnalysisRequest):
     """Analyze stocks using NLP"""
     try:
-        result = analyze_with_nlp(request.query, request.symbols, request.period)
+        result = await run_blocking(analyze_with_nlp, request.query, request.symbols, request.period)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+async def nlp_analysis_stream_service(request: NLPAnalysisRequest):
+    """Analyze stocks using NLP, streaming the answer as Server-Sent Events"""
+    try:
+        # Data errors are still reported as a 400 before the stream starts
+        data_summary = await run_blocking(summarize_stock_data, request.symbols, request.period)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            async for text in stream_completion(NLP_ANALYSIS_PROMPT, {"data_summary": data_summary, "query": request.query}):
+                yield sse_event("token", {"text": text})
+            yield sse_event("done", {"query": request.query, "symbols": request.symbols, "period": request.period})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass tokens through as they arrive
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
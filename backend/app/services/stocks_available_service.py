@@ -1,15 +1,22 @@
-def get_available_stocks_service():
-    return {
-        "stocks": [
-            {"symbol": "AAPL", "name": "Apple Inc."},
-            {"symbol": "MSFT", "name": "Microsoft Corporation"},
-            {"symbol": "GOOGL", "name": "Alphabet Inc."},
-            {"symbol": "AMZN", "name": "Amazon.com, Inc."},
-            {"symbol": "META", "name": "Meta Platforms, Inc."},
-            {"symbol": "TSLA", "name": "Tesla, Inc."},
-            {"symbol": "NVDA", "name": "NVIDIA Corporation"},
-            {"symbol": "JPM", "name": "JPMorgan Chase & Co."},
-            {"symbol": "V", "name": "Visa Inc."},
-            {"symbol": "JNJ", "name": "Johnson & Johnson"}
-        ]
-    }
\ No newline at end of file
+from app.utils.http_cache import make_etag, etag_matches, not_modified, cached_response, STATIC_MAX_AGE
+
+AVAILABLE_STOCKS = {
+    "stocks": [
+        {"symbol": "AAPL", "name": "Apple Inc."},
+        {"symbol": "MSFT", "name": "Microsoft Corporation"},
+        {"symbol": "GOOGL", "name": "Alphabet Inc."},
+        {"symbol": "AMZN", "name": "Amazon.com, Inc."},
+        {"symbol": "META", "name": "Meta Platforms, Inc."},
+        {"symbol": "TSLA", "name": "Tesla, Inc."},
+        {"symbol": "NVDA", "name": "NVIDIA Corporation"},
+        {"symbol": "JPM", "name": "JPMorgan Chase & Co."},
+        {"symbol": "V", "name": "Visa Inc."},
+        {"symbol": "JNJ", "name": "Johnson & Johnson"}
+    ]
+}
+AVAILABLE_STOCKS_ETAG = make_etag("stocks/available", AVAILABLE_STOCKS)
+
+def get_available_stocks_service(if_none_match=None):
+    if etag_matches(if_none_match, AVAILABLE_STOCKS_ETAG):
+        return not_modified(AVAILABLE_STOCKS_ETAG, STATIC_MAX_AGE)
+    return cached_response(AVAILABLE_STOCKS, AVAILABLE_STOCKS_ETAG, STATIC_MAX_AGE)
@@ -0,0 +1,58 @@
+import asyncio
+from fastapi import HTTPException
+from app.models import ChartBundleRequest
+from app.utils.concurrency import run_blocking
+from app.utils.data_collector import get_stock_frame_async, get_stock_info_async, frame_to_records
+from app.utils.downsampling import frame_indices, take, validate_downsampling
+from app.utils.http_cache import frame_hash, make_etag, etag_matches, max_age, not_modified, cached_response
+from app.utils.indicator_state import incremental_indicators
+from app.utils.serialization import OHLCV_COLUMNS, negotiate_format, chart_bundle_response
+
+async def _no_info():
+    return None
+
+def _downsample(df, indicators, max_points, method):
+    """Thin the bars and their indicators to the same points"""
+    indices = frame_indices(df, max_points, method)
+    if indices is None:
+        return df, indicators
+    return df.iloc[indices], take(indicators, indices, len(df))
+
+async def chart_bundle_service(request: ChartBundleRequest, accept=None, if_none_match=None):
+    """Fetch a stock's bars once and return them together with the requested indicators"""
+    try:
+        fmt = negotiate_format(request.format, accept)
+        validate_downsampling(request.max_points, request.downsample)
+        df, info = await asyncio.gather(
+            get_stock_frame_async(request.symbol, request.period, request.interval),
+            get_stock_info_async(request.symbol) if request.include_info else _no_info()
+        )
+        etag = make_etag("stocks/chart-bundle", request.model_dump(mode="json"), fmt, await run_blocking(frame_hash, df), info)
+        seconds = max_age(request.interval)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, seconds)
+        indicators = await run_blocking(
+            incremental_indicators,
+            request.symbol,
+            request.interval,
+            df,
+            request.indicators,
+            request.windows
+        )
+        df, indicators = await run_blocking(
+            _downsample, df, indicators, request.max_points, request.downsample
+        )
+        if fmt != "records":
+            content = await run_blocking(chart_bundle_response, request.symbol, df, indicators, info, fmt)
+            return cached_response(content, etag, seconds)
+        bars = df[[col for col in OHLCV_COLUMNS if col in df.columns]]
+        result = {
+            "symbol": request.symbol,
+            "data": await run_blocking(frame_to_records, bars),
+            "indicators": indicators
+        }
+        if info is not None:
+            result["info"] = info
+        return cached_response(result, etag, seconds)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,81 @@
+import asyncio
 from fastapi import HTTPException
-from app.utils.data_collector import get_stock_data, get_stock_info
+from app.utils.concurrency import run_blocking
+from app.utils.data_collector import get_stock_frame_async, get_stock_info_async, get_stock_range_async, frame_to_records
+from app.utils.delta import data_version, delta_frame
+from app.utils.downsampling import downsample_frame, validate_downsampling
+from app.utils.http_cache import frame_hash, make_etag, etag_matches, max_age, not_modified, cached_response
+from app.utils.pagination import encode_cursor, decode_cursor, is_range_request, resolve_range
+from app.utils.serialization import negotiate_format, stock_data_response
 from app.models import StockRequest
 
-def fetch_data(request: StockRequest):
+async def _no_info():
+    return None
+
+async def _fetch_range(request: StockRequest):
+    """Fetch one page of a date range and the cursor of the next page"""
+    start, end = resolve_range(request)
+    after = None if request.cursor is None else decode_cursor(request.cursor, request.symbol, request.interval)
+    # One extra bar tells whether another page follows
+    limit = None if request.limit is None else request.limit + 1
+    df, info = await asyncio.gather(
+        get_stock_range_async(request.symbol, request.interval, start, end, after, limit),
+        get_stock_info_async(request.symbol) if request.cursor is None else _no_info()
+    )
+    if request.limit is None:
+        return df, info, {}
+    next_cursor = None
+    if len(df) > request.limit:
+        df = df.iloc[:request.limit]
+        next_cursor = encode_cursor(request.symbol, request.interval, df.index[-1])
+    return df, info, {"next_cursor": next_cursor}
+
+def _delta(df, request: StockRequest):
+    """Get the bars a client polling with since is missing, and the version to poll with next"""
+    delta, reset = delta_frame(df, request.since, request.version)
+    return delta, {"version": data_version(df), "reset": reset}
+
+async def fetch_data(request: StockRequest, accept=None, if_none_match=None):
     try:
-        data = get_stock_data(request.symbol, request.period, request.interval)
-        info = get_stock_info(request.symbol)
-        return {
-            "symbol": request.symbol,
-            "data": data,
-            "info": info
-        }
+        fmt = negotiate_format(request.format, accept)
+        validate_downsampling(request.max_points, request.downsample)
+        if request.since is not None:
+            if is_range_request(request) or request.max_points is not None:
+                raise ValueError("since cannot be combined with start, end, limit, cursor or max_points")
+            # Watchers already hold the company info
+            df = await get_stock_frame_async(request.symbol, request.period, request.interval)
+            info, extra = None, None
+        elif is_range_request(request):
+            df, info, extra = await _fetch_range(request)
+        else:
+            df, info = await asyncio.gather(
+                get_stock_frame_async(request.symbol, request.period, request.interval),
+                get_stock_info_async(request.symbol)
+            )
+            extra = None
+
+        # Everything below derives from the bars and info, so a matching ETag skips it
+        etag = make_etag("stocks/data", request.model_dump(mode="json"), fmt, await run_blocking(frame_hash, df), info)
+        seconds = max_age(request.interval, request.end)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, seconds)
+
+        if request.since is not None:
+            df, extra = await run_blocking(_delta, df, request)
+        elif extra is None:
+            # Downsampled data cannot be patched with deltas
+            extra = {} if request.max_points is not None else {"version": await run_blocking(data_version, df)}
+        if request.max_points is not None:
+            df = await run_blocking(downsample_frame, df, request.max_points, request.downsample)
+        if fmt != "records":
+            content = await run_blocking(stock_data_response, request.symbol, df, info, fmt, extra)
+        else:
+            content = {
+                "symbol": request.symbol,
+                "data": await run_blocking(frame_to_records, df),
+                "info": info,
+                **extra
+            }
+        return cached_response(content, etag, seconds)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,16 +1,63 @@
 from fastapi import HTTPException
 from app.models import TechnicalAnalysisRequest
-from app.utils.data_collector import get_stock_data
-from app.utils.data_preprocessor import calculate_technical_indicators
+from app.utils.concurrency import run_blocking
+from app.utils.data_collector import get_stock_frame_async, get_stock_data_many, format_dates
+from app.utils.data_preprocessor import calculate_technical_indicators_many
+from app.utils.http_cache import frame_hash, make_etag, etag_matches, max_age, not_modified, cached_response
+from app.utils.indicator_state import incremental_indicators
 
-async def technical_analysis_service(request: TechnicalAnalysisRequest):
-    """Perform technical analysis of a stock"""
+def _analyze_many(symbols, frames, indicators, windows):
+    """Compute the indicators of several symbols in one batch"""
+    results = calculate_technical_indicators_many(frames, indicators, windows)
+    return {
+        "symbols": symbols,
+        "results": {
+            symbol: {
+                "dates": format_dates(frames[symbol].index),
+                "indicators": results[symbol]
+            }
+            for symbol in frames
+        }
+    }
+
+def _frames_hash(frames):
+    return [frame_hash(df) for df in frames.values()]
+
+async def technical_analysis_service(request: TechnicalAnalysisRequest, if_none_match=None):
+    """Perform technical analysis of one or several stocks"""
     try:
-        data = get_stock_data(request.symbol, request.period, request.interval)
-        indicators = calculate_technical_indicators(data, request.indicators)
-        return {
+        seconds = max_age(request.interval)
+        if request.symbols:
+            frames = await run_blocking(get_stock_data_many, request.symbols, request.period, request.interval)
+            etag = make_etag("stocks/technical-analysis", request.model_dump(mode="json"), await run_blocking(_frames_hash, frames))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, seconds)
+            content = await run_blocking(
+                _analyze_many,
+                request.symbols,
+                frames,
+                request.indicators,
+                request.windows
+            )
+            return cached_response(content, etag, seconds)
+        if not request.symbol:
+            raise ValueError("Either symbol or symbols is required")
+
+        df = await get_stock_frame_async(request.symbol, request.period, request.interval)
+        etag = make_etag("stocks/technical-analysis", request.model_dump(mode="json"), await run_blocking(frame_hash, df))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, seconds)
+        indicators = await run_blocking(
+            incremental_indicators,
+            request.symbol,
+            request.interval,
+            df,
+            request.indicators,
+            request.windows
+        )
+        return cached_response({
             "symbol": request.symbol,
             "indicators": indicators
-        }
+        }, etag, seconds)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
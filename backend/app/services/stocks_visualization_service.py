@@ -1,17 +1,33 @@
 from fastapi import HTTPException
 from app.models import VisualizationRequest
+from app.utils.concurrency import run_blocking
+from app.utils.serialization import negotiate_format, chart_data_response
 from app.utils.visualization import generate_chart_data
 
-async def create_visualization_service(request: VisualizationRequest):
+def build_chart_data(request: VisualizationRequest, date_format="string"):
+    """Create the chart data a request asks for"""
+    return generate_chart_data(
+        request.symbols,
+        request.chart_type,
+        request.period,
+        request.interval,
+        request.indicators,
+        date_format,
+        request.matrix_layout,
+        request.order,
+        request.benchmark,
+        request.rolling_windows,
+        request.max_points,
+        request.downsample
+    )
+
+async def create_visualization_service(request: VisualizationRequest, accept=None):
     """Create data for visualization"""
     try:
-        chart_data = generate_chart_data(
-            request.symbols,
-            request.chart_type,
-            request.period,
-            request.interval,
-            request.indicators
-        )
-        return chart_data
+        fmt = negotiate_format(request.format, accept)
+        chart_data = await run_blocking(build_chart_data, request, "string" if fmt == "records" else "epoch_ms")
+        if fmt == "records":
+            return chart_data
+        return await run_blocking(chart_data_response, chart_data, fmt)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,276 @@
+import os
+import logging
+import threading
+import pandas as pd
+from pymongo import MongoClient, UpdateMany, ASCENDING
+from pymongo.errors import PyMongoError
+from app.utils.intervals import period_start
+
+logger = logging.getLogger(__name__)
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGODB_DB = os.getenv("MONGODB_DB", "stock_analyzer")
+REFRESH_SECONDS = float(os.getenv("BAR_STORE_REFRESH_SECONDS", "60"))
+
+BARS_COLLECTION = "bars"
+COVERAGE_COLLECTION = "bar_coverage"
+ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+
+_client = None
+_indexed = False
+_lock = threading.Lock()
+
+def set_client(client):
+    """Use the given MongoDB client (e.g. mongomock.MongoClient()) for the bar store, or None to disable it"""
+    global _client, _indexed
+    with _lock:
+        _client = client
+        _indexed = False
+
+def get_database():
+    """Get the bar store database, or None when no MongoDB is configured"""
+    global _client, _indexed
+    with _lock:
+        if _client is None and MONGODB_URI:
+            if MONGODB_URI.startswith("mongomock://"):
+                import mongomock
+                _client = mongomock.MongoClient()
+            else:
+                _client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+        if _client is None:
+            return None
+        db = _client[MONGODB_DB]
+        if not _indexed:
+            db[BARS_COLLECTION].create_index(
+                [("symbol", ASCENDING), ("interval", ASCENDING), ("ts", ASCENDING)],
+                unique=True
+            )
+            db[COVERAGE_COLLECTION].create_index(
+                [("symbol", ASCENDING), ("interval", ASCENDING)],
+                unique=True
+            )
+            _indexed = True
+        return db
+
+def _to_utc_naive(index):
+    """Convert a bar index to naive UTC datetimes as stored by MongoDB"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        return index
+    return index.tz_convert("UTC").tz_localize(None)
+
+def _write_bars(db, symbol, interval, df):
+    """Bulk upsert downloaded bars into the store"""
+    if df.empty:
+        return
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None).to_pydatetime()
+    columns = list(df.columns)
+    operations = []
+    for ts, row in zip(_to_utc_naive(df.index), df.itertuples(index=False, name=None)):
+        fields = {"updated_at": now}
+        for col, value in zip(columns, row):
+            fields[col] = int(value) if col == "Volume" and pd.notna(value) else float(value)
+        # UpdateMany on the unique key acts as UpdateOne and keeps bulk upserts mongomock-compatible
+        operations.append(UpdateMany(
+            {"symbol": symbol, "interval": interval, "ts": ts.to_pydatetime()},
+            {"$set": fields},
+            upsert=True
+        ))
+    db[BARS_COLLECTION].bulk_write(operations, ordered=False)
+
+def _stored_ts(ts):
+    """Convert a timestamp to the naive UTC datetime stored by MongoDB"""
+    return ts.tz_convert("UTC").tz_localize(None).to_pydatetime()
+
+def _read_bars(db, symbol, interval, start, tz, end=None, after=None, limit=None):
+    """Read stored bars of [start, end) as a DataFrame indexed by Date.
+
+    With after only later bars are read, and with limit at most that many.
+    """
+    query = {"symbol": symbol, "interval": interval}
+    ts_range = {}
+    if start is not None:
+        ts_range["$gte"] = _stored_ts(start)
+    if after is not None:
+        ts_range["$gt"] = _stored_ts(after)
+    if end is not None:
+        ts_range["$lt"] = _stored_ts(end)
+    if ts_range:
+        query["ts"] = ts_range
+    cursor = db[BARS_COLLECTION].find(
+        query,
+        {"_id": 0, "symbol": 0, "interval": 0, "updated_at": 0}
+    ).sort("ts", ASCENDING)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    df = pd.DataFrame(list(cursor))
+    if df.empty:
+        return df
+    dates = pd.to_datetime(df.pop("ts"), utc=True)
+    df.index = pd.DatetimeIndex(dates.dt.tz_convert(tz) if tz else dates, name="Date")
+    return df
+
+def _has_new_actions(df, last_ts):
+    """Check whether a tail contains dividends or splits after the last stored bar"""
+    if df.empty:
+        return False
+    tail = df[_to_utc_naive(df.index) > last_ts]
+    for col in ACTION_COLUMNS:
+        if col in tail.columns and (tail[col] != 0).any():
+            return True
+    return False
+
+def _sync(db, symbol, interval, period, download):
+    """Bring the stored bars up to date, fetching only what is missing"""
+    now = pd.Timestamp.now(tz="UTC")
+    start = period_start(period, now)
+    key = {"symbol": symbol, "interval": interval}
+    coverage = db[COVERAGE_COLLECTION].find_one(key)
+
+    covered = coverage is not None and (
+        coverage.get("complete", False)
+        or (start is not None and pd.Timestamp(coverage["start"], tz="UTC") <= start)
+    )
+
+    if covered:
+        fetched_at = pd.Timestamp(coverage["fetched_at"], tz="UTC")
+        if (now - fetched_at).total_seconds() < REFRESH_SECONDS:
+            return coverage, start
+        last_ts = pd.Timestamp(coverage["end"])
+        df = download(start=pd.Timestamp(last_ts, tz="UTC"))
+        if not _has_new_actions(df, last_ts):
+            _write_bars(db, symbol, interval, df)
+            end = max(last_ts, _to_utc_naive(df.index).max()) if not df.empty else last_ts
+            db[COVERAGE_COLLECTION].update_one(key, {"$set": {
+                "end": end.to_pydatetime(),
+                "fetched_at": now.tz_localize(None).to_pydatetime()
+            }})
+            coverage["end"] = end.to_pydatetime()
+            return coverage, start
+        # Adjusted prices change retroactively on dividends and splits. The coverage goes with the
+        # bars, so a failed re-download leaves nothing that claims the history is still stored
+        db[BARS_COLLECTION].delete_many(key)
+        db[COVERAGE_COLLECTION].delete_one(key)
+        coverage = None
+
+    df = download(period=period)
+    if df.empty:
+        return None, start
+    _write_bars(db, symbol, interval, df)
+
+    if coverage is not None and start is not None:
+        covered_start = min(pd.Timestamp(coverage["start"], tz="UTC"), start)
+    else:
+        covered_start = start if start is not None else _to_utc_naive(df.index).min().tz_localize("UTC")
+    coverage = {
+        **key,
+        "start": covered_start.tz_localize(None).to_pydatetime(),
+        "end": _to_utc_naive(df.index).max().to_pydatetime(),
+        "complete": start is None or (coverage or {}).get("complete", False),
+        "tz": str(df.index.tz) if df.index.tz is not None else None,
+        "fetched_at": now.tz_localize(None).to_pydatetime()
+    }
+    db[COVERAGE_COLLECTION].update_one(key, {"$set": coverage}, upsert=True)
+    return coverage, start
+
+def get_bars(symbol, period, interval, download):
+    """Get bars for a period from the store, downloading only the missing tail"""
+    db = get_database()
+    if db is None:
+        return download(period=period)
+    try:
+        coverage, start = _sync(db, symbol, interval, period, download)
+        if coverage is None:
+            return pd.DataFrame()
+        return _read_bars(db, symbol, interval, start, coverage.get("tz"))
+    except PyMongoError as e:
+        logger.warning("Bar store unavailable, fetching %s directly: %s", symbol, e)
+        return download(period=period)
+
+def _write_chunks(db, symbol, interval, chunks):
+    """Write downloaded chunks one at a time and return the last bar written and its time zone"""
+    last_ts, tz = None, None
+    for df in chunks:
+        if df.empty:
+            continue
+        _write_bars(db, symbol, interval, df)
+        chunk_last = _to_utc_naive(df.index).max()
+        last_ts = chunk_last if last_ts is None else max(last_ts, chunk_last)
+        tz = str(df.index.tz) if df.index.tz is not None else None
+    return last_ts, tz
+
+def _sync_range(db, symbol, interval, start, end, download):
+    """Make the stored bars cover [start, end), fetching only the missing head and tail"""
+    # MongoDB keeps milliseconds, so coverage bounds must compare equal once read back
+    start, end = start.floor("ms"), end.floor("ms")
+    now = pd.Timestamp.now(tz="UTC").floor("ms")
+    key = {"symbol": symbol, "interval": interval}
+    coverage = db[COVERAGE_COLLECTION].find_one(key)
+    # The store is complete up to fetched_at, which is in the past for ranges that ended before now
+    fetched_until = min(end, now)
+
+    if coverage is not None:
+        covered_start = pd.Timestamp(coverage["start"], tz="UTC")
+        fetched_at = pd.Timestamp(coverage["fetched_at"], tz="UTC")
+        last_ts = pd.Timestamp(coverage["end"])
+        updates = {}
+        if start < covered_start:
+            _write_chunks(db, symbol, interval, download(start, covered_start))
+            updates["start"] = start.tz_localize(None).to_pydatetime()
+        if end > fetched_at and (now - fetched_at).total_seconds() >= REFRESH_SECONDS:
+            tail_ts = _write_tail(db, symbol, interval, last_ts, download(pd.Timestamp(last_ts, tz="UTC"), end))
+            if tail_ts is None:
+                # Adjusted prices change retroactively on dividends and splits
+                db[BARS_COLLECTION].delete_many(key)
+                db[COVERAGE_COLLECTION].delete_one(key)
+                return _sync_range(db, symbol, interval, start, end, download)
+            updates["end"] = max(last_ts, tail_ts).to_pydatetime()
+            updates["fetched_at"] = max(fetched_at, fetched_until).tz_localize(None).to_pydatetime()
+        if updates:
+            db[COVERAGE_COLLECTION].update_one(key, {"$set": updates})
+            coverage.update(updates)
+        return coverage
+
+    last_ts, tz = _write_chunks(db, symbol, interval, download(start, end))
+    if last_ts is None:
+        return None
+    coverage = {
+        **key,
+        "start": start.tz_localize(None).to_pydatetime(),
+        "end": last_ts.to_pydatetime(),
+        "complete": False,
+        "tz": tz,
+        "fetched_at": fetched_until.tz_localize(None).to_pydatetime()
+    }
+    db[COVERAGE_COLLECTION].update_one(key, {"$set": coverage}, upsert=True)
+    return coverage
+
+def _write_tail(db, symbol, interval, last_ts, chunks):
+    """Write the chunks following the last stored bar and return the newest bar, or None on new dividends or splits"""
+    newest = last_ts
+    for df in chunks:
+        if _has_new_actions(df, last_ts):
+            return None
+        chunk_last, _ = _write_chunks(db, symbol, interval, [df])
+        if chunk_last is not None:
+            newest = max(newest, chunk_last)
+    return newest
+
+def get_range(symbol, interval, start, end, download, after=None, limit=None):
+    """Get the bars of [start, end) from the store, downloading only what it does not cover yet.
+
+    download(start, end) yields the missing bars chunk by chunk, so long ranges are written without
+    being held in memory, and only the requested slice is read back. Returns None when no MongoDB
+    is configured or it is unavailable.
+    """
+    db = get_database()
+    if db is None:
+        return None
+    try:
+        coverage = _sync_range(db, symbol, interval, start, end, download)
+        if coverage is None:
+            return pd.DataFrame()
+        return _read_bars(db, symbol, interval, start, coverage.get("tz"), end, after, limit)
+    except PyMongoError as e:
+        logger.warning("Bar store unavailable, fetching %s directly: %s", symbol, e)
+        return None
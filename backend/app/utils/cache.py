@@ -0,0 +1,153 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+_caches = []
+
+class _Flight:
+    """A load in progress that concurrent callers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+def approx_size(value):
+    """Estimate the memory used by a cached value in bytes"""
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, list):
+        if not value:
+            return sys.getsizeof(value)
+        return sys.getsizeof(value) + len(value) * approx_size(value[0])
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+class TTLCache:
+    """Memory-bounded LRU cache with per-entry TTLs and single-flight loading"""
+
+    def __init__(self, name, max_entries=256, max_bytes=None, sizeof=approx_size):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        _caches.append(self)
+
+    def get(self, key):
+        """Get a fresh cached value, or None"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, size = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, value, ttl):
+        """Store a value for ttl seconds, evicting least recently used entries"""
+        size = self.sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl):
+        """Get a cached value, or load it once even when many callers ask concurrently"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def invalidate(self, key):
+        """Drop a cached value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        """Drop all cached values and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = self.coalesced = 0
+
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+def cache_stats():
+    """Get counters of every cache in the process"""
+    return {cache.name: cache.stats() for cache in _caches}
@@ -0,0 +1,47 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "32"))
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+FETCH_THREADS = int(os.getenv("FETCH_THREADS", "16"))
+RESAMPLING_PROCESSES = int(os.getenv("RESAMPLING_PROCESSES", str(os.cpu_count() or 1)))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="worker")
+# Fan-out fetches get their own pool so workers waiting on them can never starve it
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix="fetch")
+# Background jobs run apart from interactive requests so long analyses cannot starve them
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+upstream_slots = threading.BoundedSemaphore(UPSTREAM_CONCURRENCY)
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def process_pool():
+    """Get the process pool for CPU-heavy numeric work, starting it on first use"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Forking a process that runs threads is unsafe, so workers are spawned
+            _process_pool = ProcessPoolExecutor(
+                max_workers=RESAMPLING_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+async def run_blocking(func, *args, **kwargs):
+    """Run blocking I/O or CPU-bound code on the worker pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+def shutdown():
+    """Stop the worker pools"""
+    executor.shutdown(wait=False, cancel_futures=True)
+    fetch_executor.shutdown(wait=False, cancel_futures=True)
+    job_executor.shutdown(wait=False, cancel_futures=True)
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,27 +1,238 @@
-import yfinance as yf
+import os
+import logging
+import pandas as pd
+from app.providers import get_provider
+from app.utils import bar_store
+from app.utils.cache import TTLCache
+from app.utils.concurrency import run_blocking, upstream_slots, fetch_executor
+from app.utils.intervals import interval_seconds, earliest_start, range_chunks, to_utc
+from app.utils.metrics import timed, upstream_call
+
+logger = logging.getLogger(__name__)
+
+INFO_TTL_SECONDS = 3600
+# Chunks that ended before now only change on dividends and splits
+RANGE_TTL_SECONDS = 6 * 3600
+
+stock_data_cache = TTLCache(
+    "stock_data",
+    max_entries=int(os.getenv("STOCK_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("STOCK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+)
+stock_info_cache = TTLCache("stock_info", max_entries=1024)
+
+def data_ttl(interval):
+    """Get how long bars of an interval stay fresh in the cache"""
+    return min(max(interval_seconds(interval), 30), 900)
+
+def _download_history(symbol, interval, period=None, start=None, end=None):
+    """Download bars from the market data provider for a period or from a start timestamp up to an optional end"""
+    provider = get_provider()
+    with upstream_slots, upstream_call(provider.name, "history"):
+        if start is not None:
+            df = provider.history(symbol, interval, start=start, end=end)
+        else:
+            df = provider.history(symbol, interval, period=period)
+    df.index.name = 'Date'
+    return df
+
+def get_stock_frame(symbol, period="1y", interval="1d"):
+    """Retrieve historical stock data as a DataFrame indexed by Date.
+
+    Frames are shared through the cache and must be treated as read-only.
+    """
+    return stock_data_cache.get_or_load(
+        (symbol.upper(), period, interval),
+        lambda: _load_stock_frame(symbol, period, interval),
+        data_ttl(interval)
+    )
 
 def get_stock_data(symbol, period="1y", interval="1d"):
-    """Retrieve historical stock data from Yahoo Finance"""
+    """Retrieve historical stock data from the market data provider"""
+    return frame_to_records(get_stock_frame(symbol, period, interval))
+
+def _prefetch(symbols, period, interval):
+    """Load uncached symbols with one batch call when the provider supports it.
+
+    Symbols the batch misses or fails on are left to the per-symbol path, which reports their errors.
+    """
+    provider = get_provider()
+    if not provider.supports_batch or bar_store.get_database() is not None:
+        return
+    missing = [symbol for symbol in symbols if stock_data_cache.get((symbol.upper(), period, interval)) is None]
+    if len(missing) < 2:
+        return
     try:
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
-        
-        df = df.reset_index()
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        for col in df.columns:
-            if df[col].dtype == 'float64':
-                df[col] = df[col].round(2)
-        
-        return df.to_dict(orient='records')
+        with upstream_slots, upstream_call(provider.name, "history_many"):
+            frames = provider.history_many(missing, interval, period=period)
+    except Exception as e:
+        logger.warning("Batch download of %d symbols failed: %s", len(missing), e)
+        return
+    for symbol, df in frames.items():
+        if not df.empty:
+            df.index.name = 'Date'
+            stock_data_cache.set((symbol.upper(), period, interval), _round_prices(df), data_ttl(interval))
+
+def get_stock_data_many(symbols, period="1y", interval="1d"):
+    """Retrieve historical stock data for several symbols concurrently as DataFrames"""
+    unique_symbols = list(dict.fromkeys(symbols))
+    _prefetch(unique_symbols, period, interval)
+    if len(unique_symbols) == 1:
+        return {unique_symbols[0]: get_stock_frame(unique_symbols[0], period, interval)}
+    futures = {
+        symbol: fetch_executor.submit(get_stock_frame, symbol, period, interval)
+        for symbol in unique_symbols
+    }
+    return {symbol: future.result() for symbol, future in futures.items()}
+
+async def get_stock_frame_async(symbol, period="1y", interval="1d"):
+    """Retrieve historical stock data as a DataFrame without blocking the event loop"""
+    cached = stock_data_cache.get((symbol.upper(), period, interval))
+    if cached is not None:
+        return cached
+    return await run_blocking(get_stock_frame, symbol, period, interval)
+
+async def get_stock_data_async(symbol, period="1y", interval="1d"):
+    """Retrieve historical stock data without blocking the event loop"""
+    df = await get_stock_frame_async(symbol, period, interval)
+    return await run_blocking(frame_to_records, df)
+
+def format_dates(index):
+    """Format a DatetimeIndex the way the API returns dates"""
+    return index.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+@timed("serialization")
+def frame_to_records(df):
+    """Serialize a stock data frame into the records returned by the API"""
+    records = df.reset_index()
+    records['Date'] = format_dates(df.index)
+    return records.to_dict(orient='records')
+
+def records_to_frame(data):
+    """Build a stock data frame from API records"""
+    df = pd.DataFrame(data)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.set_index('Date')
+
+def _round_prices(df):
+    float_columns = df.select_dtypes(include='float64').columns
+    df[float_columns] = df[float_columns].round(2)
+    return df
+
+@timed("fetch")
+def _load_stock_frame(symbol, period, interval):
+    try:
+        df = bar_store.get_bars(
+            symbol,
+            period,
+            interval,
+            lambda **kwargs: _download_history(symbol, interval, **kwargs)
+        )
+        if df.empty:
+            raise ValueError("no data found")
+        return _round_prices(df)
+    except Exception as e:
+        raise Exception(f"Error retrieving data for {symbol}: {str(e)}")
+
+@timed("fetch")
+def _load_chunk(symbol, interval, start, end):
+    """Download the bars of [start, end), skipping the part older than the provider keeps"""
+    earliest = earliest_start(interval)
+    if earliest is not None and end <= earliest:
+        return pd.DataFrame()
+    df = _download_history(symbol, interval, start=max(start, earliest or start), end=end)
+    if df.empty:
+        return df
+    if df.index.tz is None:
+        df.index = df.index.tz_localize("UTC")
+    return _round_prices(df[(df.index >= start) & (df.index < end)].copy())
+
+def get_range_chunk(symbol, interval, chunk_start, chunk_end):
+    """Retrieve one aligned chunk of bars, shared through the cache"""
+    now = pd.Timestamp.now(tz="UTC")
+    return stock_data_cache.get_or_load(
+        (symbol.upper(), interval, chunk_start, chunk_end),
+        lambda: _load_chunk(symbol, interval, chunk_start, chunk_end),
+        data_ttl(interval) if chunk_end > now else RANGE_TTL_SECONDS
+    )
+
+def iter_range(symbol, interval, start, end, cached=True):
+    """Yield the bars of [start, end) chunk by chunk, each within the provider's request limits"""
+    earliest = earliest_start(interval)
+    # Chunks older than the provider keeps are always empty, so they are neither downloaded nor cached
+    first = start if earliest is None else max(start, earliest)
+    for chunk_start, chunk_end in range_chunks(first, end, interval):
+        if cached:
+            df = get_range_chunk(symbol, interval, chunk_start, chunk_end)
+        else:
+            # Uncached downloads fetch only the overlap with the range
+            df = _load_chunk(symbol, interval, max(start, chunk_start), min(end, chunk_end))
+        if not df.empty:
+            yield df[(df.index >= start) & (df.index < end)]
+
+def get_stock_range(symbol, interval, start, end=None, after=None, limit=None):
+    """Retrieve the bars of [start, end) as a DataFrame indexed by Date.
+
+    With after only later bars are returned, and with limit at most that many. Ranges are sliced
+    out of the bar store when one is configured, otherwise downloaded chunk by chunk until the
+    limit is reached.
+    """
+    start = to_utc(start)
+    end = pd.Timestamp.now(tz="UTC") if end is None else to_utc(end)
+    after = None if after is None else to_utc(after)
+    try:
+        df = bar_store.get_range(
+            symbol,
+            interval,
+            start,
+            end,
+            lambda chunk_start, chunk_end: iter_range(symbol, interval, chunk_start, chunk_end, cached=False),
+            after,
+            limit
+        )
+        if df is None:
+            frames, count = [], 0
+            lower = start if after is None else max(start, after)
+            for chunk in iter_range(symbol, interval, lower, end):
+                if after is not None:
+                    chunk = chunk[chunk.index > after]
+                frames.append(chunk)
+                count += len(chunk)
+                if limit is not None and count >= limit:
+                    break
+            df = pd.concat(frames) if frames else pd.DataFrame()
+            if limit is not None:
+                df = df.iloc[:limit]
+        if df.empty:
+            raise ValueError("no data found")
+        return df
     except Exception as e:
         raise Exception(f"Error retrieving data for {symbol}: {str(e)}")
 
+async def get_stock_range_async(symbol, interval, start, end=None, after=None, limit=None):
+    """Retrieve the bars of a date range without blocking the event loop"""
+    return await run_blocking(get_stock_range, symbol, interval, start, end, after, limit)
+
 def get_stock_info(symbol):
     """Get stock information"""
+    return stock_info_cache.get_or_load(
+        symbol.upper(),
+        lambda: _load_stock_info(symbol),
+        INFO_TTL_SECONDS
+    )
+
+async def get_stock_info_async(symbol):
+    """Get stock information without blocking the event loop"""
+    cached = stock_info_cache.get(symbol.upper())
+    if cached is not None:
+        return cached
+    return await run_blocking(get_stock_info, symbol)
+
+def _load_stock_info(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        provider = get_provider()
+        with upstream_slots, upstream_call(provider.name, "info"):
+            info = provider.info(symbol)
         
         relevant_info = {
             'shortName': info.get('shortName', ''),
@@ -1,55 +1,44 @@
 import pandas as pd
-import ta
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
-import os
-from app.utils.data_collector import get_stock_data
+from app.utils.data_collector import get_stock_data_many, records_to_frame
+from app.utils.indicators import compute_indicator_matrix, indicator_lists, right_aligned_matrix
+from app.utils.llm import cached_completion
+from app.utils.metrics import timed
 
-def calculate_technical_indicators(data, indicators):
-    """Calculate technical indicators for stock data"""
-    df = pd.DataFrame(data)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
-    
-    result = {}
-    
-    if "sma" in indicators:
-        result["sma_20"] = ta.trend.sma_indicator(df['Close'], window=20).round(2).fillna(0).tolist()
-        result["sma_50"] = ta.trend.sma_indicator(df['Close'], window=50).round(2).fillna(0).tolist()
-        result["sma_200"] = ta.trend.sma_indicator(df['Close'], window=200).round(2).fillna(0).tolist()
-    
-    if "ema" in indicators:
-        result["ema_20"] = ta.trend.ema_indicator(df['Close'], window=20).round(2).fillna(0).tolist()
-        result["ema_50"] = ta.trend.ema_indicator(df['Close'], window=50).round(2).fillna(0).tolist()
-    
-    if "rsi" in indicators:
-        result["rsi_14"] = ta.momentum.rsi(df['Close'], window=14).round(2).fillna(0).tolist()
-    
-    if "macd" in indicators:
-        macd = ta.trend.MACD(df['Close'])
-        result["macd_line"] = macd.macd().round(2).fillna(0).tolist()
-        result["macd_signal"] = macd.macd_signal().round(2).fillna(0).tolist()
-        result["macd_histogram"] = macd.macd_diff().round(2).fillna(0).tolist()
-    
-    if "bollinger" in indicators:
-        bollinger = ta.volatility.BollingerBands(df['Close'])
-        result["bollinger_high"] = bollinger.bollinger_hband().round(2).fillna(0).tolist()
-        result["bollinger_mid"] = bollinger.bollinger_mavg().round(2).fillna(0).tolist()
-        result["bollinger_low"] = bollinger.bollinger_lband().round(2).fillna(0).tolist()
-    
-    return result
+NLP_ANALYSIS_PROMPT = """You are a financial analyst. Analyze the following stock data and answer the query.
 
-def analyze_with_nlp(query, symbols, period="1y"):
-    """Analyze stocks using NLP"""
-    all_data = {}
-    for symbol in symbols:
-        all_data[symbol] = get_stock_data(symbol, period)
+        Stock data:
+        {data_summary}
+
+        User request: {query}
+
+        Provide a detailed analysis based on the data. Include recommendations and conclusions if possible.
+        Do not fabricate information that is not in the data."""
+
+@timed("indicators")
+def calculate_technical_indicators(data, indicators, windows=None):
+    """Calculate technical indicators for a stock data frame or API records"""
+    df = data if isinstance(data, pd.DataFrame) else records_to_frame(data)
+    matrix = compute_indicator_matrix(df['Close'].to_numpy(), indicators, windows)
+    return indicator_lists(matrix)
+
+@timed("indicators")
+def calculate_technical_indicators_many(frames, indicators, windows=None):
+    """Calculate technical indicators for several stock data frames in one vectorized pass"""
+    symbols = list(frames)
+    closes = [frames[symbol]['Close'].to_numpy() for symbol in symbols]
+    matrix = compute_indicator_matrix(right_aligned_matrix(closes), indicators, windows)
+    return {
+        symbol: indicator_lists(matrix, column, len(closes[column]))
+        for column, symbol in enumerate(symbols)
+    }
+
+def summarize_stock_data(symbols, period="1y"):
+    """Summarize the price history of several stocks for the NLP prompt"""
+    all_data = get_stock_data_many(symbols, period)
     data_summary = ""
-    for symbol, data in all_data.items():
-        df = pd.DataFrame(data)
-        first_date = df['Date'].iloc[0]
-        last_date = df['Date'].iloc[-1]
+    for symbol, df in all_data.items():
+        first_date = df.index[0].strftime('%Y-%m-%d %H:%M:%S')
+        last_date = df.index[-1].strftime('%Y-%m-%d %H:%M:%S')
         start_price = df['Close'].iloc[0]
         end_price = df['Close'].iloc[-1]
         change_pct = ((end_price - start_price) / start_price) * 100
@@ -62,23 +51,12 @@ def analyze_with_nlp(query, symbols, period="1y"):
         data_summary += f"Highest price: ${df['High'].max():.2f}\n"
         data_summary += f"Lowest price: ${df['Low'].min():.2f}\n"
         data_summary += f"Average volume: {df['Volume'].mean():.0f}\n\n"
-    
-    llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    prompt = ChatPromptTemplate.from_template(
-        """You are a financial analyst. Analyze the following stock data and answer the query.
-
-        Stock data:
-        {data_summary}
-
-        User request: {query}
+    return data_summary
 
-        Provide a detailed analysis based on the data. Include recommendations and conclusions if possible.
-        Do not fabricate information that is not in the data."""
-    )
-    
-    chain = prompt | llm | StrOutputParser()
-    result = chain.invoke({"data_summary": data_summary, "query": query})
+def analyze_with_nlp(query, symbols, period="1y"):
+    """Analyze stocks using NLP"""
+    data_summary = summarize_stock_data(symbols, period)
+    result = cached_completion(NLP_ANALYSIS_PROMPT, {"data_summary": data_summary, "query": query})
     
     return {
         "query": query,
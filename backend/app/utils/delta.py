@@ -0,0 +1,66 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from app.utils.intervals import to_utc
+
+# Settled bars covered by a version; dividend and split adjustments rewrite all of them
+VERSION_WINDOW = 100
+
+_row_hashes = {}
+_lock = threading.Lock()
+
+def row_hashes(df):
+    """Hash every bar of a shared frame once, including its timestamp"""
+    key = id(df)
+    with _lock:
+        entry = _row_hashes.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    with _lock:
+        _row_hashes[key] = (weakref.ref(df), hashes)
+        weakref.finalize(df, _row_hashes.pop, key, None)
+    return hashes
+
+def _window_hash(hashes, position):
+    """Combine the hashes of the settled bars before a position"""
+    window = hashes[max(0, position - VERSION_WINDOW):position]
+    return int(np.bitwise_xor.reduce(window)) if len(window) else 0
+
+def _version_at(hashes, position):
+    return f"{_window_hash(hashes, position):016x}{int(hashes[position]):016x}"
+
+def data_version(df):
+    """Get the version marker of a frame's latest state: its last bar and the bars settled before it"""
+    if df.empty:
+        return None
+    return _version_at(row_hashes(df), len(df) - 1)
+
+def delta_frame(df, since, version=None):
+    """Get the bars a client holding everything up to `since` is missing.
+
+    Returns the bars after since, with the bar at since itself when it was revised, and whether the
+    client must reset because its settled bars no longer match (e.g. after a dividend adjustment).
+    Without a version the bar at since is always resent.
+    """
+    if version is not None and len(version) != 32:
+        raise ValueError("Invalid version")
+    since = pd.Timestamp(since)
+    if since.tz is None and df.index.tz is not None:
+        # Naive timestamps are exchange times, like the dates of the records format
+        since = since.tz_localize(df.index.tz)
+    since = to_utc(since)
+    dates = df.index.tz_convert("UTC") if df.index.tz is not None else df.index.tz_localize("UTC")
+    position = int(dates.searchsorted(since))
+    if position == len(df) or dates[position] != since:
+        # The client's last bar is no longer part of the period
+        return df, True
+    if version is None:
+        return df.iloc[position:], False
+    hashes = row_hashes(df)
+    if version[:16] != f"{_window_hash(hashes, position):016x}":
+        return df, True
+    if version[16:] != f"{int(hashes[position]):016x}":
+        return df.iloc[position:], False
+    return df.iloc[position + 1:], False
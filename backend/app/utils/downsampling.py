@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+DOWNSAMPLE_METHODS = ["lttb", "minmax"]
+MIN_POINTS = 3
+
+def validate_downsampling(max_points, method):
+    """Check the max_points and downsample options of a request"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}. Supported methods: {', '.join(DOWNSAMPLE_METHODS)}")
+    if max_points is not None and max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+
+def _filled(values):
+    """Replace NaN so that it never wins a bucket"""
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    if missing.any():
+        values = np.where(missing, np.nanmean(values) if not missing.all() else 0.0, values)
+    return values
+
+def lttb_indices(x, y, max_points):
+    """Pick at most max_points indices with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Every bucket in between keeps the point forming
+    the largest triangle with the previously kept point and the average of the next bucket.
+    """
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = _filled(y)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    edges = np.append(edges, n)
+    # Bucket averages from cumulative sums
+    sums_x = np.concatenate([[0.0], np.cumsum(x)])
+    sums_y = np.concatenate([[0.0], np.cumsum(y)])
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        count = next_end - end
+        average_x = (sums_x[next_end] - sums_x[end]) / count
+        average_y = (sums_y[next_end] - sums_y[end]) / count
+        area = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax_indices(low, high=None, max_points=1000):
+    """Pick at most max_points indices keeping the minimum and maximum of every bucket.
+
+    The envelope keeps every spike visible, which LTTB can smooth away. With separate low and
+    high series (e.g. Low and High prices) the minimum comes from low and the maximum from high.
+    """
+    n = len(low)
+    if max_points >= n:
+        return np.arange(n)
+    low = np.asarray(low, dtype=float)
+    high = low if high is None else np.asarray(high, dtype=float)
+    lows = np.where(np.isnan(low), np.inf, low)
+    highs = np.where(np.isnan(high), -np.inf, high)
+    buckets = (max_points - 2) // 2
+    if buckets == 0:
+        # Room for one extreme only: keep the one farther from the mean
+        lowest, highest = int(lows.argmin()), int(highs.argmax())
+        values = np.concatenate([low, high])
+        mean = np.nanmean(values) if not np.isnan(values).all() else 0.0
+        extreme = highest if highs[highest] - mean >= mean - lows[lowest] else lowest
+        return np.unique([0, extreme, n - 1])
+    group = np.arange(n) * buckets // n
+    bucket_starts = np.flatnonzero(np.diff(group, prepend=-1))
+    minima = np.lexsort((lows, group))[bucket_starts]
+    maxima = np.lexsort((-highs, group))[bucket_starts]
+    return np.unique(np.concatenate([[0, n - 1], minima, maxima]))
+
+def downsample_indices(y, max_points, method="lttb", x=None, low=None, high=None):
+    """Pick the indices of a series to keep when plotting it with at most max_points points"""
+    if max_points is None or max_points >= len(y):
+        return None
+    if method == "minmax":
+        return minmax_indices(y if low is None else low, high, max_points)
+    return lttb_indices(np.arange(len(y)) if x is None else x, y, max_points)
+
+def frame_indices(df, max_points, method="lttb"):
+    """Pick the bars of a stock frame to keep, from Close or, for min/max, the Low/High envelope"""
+    if max_points is None or max_points >= len(df):
+        return None
+    x = pd.DatetimeIndex(df.index).asi8
+    if method == "minmax" and "Low" in df.columns and "High" in df.columns:
+        return minmax_indices(df['Low'].to_numpy(), df['High'].to_numpy(), max_points)
+    return downsample_indices(df['Close'].to_numpy(), max_points, method, x)
+
+def downsample_frame(df, max_points, method="lttb"):
+    """Keep at most max_points bars of a stock frame"""
+    indices = frame_indices(df, max_points, method)
+    return df if indices is None else df.iloc[indices]
+
+def take(values, indices, length):
+    """Keep the selected points of every series of a chart item, leaving other values untouched"""
+    if indices is None:
+        return values
+    if isinstance(values, dict):
+        return {key: take(value, indices, length) for key, value in values.items()}
+    if isinstance(values, list) and len(values) == length:
+        return [values[i] for i in indices]
+    return values
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import pandas as pd
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.utils.data_collector import data_ttl, RANGE_TTL_SECONDS
+from app.utils.delta import row_hashes
+from app.utils.intervals import to_utc
+from app.utils.metrics import stage_seconds
+
+STATIC_MAX_AGE = 3600
+
+def frame_hash(df):
+    """Hash every bar of a shared frame, reusing the row hashes computed for delta sync"""
+    hashes = row_hashes(df)
+    return f"{int(hashes.sum(dtype='uint64')):016x}-{len(hashes)}"
+
+def make_etag(*parts):
+    """Build a strong ETag from the request and the version of the data it reads"""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag, with weak comparison as RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag.removeprefix("W/") for tag in candidates]
+
+def max_age(interval, end=None):
+    """Get how long a response over bars of an interval may be reused"""
+    if end is not None and to_utc(end) <= pd.Timestamp.now(tz="UTC"):
+        return RANGE_TTL_SECONDS
+    return data_ttl(interval)
+
+def cache_headers(etag, seconds):
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={seconds}",
+        # The response format can be negotiated through Accept
+        "Vary": "Accept",
+    }
+
+def not_modified(etag, seconds):
+    """Answer a matching conditional request without a body"""
+    return Response(status_code=304, headers=cache_headers(etag, seconds))
+
+def cached_response(content, etag, seconds):
+    """Attach cache headers to a service result, encoding plain results as JSON"""
+    if isinstance(content, Response):
+        response = content
+    else:
+        with stage_seconds.time("serialization"):
+            response = JSONResponse(jsonable_encoder(content))
+    response.headers.update(cache_headers(etag, seconds))
+    return response
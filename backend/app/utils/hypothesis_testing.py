@@ -1,18 +1,22 @@
-import pandas as pd
 import numpy as np
 from scipy import stats
-from app.utils.data_collector import get_stock_data
+from app.utils.data_collector import get_stock_data_many
+from app.utils.metrics import timed
+from app.utils.resampling import batch_statistic, bootstrap_interval, default_block_length, permutation_test
+from app.utils.returns import return_matrix
+from app.utils.serialization import column_values
 
 def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
     """Run a statistical hypothesis test"""
-    all_data = {}
-    for symbol in symbols:
-        data = get_stock_data(symbol, period)
-        df = pd.DataFrame(data)
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        df['Returns'] = df['Close'].pct_change().fillna(0)
-        all_data[symbol] = df
+    return _hypothesis_test(get_stock_data_many(symbols, period), symbols, test_type, period, alpha)
+
+@timed("tests")
+def _hypothesis_test(stock_data, symbols, test_type, period, alpha):
+    """Run a statistical hypothesis test on loaded stock data"""
+    all_returns = {
+        symbol: df['Close'].pct_change().fillna(0)
+        for symbol, df in stock_data.items()
+    }
 
     result = {
         "test_type": test_type,
@@ -31,7 +35,7 @@ def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
                 raise ValueError("A normality test requires one symbol")
 
             symbol = symbols[0]
-            returns = all_data[symbol]['Returns'].dropna().values
+            returns = all_returns[symbol].dropna().values
 
             statistic, p_value = stats.shapiro(returns)
 
@@ -48,10 +52,11 @@ def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
                 raise ValueError("A correlation test requires two symbols")
 
             symbol1, symbol2 = symbols
-            returns1 = all_data[symbol1]['Returns'].values
-            returns2 = all_data[symbol2]['Returns'].values
+            aligned = return_matrix(stock_data)
+            if len(aligned) < 3:
+                raise ValueError(f"{symbol1} and {symbol2} have too few common trading days")
 
-            correlation, p_value = stats.pearsonr(returns1, returns2)
+            correlation, p_value = stats.pearsonr(aligned[symbol1].values, aligned[symbol2].values)
 
             result["result"] = correlation
             result["p_value"] = p_value
@@ -67,8 +72,8 @@ def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
                 raise ValueError("A mean comparison test requires two symbols")
 
             symbol1, symbol2 = symbols
-            returns1 = all_data[symbol1]['Returns'].dropna().values
-            returns2 = all_data[symbol2]['Returns'].dropna().values
+            returns1 = all_returns[symbol1].dropna().values
+            returns2 = all_returns[symbol2].dropna().values
 
             statistic, p_value = stats.ttest_ind(returns1, returns2, equal_var=False)
 
@@ -93,3 +98,195 @@ def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
         result["error"] = str(e)
 
     return result
+
+def pairwise_correlation(returns):
+    """Pearson correlations and two-sided p-values of every pair of columns.
+
+    NaN cells are skipped pair by pair, so each pair uses the dates on which both symbols traded.
+    """
+    x = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(x)
+    mask = valid.astype(float)
+    # Centering first keeps the sums of squares precise
+    centered = np.where(valid, x - np.nanmean(x, axis=0), 0.0)
+    n = mask.T @ mask
+    sums = centered.T @ mask
+    squares = (centered * centered).T @ mask
+    products = centered.T @ centered
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products - sums * sums.T / n
+        variance = squares - sums * sums / n
+        r = np.clip(covariance / np.sqrt(variance * variance.T), -1.0, 1.0)
+        dof = n - 2
+        t = r * np.sqrt(dof / (1 - r * r))
+    p_value = 2 * stats.t.sf(np.abs(t), dof)
+    return r, p_value, n
+
+def pairwise_welch(returns):
+    """Welch t statistics and two-sided p-values of the mean difference of every pair of columns"""
+    x = returns.to_numpy(dtype=float)
+    n = (~np.isnan(x)).sum(axis=0)
+    means = np.nanmean(x, axis=0)
+    squared_errors = np.nanvar(x, axis=0, ddof=1) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = squared_errors[:, None] + squared_errors[None, :]
+        t = (means[:, None] - means[None, :]) / np.sqrt(denominator)
+        dof = denominator ** 2 / (
+            squared_errors[:, None] ** 2 / (n[:, None] - 1)
+            + squared_errors[None, :] ** 2 / (n[None, :] - 1)
+        )
+    p_value = 2 * stats.t.sf(np.abs(t), dof)
+    return t, p_value, means
+
+def run_pairwise_tests(symbols, test_type, period="1y", alpha=0.05, join="inner"):
+    """Run a hypothesis test for every symbol or every pair of symbols at once"""
+    result = {
+        "test_type": test_type,
+        "symbols": symbols,
+        "period": period,
+        "alpha": alpha,
+        "join": join
+    }
+
+    try:
+        stock_data = get_stock_data_many(symbols, period)
+        _pairwise_tests(result, stock_data, symbols, test_type, alpha, join)
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
+
+@timed("tests")
+def _pairwise_tests(result, stock_data, symbols, test_type, alpha, join):
+    """Fill in the results of a pairwise test on loaded stock data"""
+    returns = return_matrix(stock_data, join)[symbols]
+    result["observations"] = len(returns)
+
+    if test_type == "normality":
+        statistic, p_value = stats.shapiro(returns.to_numpy(), axis=0, nan_policy="omit")
+        result["per_symbol"] = {
+            "statistic": column_values(statistic),
+            "p_value": column_values(p_value),
+            "normal": (p_value > alpha).tolist()
+        }
+        return
+
+    if test_type == "correlation":
+        statistic, p_value, counts = pairwise_correlation(returns)
+    elif test_type == "mean_comparison":
+        statistic, p_value, means = pairwise_welch(returns)
+        result["means"] = column_values(means)
+    else:
+        raise ValueError(f"Unknown test type: {test_type}")
+
+    first, second = np.triu_indices(len(symbols), 1)
+    pair_p_values = p_value[first, second]
+    result["pairs"] = {
+        "first": first.tolist(),
+        "second": second.tolist(),
+        "statistic": column_values(statistic[first, second]),
+        "p_value": column_values(pair_p_values),
+        "significant": (pair_p_values < alpha).tolist()
+    }
+    if test_type == "correlation":
+        result["pairs"]["observations"] = counts[first, second].astype(int).tolist()
+
+RESAMPLING_STATISTICS = {
+    "mean_comparison": "mean_difference",
+    "correlation": "correlation",
+    "sharpe": "sharpe",
+}
+
+def run_resampling_test(symbols, test_type, period="1y", alpha=0.05, n_resamples=10000, seed=None, block_length=None):
+    """Run a permutation test with a block-bootstrap confidence interval"""
+    result = {
+        "test_type": test_type,
+        "method": "resampling",
+        "symbols": symbols,
+        "period": period,
+        "alpha": alpha,
+        "result": None,
+        "p_value": None,
+        "statistic": None,
+        "conclusion": None
+    }
+
+    try:
+        if test_type not in RESAMPLING_STATISTICS:
+            raise ValueError(
+                f"Resampling supports the {', '.join(RESAMPLING_STATISTICS)} tests, not {test_type}"
+            )
+        statistic = RESAMPLING_STATISTICS[test_type]
+        if len(symbols) != 2 and not (statistic == "sharpe" and len(symbols) == 1):
+            raise ValueError(
+                "A resampling test requires two symbols" + (" (or one for sharpe)" if statistic == "sharpe" else "")
+            )
+
+        stock_data = get_stock_data_many(symbols, period)
+        _resampling_test(result, stock_data, symbols, statistic, alpha, n_resamples, seed, block_length)
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
+
+@timed("tests")
+def _resampling_test(result, stock_data, symbols, statistic, alpha, n_resamples, seed, block_length):
+    """Fill in the results of a resampling test on loaded stock data"""
+    returns = return_matrix(stock_data)
+    a = returns[symbols[0]].values
+    b = returns[symbols[1]].values if len(symbols) == 2 else None
+    seeds = np.random.SeedSequence(seed)
+    permutation_seed, bootstrap_seed = seeds.spawn(2)
+
+    low, high, distribution = bootstrap_interval(
+        statistic, a, b, n_resamples, 1 - alpha, bootstrap_seed, block_length
+    )
+    if b is not None:
+        observed, p_value = permutation_test(statistic, a, b, n_resamples, permutation_seed)
+    else:
+        # A single Sharpe ratio has no labels to permute, so its p-value comes from the bootstrap
+        observed = float(batch_statistic(statistic, a))
+        p_value = float(min(1.0, 2 * min(np.mean(distribution <= 0), np.mean(distribution >= 0))))
+
+    significant = p_value < alpha
+    result["statistic"] = observed
+    result["p_value"] = p_value
+    result["confidence_interval"] = [low, high]
+    result["n_resamples"] = n_resamples
+    result["block_length"] = block_length or default_block_length(len(a))
+    result["seed"] = seeds.entropy
+    result["observations"] = len(a)
+
+    interval = f"{(1 - alpha) * 100:g}% confidence interval [{low:.4f}, {high:.4f}]"
+    if statistic == "mean_difference":
+        result["mean1"] = float(a.mean())
+        result["mean2"] = float(b.mean())
+        result["result"] = "different" if significant else "not_different"
+        result["conclusion"] = (
+            f"The mean daily return of {symbols[0]} exceeds that of {symbols[1]} by {observed:.6f} "
+            f"({interval}). The difference {'is' if significant else 'is not'} significant "
+            f"in a permutation test at significance level {alpha}."
+        )
+    elif statistic == "correlation":
+        result["result"] = observed
+        result["conclusion"] = (
+            f"Correlation between returns of {symbols[0]} and {symbols[1]} is {observed:.4f} ({interval}). "
+            f"This correlation is {'statistically significant' if significant else 'not statistically significant'} "
+            f"in a permutation test at significance level {alpha}."
+        )
+    elif b is not None:
+        result["result"] = "different" if significant else "not_different"
+        result["conclusion"] = (
+            f"The annualized Sharpe ratio of {symbols[0]} exceeds that of {symbols[1]} by {observed:.4f} "
+            f"({interval}). The difference {'is' if significant else 'is not'} significant "
+            f"in a permutation test at significance level {alpha}."
+        )
+    else:
+        result["result"] = "positive" if significant and observed > 0 else (
+            "negative" if significant else "not_significant"
+        )
+        result["conclusion"] = (
+            f"The annualized Sharpe ratio of {symbols[0]} is {observed:.4f} ({interval}). "
+            f"It {'differs' if significant else 'does not differ'} significantly from zero "
+            f"at significance level {alpha}."
+        )
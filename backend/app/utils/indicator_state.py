@@ -0,0 +1,424 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from pymongo import ASCENDING, UpdateMany
+from pymongo.errors import PyMongoError
+from app.utils import bar_store
+from app.utils.cache import TTLCache, approx_size
+from app.utils.indicators import resolve_windows
+from app.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = "indicator_state"
+SERIES_COLLECTION = "indicator_series"
+STATE_TTL_SECONDS = 24 * 3600
+# Stored series are split into chunks of this many bars, so appending rewrites only the last ones
+CHUNK_BARS = 1024
+
+
+def _entry_size(entry):
+    """Estimate the memory of a saved history from its dates and series"""
+    return approx_size(entry["dates"]) + sum(approx_size(values) for values in entry["series"].values())
+
+_state_cache = TTLCache(
+    "indicator_state",
+    max_entries=1024,
+    max_bytes=int(os.getenv("INDICATOR_STATE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sizeof=_entry_size
+)
+# Histories are locked in stripes, so the locks do not grow with the keys
+_locks = [threading.Lock() for _ in range(64)]
+_indexed = False
+
+class _Ewm:
+    """Running exponentially weighted mean (adjust=False) that reproduces the batch linear filter"""
+
+    def __init__(self, alpha, min_periods, z=None, seen=0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.z = None if z is None else np.array(z, dtype=float)
+        self.seen = seen
+
+    def update(self, values):
+        """Filter values that all come after the first valid observation"""
+        if len(values) == 0:
+            return np.array([])
+        if self.z is None:
+            self.z = (1 - self.alpha) * values[:1]
+        out, self.z = lfilter([self.alpha], [1, self.alpha - 1], values, zi=self.z)
+        position = self.seen + np.arange(len(values))
+        out[position < self.min_periods - 1] = np.nan
+        self.seen += len(values)
+        return out
+
+    def to_dict(self):
+        return {"z": None if self.z is None else self.z.tolist(), "seen": self.seen}
+
+def _ffill(previous, values):
+    """Forward-fill NaN gaps in values, carrying over the previous chunk's last value"""
+    values = np.concatenate([[previous], values])
+    missing = np.isnan(values)
+    if missing.any():
+        index = np.where(missing, 0, np.arange(len(values)))
+        values = values[np.maximum.accumulate(index)]
+    return values[1:]
+
+class IndicatorState:
+    """Resumable indicator state updated in O(new bars).
+
+    Feeding a close series through update() in any number of chunks yields exactly
+    what compute_indicator_matrix returns for the whole series at once.
+    """
+
+    def __init__(self, indicators, windows=None):
+        self.windows = resolve_windows(indicators, windows)
+        sum_windows = list(self.windows.get("sma", []))
+        if "bollinger" in self.windows:
+            sum_windows.append(self.windows["bollinger"][0])
+        self.lookback = max(sum_windows, default=0)
+        self.n = 0
+        self.started = False
+        self.center = 0.0
+        # Trailing cumulative sums, squares and counts, starting with the zero row
+        self.sums = [0.0]
+        self.squares = [0.0]
+        self.counts = [0.0]
+        self.last_raw = np.nan
+        self.last_close = np.nan
+        self.last_up = np.nan
+        self.last_down = np.nan
+
+        spans = set(self.windows.get("ema", []))
+        if "macd" in self.windows:
+            spans.update(self.windows["macd"][:2])
+        self.emas = {span: _Ewm(2 / (span + 1), span) for span in sorted(spans)}
+        self.rsi = {
+            window: (_Ewm(1 / window, window), _Ewm(1 / window, window))
+            for window in self.windows.get("rsi", [])
+        }
+        self.signal = None
+        if "macd" in self.windows:
+            signal = self.windows["macd"][2]
+            self.signal = _Ewm(2 / (signal + 1), signal)
+
+    def _window_means(self, sums, counts, window, new):
+        """Rolling means of the last `new` rows from trailing cumulative sums"""
+        out = np.full(new, np.nan)
+        end = len(sums)
+        rows = np.arange(end - new, end)
+        ok = rows - window >= 0
+        if ok.any():
+            current = rows[ok]
+            out[ok] = sums[current] - sums[current - window]
+            out[ok] /= window
+            partial = np.zeros(new, dtype=bool)
+            partial[ok] = (counts[current] - counts[current - window]) != window
+            out[partial] = np.nan
+        return out
+
+    def update(self, closes):
+        """Append closes and return the new indicator values keyed like compute_indicator_matrix"""
+        x = np.asarray(closes, dtype=float)
+        m = len(x)
+        valid = ~np.isnan(x)
+        before = 0
+        starting = not self.started
+        if starting:
+            before = int(valid.argmax()) if valid.any() else m
+            if before < m:
+                self.started = True
+                self.center = float(x[before])
+        result = {}
+
+        if self.lookback:
+            centered = np.nan_to_num(x - self.center)
+            sums = np.cumsum(np.concatenate([[self.sums[-1]], centered]))[1:]
+            squares = np.cumsum(np.concatenate([[self.squares[-1]], centered * centered]))[1:]
+            counts = np.cumsum(np.concatenate([[self.counts[-1]], valid.astype(float)]))[1:]
+            all_sums = np.concatenate([self.sums, sums])
+            all_squares = np.concatenate([self.squares, squares])
+            all_counts = np.concatenate([self.counts, counts])
+            means = {}
+            for window in self.windows.get("sma", []):
+                means[window] = self._window_means(all_sums, all_counts, window, m)
+                result[f"sma_{window}"] = means[window] + self.center
+            self.sums = all_sums[-self.lookback:].tolist()
+            self.squares = all_squares[-self.lookback:].tolist()
+            self.counts = all_counts[-self.lookback:].tolist()
+
+        # Forward-fill interior gaps the way the batch filters do
+        filled = _ffill(self.last_close, x)
+        started_values = filled[before:]
+        emas = {}
+        for span, ewm in self.emas.items():
+            emas[span] = np.concatenate([np.full(before, np.nan), ewm.update(started_values)])
+        for window in self.windows.get("ema", []):
+            result[f"ema_{window}"] = emas[window]
+
+        if self.rsi:
+            diff = np.diff(np.concatenate([[self.last_raw], x]))
+            if starting and before < m:
+                diff[before] = 0.0
+            up = np.where(diff > 0, diff, 0.0)
+            down = np.where(diff < 0, -diff, 0.0)
+            up[np.isnan(diff)] = np.nan
+            down[np.isnan(diff)] = np.nan
+            up = _ffill(self.last_up, up)
+            down = _ffill(self.last_down, down)
+            for window, (ewm_up, ewm_down) in self.rsi.items():
+                mean_up = np.concatenate([np.full(before, np.nan), ewm_up.update(up[before:])])
+                mean_down = np.concatenate([np.full(before, np.nan), ewm_down.update(down[before:])])
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rsi = np.where(mean_down == 0, 100.0, 100 - 100 / (1 + mean_up / mean_down))
+                rsi[np.isnan(mean_down)] = np.nan
+                result[f"rsi_{window}"] = rsi
+            if m:
+                self.last_up = up[-1]
+                self.last_down = down[-1]
+
+        if self.signal is not None:
+            fast, slow, _ = self.windows["macd"]
+            macd_line = emas[fast] - emas[slow]
+            skip = 0
+            if self.signal.z is None:
+                # The signal line starts at the first defined MACD value
+                macd_valid = ~np.isnan(macd_line)
+                skip = int(macd_valid.argmax()) if macd_valid.any() else m
+            macd_signal = np.concatenate([np.full(skip, np.nan), self.signal.update(macd_line[skip:])])
+            result["macd_line"] = macd_line
+            result["macd_signal"] = macd_signal
+            result["macd_histogram"] = macd_line - macd_signal
+
+        if "bollinger" in self.windows:
+            window, deviations = self.windows["bollinger"]
+            mean = means.get(window)
+            if mean is None:
+                mean = self._window_means(all_sums, all_counts, window, m)
+            variance = self._window_means(all_squares, all_counts, window, m) - mean * mean
+            std = np.sqrt(np.maximum(variance, 0))
+            result["bollinger_high"] = mean + self.center + deviations * std
+            result["bollinger_mid"] = mean + self.center
+            result["bollinger_low"] = mean + self.center - deviations * std
+
+        if m:
+            self.last_raw = x[-1]
+            self.last_close = filled[-1]
+        self.n += m
+        return result
+
+    def to_dict(self):
+        """Serialize the state for persistence"""
+        return {
+            "windows": self.windows,
+            "n": self.n,
+            "started": self.started,
+            "center": self.center,
+            "sums": list(self.sums),
+            "squares": list(self.squares),
+            "counts": list(self.counts),
+            "last_raw": _encode_float(self.last_raw),
+            "last_close": _encode_float(self.last_close),
+            "last_up": _encode_float(self.last_up),
+            "last_down": _encode_float(self.last_down),
+            "emas": {str(span): ewm.to_dict() for span, ewm in self.emas.items()},
+            "rsi": {str(window): [up.to_dict(), down.to_dict()] for window, (up, down) in self.rsi.items()},
+            "signal": self.signal.to_dict() if self.signal is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a state serialized with to_dict"""
+        windows = data["windows"]
+        state = cls(list(windows), windows)
+        state.n = data["n"]
+        state.started = data["started"]
+        state.center = data["center"]
+        state.sums = list(data["sums"])
+        state.squares = list(data["squares"])
+        state.counts = list(data["counts"])
+        state.last_raw = _decode_float(data["last_raw"])
+        state.last_close = _decode_float(data["last_close"])
+        state.last_up = _decode_float(data["last_up"])
+        state.last_down = _decode_float(data["last_down"])
+        for span, ewm in state.emas.items():
+            saved = data["emas"][str(span)]
+            state.emas[span] = _Ewm(ewm.alpha, ewm.min_periods, saved["z"], saved["seen"])
+        for window, (up, down) in state.rsi.items():
+            saved_up, saved_down = data["rsi"][str(window)]
+            state.rsi[window] = (
+                _Ewm(up.alpha, up.min_periods, saved_up["z"], saved_up["seen"]),
+                _Ewm(down.alpha, down.min_periods, saved_down["z"], saved_down["seen"]),
+            )
+        if state.signal is not None:
+            saved = data["signal"]
+            state.signal = _Ewm(state.signal.alpha, state.signal.min_periods, saved["z"], saved["seen"])
+        return state
+
+def _encode_float(value):
+    return None if np.isnan(value) else float(value)
+
+def _decode_float(value):
+    return np.nan if value is None else value
+
+def _rounded(result):
+    """Round new indicator values to 2 decimals and fill undefined values with 0, as the batch lists do"""
+    return {
+        name: np.nan_to_num(np.round(values, 2), nan=0.0).tolist()
+        for name, values in result.items()
+    }
+
+def _state_key(symbol, interval, windows, first_ts):
+    # The first bar is part of the key: the filters are seeded there, as in a batch over the frame
+    return f"{symbol.upper()}|{interval}|{first_ts}|{json.dumps(windows, sort_keys=True)}"
+
+def _key_lock(key):
+    return _locks[hash(key) % len(_locks)]
+
+def _database():
+    """Get the bar store database with the expiry indexes of the saved histories, or None"""
+    global _indexed
+    db = bar_store.get_database()
+    if db is not None and not _indexed:
+        # MongoDB removes histories once expires_at has passed
+        db[STATE_COLLECTION].create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        db[SERIES_COLLECTION].create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        _indexed = True
+    return db
+
+def _now():
+    return pd.Timestamp.now(tz="UTC").tz_localize(None).to_pydatetime()
+
+def _load_entry(key):
+    """Get a saved indicator history from memory or the bar store"""
+    entry = _state_cache.get(key)
+    if entry is not None:
+        return entry
+    db = _database()
+    if db is None:
+        return None
+    try:
+        doc = db[STATE_COLLECTION].find_one({"_id": key, "expires_at": {"$gt": _now()}})
+        if doc is None:
+            return None
+        chunks = list(db[SERIES_COLLECTION].find({"key": key}).sort("chunk", ASCENDING))
+    except PyMongoError as e:
+        logger.warning("Indicator state unavailable for %s: %s", key, e)
+        return None
+    n = doc["n"]
+    dates = [ts for chunk in chunks for ts in chunk["dates"]][:n]
+    if len(dates) != n:
+        return None
+    entry = {
+        "state": doc["state"],
+        "dates": dates,
+        "series": {
+            name: [value for chunk in chunks for value in chunk["series"][name]][:n]
+            for name in chunks[0]["series"]
+        },
+    }
+    _state_cache.set(key, entry, STATE_TTL_SECONDS)
+    return entry
+
+def _save_entry(key, entry, first):
+    """Keep an indicator history in memory and write the bar store chunks holding bars from `first` on"""
+    _state_cache.set(key, entry, STATE_TTL_SECONDS)
+    db = _database()
+    if db is None:
+        return
+    n = len(entry["dates"])
+    expires_at = _now() + pd.Timedelta(seconds=STATE_TTL_SECONDS).to_pytimedelta()
+    operations = []
+    for chunk in range(first // CHUNK_BARS, -(-n // CHUNK_BARS)):
+        rows = slice(chunk * CHUNK_BARS, (chunk + 1) * CHUNK_BARS)
+        # UpdateMany on _id acts as UpdateOne and keeps bulk upserts mongomock-compatible
+        operations.append(UpdateMany({"_id": f"{key}|{chunk}"}, {"$set": {
+            "key": key,
+            "chunk": chunk,
+            "dates": entry["dates"][rows],
+            "series": {name: values[rows] for name, values in entry["series"].items()},
+            "expires_at": expires_at,
+        }}, upsert=True))
+    try:
+        if first == 0:
+            db[SERIES_COLLECTION].delete_many({"key": key})
+        elif first // CHUNK_BARS:
+            # Chunks that were not rewritten expire with the rest of the history
+            db[SERIES_COLLECTION].update_many(
+                {"key": key, "chunk": {"$lt": first // CHUNK_BARS}}, {"$set": {"expires_at": expires_at}}
+            )
+        if operations:
+            db[SERIES_COLLECTION].bulk_write(operations, ordered=False)
+        # The state is written last, so a reader never finds fewer stored bars than it counts
+        db[STATE_COLLECTION].replace_one(
+            {"_id": key}, {"_id": key, "n": n, "state": entry["state"], "expires_at": expires_at}, upsert=True
+        )
+    except PyMongoError as e:
+        logger.warning("Could not save indicator state for %s: %s", key, e)
+
+def _overlap(entry, dates, closes):
+    """Locate the history's last bar in a frame starting with the same bar.
+
+    Returns None when the frame does not continue the history, e.g. when it ends before it or
+    its closes were adjusted since.
+    """
+    history = entry["dates"]
+    last = len(history) - 1
+    if last < 0 or last >= len(dates) or dates[last] != history[-1]:
+        return None
+    if _encode_float(closes[last]) != entry["state"]["last_raw"]:
+        return None
+    return last
+
+@timed("indicators")
+def incremental_indicators(symbol, interval, df, indicators, windows=None):
+    """Calculate technical indicators for a stock frame, resuming from the saved history of the frame.
+
+    A history is kept per symbol, interval, windows and first bar, so a frame that grows from the
+    same start, e.g. a max period or a range with a fixed start, only processes the bars appended
+    since the last call and only rewrites the stored chunks they fall into. The values always equal
+    those of calculate_technical_indicators over the frame. The last bar is treated as provisional
+    because it may still be revised, so it is never committed. A frame that no longer matches its
+    history, e.g. after a dividend adjustment, starts a new one.
+    """
+    resolved = resolve_windows(indicators, windows)
+    closes = df['Close'].to_numpy(dtype=float)
+    if len(closes) < 2:
+        return _rounded(IndicatorState(list(resolved), resolved).update(closes))
+
+    dates = df.index.asi8.tolist()
+    key = _state_key(symbol, interval, resolved, dates[0])
+    with _key_lock(key):
+        entry = _load_entry(key)
+        last = _overlap(entry, dates, closes) if entry is not None else None
+        if last is None:
+            last = -1
+            entry = {"dates": [], "series": {}}
+            state = IndicatorState(list(resolved), resolved)
+        else:
+            state = IndicatorState.from_dict(entry["state"])
+
+        committed = len(closes) - 1
+        if last < committed:
+            first = len(entry["dates"])
+            new = _rounded(state.update(closes[last + 1:committed]))
+            entry["dates"].extend(dates[last + 1:committed])
+            for name, values in new.items():
+                entry["series"].setdefault(name, []).extend(values)
+            entry["state"] = state.to_dict()
+            _save_entry(key, entry, first)
+
+        # The history may already hold the frame's last bar when another frame committed it
+        provisional = _rounded(state.update(closes[committed:])) if last < committed else None
+        result = {}
+        for name, values in entry["series"].items():
+            if provisional is None:
+                result[name] = values[:committed + 1]
+            else:
+                result[name] = values[:committed]
+                result[name].extend(provisional[name])
+        return result
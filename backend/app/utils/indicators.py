@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+DEFAULT_WINDOWS = {
+    "sma": [20, 50, 200],
+    "ema": [20, 50],
+    "rsi": [14],
+    "macd": [12, 26, 9],
+    "bollinger": [20, 2],
+}
+
+INDICATORS = list(DEFAULT_WINDOWS)
+
+def resolve_windows(indicators, windows=None):
+    """Merge custom indicator windows over the defaults and validate them"""
+    resolved = {}
+    for name in indicators:
+        if name not in DEFAULT_WINDOWS:
+            continue
+        values = list((windows or {}).get(name) or DEFAULT_WINDOWS[name])
+        if name == "macd" and len(values) != 3:
+            raise ValueError("MACD windows must be [fast, slow, signal]")
+        if name == "bollinger" and len(values) != 2:
+            raise ValueError("Bollinger windows must be [window, deviations]")
+        integer_values = values if name != "bollinger" else values[:1]
+        if any(int(v) != v or v < 1 for v in integer_values):
+            raise ValueError(f"{name} windows must be positive integers")
+        resolved[name] = [int(v) for v in integer_values] + values[len(integer_values):]
+    return resolved
+
+def right_aligned_matrix(series_list):
+    """Stack price series of different lengths into a (time x symbols) matrix aligned on their last bar"""
+    length = max((len(s) for s in series_list), default=0)
+    matrix = np.full((length, len(series_list)), np.nan)
+    for j, series in enumerate(series_list):
+        values = np.asarray(series, dtype=float)
+        if len(values):
+            matrix[length - len(values):, j] = values
+    return matrix
+
+def _first_valid(x):
+    """Get the first non-NaN row of every column (len(x) for empty columns)"""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+def _offset_groups(first_valid, length):
+    """Group columns that start at the same row"""
+    groups = {}
+    for j, offset in enumerate(first_valid):
+        if offset < length:
+            groups.setdefault(int(offset), []).append(j)
+    # Contiguous groups index with a slice to avoid copying through fancy indexing
+    return [
+        (offset, slice(cols[0], cols[-1] + 1) if cols[-1] - cols[0] + 1 == len(cols) else cols)
+        for offset, cols in groups.items()
+    ]
+
+def _ewm(x, alpha, min_periods, first_valid):
+    """Exponentially weighted mean (adjust=False) of every column from its first valid row"""
+    out = np.full_like(x, np.nan)
+    for offset, cols in _offset_groups(first_valid, len(x)):
+        block = x[offset:, cols]
+        if np.isnan(block).any():
+            block = pd.DataFrame(block).ffill().to_numpy()
+        zi = (1 - alpha) * block[:1]
+        out[offset:, cols], _ = lfilter([alpha], [1, alpha - 1], block, axis=0, zi=zi)
+        out[offset:offset + min_periods - 1, cols] = np.nan
+    return out
+
+def _rolling_sums(x, first_valid):
+    """Cumulative sums of values and squares, centred on each column's first value for precision"""
+    center = np.array([
+        x[offset, j] if offset < len(x) else 0.0
+        for j, offset in enumerate(first_valid)
+    ])
+    centered = np.nan_to_num(x - center)
+    zero = np.zeros((1, x.shape[1]))
+    sums = np.vstack([zero, np.cumsum(centered, axis=0)])
+    squares = np.vstack([zero, np.cumsum(centered * centered, axis=0)])
+    counts = np.vstack([zero, np.cumsum(~np.isnan(x), axis=0)])
+    return center, sums, squares, counts
+
+def _window_mean(sums, counts, window):
+    """Rolling mean of a window from cumulative sums, NaN until the window is full"""
+    out = np.full((len(sums) - 1, sums.shape[1]), np.nan)
+    if window <= len(out):
+        np.subtract(sums[window:], sums[:-window], out=out[window - 1:])
+        out[window - 1:] /= window
+        partial = (counts[window:] - counts[:-window]) != window
+        if partial.any():
+            out[window - 1:][partial] = np.nan
+    return out
+
+def compute_indicator_matrix(close, indicators, windows=None):
+    """Compute indicators for a (time x symbols) close matrix in fused vectorized passes.
+
+    Returns a dict of indicator name to a matrix of the same shape, NaN where undefined.
+    """
+    x = np.asarray(close, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    windows = resolve_windows(indicators, windows)
+    first_valid = _first_valid(x)
+    result = {}
+
+    # Every simple moving average and Bollinger band comes from one set of cumulative sums
+    if "sma" in windows or "bollinger" in windows:
+        center, sums, squares, counts = _rolling_sums(x, first_valid)
+        means = {window: _window_mean(sums, counts, window) for window in windows.get("sma", [])}
+        for window in windows.get("sma", []):
+            result[f"sma_{window}"] = means[window] + center
+
+    # EMA spans are shared between the EMA and MACD indicators
+    spans = set(windows.get("ema", []))
+    if "macd" in windows:
+        spans.update(windows["macd"][:2])
+    emas = {span: _ewm(x, 2 / (span + 1), span, first_valid) for span in sorted(spans)}
+    for window in windows.get("ema", []):
+        result[f"ema_{window}"] = emas[window]
+
+    if "rsi" in windows:
+        started = first_valid < len(x)
+        diff = np.diff(x, axis=0, prepend=np.nan)
+        diff[first_valid[started], np.nonzero(started)[0]] = 0.0
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+        up[np.isnan(diff)] = np.nan
+        down[np.isnan(diff)] = np.nan
+        for window in windows["rsi"]:
+            mean_up = _ewm(up, 1 / window, window, first_valid)
+            mean_down = _ewm(down, 1 / window, window, first_valid)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi = np.where(mean_down == 0, 100.0, 100 - 100 / (1 + mean_up / mean_down))
+            rsi[np.isnan(mean_down)] = np.nan
+            result[f"rsi_{window}"] = rsi
+
+    if "macd" in windows:
+        fast, slow, signal = windows["macd"]
+        macd_line = emas[fast] - emas[slow]
+        macd_signal = _ewm(macd_line, 2 / (signal + 1), signal, _first_valid(macd_line))
+        result["macd_line"] = macd_line
+        result["macd_signal"] = macd_signal
+        result["macd_histogram"] = macd_line - macd_signal
+
+    if "bollinger" in windows:
+        window, deviations = windows["bollinger"]
+        mean = means.get(window)
+        if mean is None:
+            mean = _window_mean(sums, counts, window)
+        variance = _window_mean(squares, counts, window) - mean * mean
+        std = np.sqrt(np.maximum(variance, 0))
+        result["bollinger_high"] = mean + center + deviations * std
+        result["bollinger_mid"] = mean + center
+        result["bollinger_low"] = mean + center - deviations * std
+
+    return result
+
+def indicator_lists(matrix_result, column=0, length=None):
+    """Round one symbol's indicators to 2 decimals, fill undefined values with 0 and convert them to lists"""
+    lists = {}
+    for name, matrix in matrix_result.items():
+        values = matrix[:, column]
+        if length is not None:
+            values = values[len(values) - length:]
+        lists[name] = np.nan_to_num(np.round(values, 2), nan=0.0).tolist()
+    return lists
@@ -0,0 +1,100 @@
+import pandas as pd
+
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": 86400,
+    "5d": 5 * 86400,
+    "1wk": 7 * 86400,
+    "1mo": 30 * 86400,
+    "3mo": 90 * 86400,
+}
+
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+def interval_seconds(interval):
+    """Get the length of a bar interval in seconds"""
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unknown interval: {interval}")
+    return INTERVAL_SECONDS[interval]
+
+def period_start(period, now=None):
+    """Get the UTC timestamp a yfinance period string starts at, or None for 'max'"""
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unknown period: {period}")
+    return now - PERIOD_OFFSETS[period]
+
+# Longest span Yahoo Finance serves in one intraday request
+REQUEST_SPANS = {
+    "1m": pd.Timedelta(days=7),
+    "2m": pd.Timedelta(days=60),
+    "5m": pd.Timedelta(days=60),
+    "15m": pd.Timedelta(days=60),
+    "30m": pd.Timedelta(days=60),
+    "90m": pd.Timedelta(days=60),
+    "60m": pd.Timedelta(days=730),
+    "1h": pd.Timedelta(days=730),
+}
+# Daily and longer bars have no span limit; chunks still bound the memory of one download
+DEFAULT_REQUEST_SPAN = pd.Timedelta(days=3650)
+
+# How far back intraday bars are available, with a day of margin
+LOOKBACKS = {
+    "1m": pd.Timedelta(days=29),
+    "2m": pd.Timedelta(days=59),
+    "5m": pd.Timedelta(days=59),
+    "15m": pd.Timedelta(days=59),
+    "30m": pd.Timedelta(days=59),
+    "90m": pd.Timedelta(days=59),
+    "60m": pd.Timedelta(days=729),
+    "1h": pd.Timedelta(days=729),
+}
+
+EPOCH = pd.Timestamp(0, tz="UTC")
+
+def to_utc(ts):
+    """Convert a timestamp to UTC, reading naive timestamps as UTC"""
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+def earliest_start(interval, now=None):
+    """Get the oldest timestamp bars of an interval can be downloaded from, or None when unlimited"""
+    interval_seconds(interval)
+    if interval not in LOOKBACKS:
+        return None
+    now = pd.Timestamp.now(tz="UTC") if now is None else to_utc(now)
+    return now - LOOKBACKS[interval]
+
+def range_chunks(start, end, interval):
+    """Split [start, end) into request-sized chunks aligned on multiples of the span since the epoch.
+
+    Aligned chunks let overlapping range queries and consecutive pages share their downloads.
+    """
+    interval_seconds(interval)
+    span = REQUEST_SPANS.get(interval, DEFAULT_REQUEST_SPAN)
+    chunk_start = EPOCH + ((to_utc(start) - EPOCH) // span) * span
+    end = to_utc(end)
+    while chunk_start < end:
+        yield chunk_start, chunk_start + span
+        chunk_start += span
@@ -0,0 +1,219 @@
+import os
+import time
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from bson.errors import InvalidDocument
+from app.utils import bar_store
+from app.utils.cache import TTLCache
+from app.utils.concurrency import job_executor, run_blocking
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+# A job still pending this long after it was queued or started is taken as lost, e.g. with its process
+JOB_TIMEOUT_SECONDS = int(os.getenv("JOB_TIMEOUT_SECONDS", "900"))
+JOB_MAX_WAIT_SECONDS = 30
+JOB_POLL_SECONDS = 0.25
+
+JOBS_COLLECTION = "jobs"
+PENDING = ["queued", "running"]
+
+job_cache = TTLCache("jobs", max_entries=1024)
+
+_indexed = False
+_lock = threading.Lock()
+
+def job_id(kind, payload):
+    """Hash a job's kind and request, so that identical submissions share one job"""
+    body = json.dumps({"kind": kind, "request": jsonable_encoder(payload)}, sort_keys=True)
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+def job_view(job):
+    """Get the public fields of a job"""
+    view = {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "submitted_at": job["submitted_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+    }
+    if job["status"] == "succeeded":
+        view["result"] = job.get("result")
+    elif job["status"] == "failed":
+        view["error"] = job.get("error")
+    return view
+
+def _collection():
+    """Get the persistent job collection, or None when no MongoDB is configured"""
+    global _indexed
+    db = bar_store.get_database()
+    if db is None:
+        return None
+    if not _indexed:
+        # MongoDB removes jobs once expires_at has passed
+        db[JOBS_COLLECTION].create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        _indexed = True
+    return db[JOBS_COLLECTION]
+
+def _now():
+    return pd.Timestamp.now(tz="UTC").tz_localize(None).to_pydatetime()
+
+def _after(now, seconds):
+    return now + pd.Timedelta(seconds=seconds).to_pytimedelta()
+
+def _expires_at(now):
+    return _after(now, JOB_TTL_SECONDS)
+
+def _lost(job, now):
+    """Check whether a pending job has passed its deadline, e.g. because the process running it crashed"""
+    deadline = job.get("deadline") or _after(job["submitted_at"], JOB_TIMEOUT_SECONDS)
+    return job["status"] in PENDING and deadline <= now
+
+def _reported(job):
+    """Report a lost job as failed, so that its pollers stop waiting for it"""
+    if job is None or not _lost(job, _now()):
+        return job
+    return {**job, "status": "failed", "error": f"Job did not finish within {JOB_TIMEOUT_SECONDS} seconds"}
+
+def _reusable(job, now):
+    """Check whether a job can answer a new submission: it is pending, or succeeded on data still fresh"""
+    if job["status"] in PENDING:
+        return not _lost(job, now)
+    return job["status"] == "succeeded" and job.get("fresh_until") is not None and job["fresh_until"] > now
+
+def _load_job(key):
+    """Get a stored job that has not expired yet"""
+    try:
+        collection = _collection()
+        if collection is None:
+            return None
+        # The TTL monitor runs once a minute, so expired jobs may still be there
+        return collection.find_one({"_id": key, "expires_at": {"$gt": _now()}})
+    except PyMongoError as e:
+        logger.warning("Job store unavailable: %s", e)
+        return None
+
+def _claim(job):
+    """Store a new job unless another process already runs a live one with the same id"""
+    try:
+        collection = _collection()
+        if collection is None:
+            return True
+        # Replaces a failed, lost, stale or expired job; a reusable one makes the upsert collide on _id
+        collection.replace_one(
+            {"_id": job["_id"], "$or": [
+                {"status": "failed"},
+                {"status": {"$in": PENDING}, "deadline": {"$lte": job["submitted_at"]}},
+                {"fresh_until": {"$lte": job["submitted_at"]}},
+                {"expires_at": {"$lte": job["submitted_at"]}},
+            ]},
+            job,
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+    except PyMongoError as e:
+        logger.warning("Job store unavailable, running job %s locally: %s", job["_id"], e)
+        return True
+
+def _save_job(job):
+    try:
+        collection = _collection()
+        if collection is not None:
+            collection.replace_one({"_id": job["_id"]}, job, upsert=True)
+    except (PyMongoError, InvalidDocument) as e:
+        logger.warning("Could not save job %s: %s", job["_id"], e)
+
+def _run(job, runner):
+    started_at = _now()
+    job.update(status="running", started_at=started_at, deadline=_after(started_at, JOB_TIMEOUT_SECONDS))
+    _save_job(job)
+    try:
+        result = jsonable_encoder(runner())
+        # The result is in place before the status tells readers to look for it
+        job["result"] = result
+        job["status"] = "succeeded"
+    except Exception as e:
+        logger.exception("Job %s failed", job["_id"])
+        job["error"] = str(e)
+        job["status"] = "failed"
+    finished_at = _now()
+    job.update(
+        finished_at=finished_at,
+        fresh_until=_after(finished_at, job["fresh_seconds"]),
+        expires_at=_expires_at(finished_at)
+    )
+    job_cache.set(job["_id"], job, JOB_TTL_SECONDS)
+    _save_job(job)
+
+def submit_job(kind, payload, runner, fresh_seconds=JOB_TTL_SECONDS):
+    """Queue runner() on the job pool, or get the job already answering the same submission.
+
+    Jobs and their results are kept for JOB_TTL_SECONDS in memory and, when MongoDB is
+    configured, in a TTL-indexed collection shared by every backend process. A finished job
+    answers identical submissions for fresh_seconds only, e.g. as long as the data it read
+    stays fresh; later submissions and failed jobs are run again under the same id. A job still
+    pending JOB_TIMEOUT_SECONDS after it was queued or started is reported as failed and run
+    again in the same way.
+    """
+    key = job_id(kind, payload)
+    with _lock:
+        now = _now()
+        job = job_cache.get(key)
+        if job is not None and _reusable(job, now):
+            return job
+        stored = _load_job(key)
+        if stored is not None and _reusable(stored, now):
+            return stored
+        job = {
+            "_id": key,
+            "kind": kind,
+            "status": "queued",
+            "submitted_at": now,
+            "fresh_seconds": min(fresh_seconds, JOB_TTL_SECONDS),
+            "deadline": _after(now, JOB_TIMEOUT_SECONDS),
+            "expires_at": _expires_at(now),
+        }
+        if not _claim(job):
+            return _load_job(key) or job
+        job_cache.set(key, job, JOB_TTL_SECONDS)
+    job_executor.submit(_run, job, runner)
+    return job
+
+async def _current(key):
+    """Get a job run by this process or stored by any other, or None when it is unknown or expired"""
+    job = job_cache.get(key)
+    return _reported(job if job is not None else await run_blocking(_load_job, key))
+
+async def wait_for_job(key, timeout):
+    """Get a job once it has finished, or its state when timeout seconds pass first"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await _current(key)
+        if job is None or job["status"] not in PENDING or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+async def job_updates(key):
+    """Yield the state of a job whenever its status changes until it has finished, or None when it is unknown"""
+    status = None
+    while True:
+        job = await _current(key)
+        if job is None:
+            yield None
+            return
+        if job["status"] != status:
+            status = job["status"]
+            yield job
+        if status not in PENDING:
+            return
+        await asyncio.sleep(JOB_POLL_SECONDS)
@@ -0,0 +1,278 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import pandas as pd
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import StrOutputParser
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+from app.utils import bar_store
+from app.utils.cache import TTLCache
+from app.utils.concurrency import run_blocking
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDERS = ["openai", "fake"]
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+FAKE_LLM_TOKEN_DELAY_SECONDS = float(os.getenv("FAKE_LLM_TOKEN_DELAY_SECONDS", "0"))
+
+LLM_CACHE_COLLECTION = "llm_cache"
+
+llm_cache = TTLCache("llm_responses", max_entries=512)
+
+_model = None
+_chains = {}
+# Streamed completions in progress by prompt key, only touched from the event loop
+_streams = {}
+_indexed = False
+_lock = threading.Lock()
+
+class FakeChatModel(BaseChatModel):
+    """Local stand-in for the OpenAI chat model that answers from the figures in the prompt.
+
+    latency is the wait before the first token and token_delay the wait between tokens, so
+    streaming behaves like a remote model.
+    """
+
+    latency: float = 0.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def answer(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content
+        symbols = re.findall(r"^\s*Symbol: (\S+)", prompt, re.MULTILINE)
+        changes = re.findall(r"^\s*Change: (\S+)", prompt, re.MULTILINE)
+        lines = [f"{symbol} changed by {change} over the period." for symbol, change in zip(symbols, changes)]
+        return " ".join(["This is a placeholder analysis from the fake chat model."] + lines)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        answer = self.answer(messages)
+        time.sleep(self.latency + self.token_delay * len(self.tokens(answer)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+    @staticmethod
+    def tokens(answer: str) -> List[str]:
+        return re.findall(r"\S+\s*", answer)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, token in enumerate(self.tokens(self.answer(messages))):
+            if i:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(self.tokens(self.answer(messages))):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+def set_chat_model(model):
+    """Use the given chat model (e.g. FakeChatModel()) for every request, or None to create one from the settings"""
+    global _model
+    with _lock:
+        _model = model
+        _chains.clear()
+
+def get_chat_model():
+    """Get the chat model shared by every request, creating it on first use"""
+    global _model
+    with _lock:
+        if _model is None:
+            if LLM_PROVIDER not in LLM_PROVIDERS:
+                raise ValueError(f"Unknown LLM provider: {LLM_PROVIDER}. Supported providers: {', '.join(LLM_PROVIDERS)}")
+            if LLM_PROVIDER == "fake":
+                _model = FakeChatModel(latency=FAKE_LLM_LATENCY_SECONDS, token_delay=FAKE_LLM_TOKEN_DELAY_SECONDS)
+            else:
+                from langchain_community.chat_models import ChatOpenAI
+                _model = ChatOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    model=LLM_MODEL,
+                    temperature=LLM_TEMPERATURE
+                )
+        return _model
+
+def get_chain(template):
+    """Get the prompt | model | parser chain of a template, built once per model"""
+    model = get_chat_model()
+    with _lock:
+        chain = _chains.get(template)
+        if chain is None:
+            chain = _chains[template] = ChatPromptTemplate.from_template(template) | model | StrOutputParser()
+        return chain
+
+def _normalize(value):
+    """Collapse whitespace so that trivially different prompts share a cache entry"""
+    return re.sub(r"\s+", " ", value).strip() if isinstance(value, str) else value
+
+def prompt_key(template, inputs):
+    """Hash a prompt's template, normalized inputs and the model settings"""
+    settings = {"provider": LLM_PROVIDER, "model": LLM_MODEL, "temperature": LLM_TEMPERATURE}
+    payload = {
+        "template": _normalize(template),
+        "inputs": {name: _normalize(value) for name, value in inputs.items()},
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _collection():
+    """Get the persistent response collection, or None when no MongoDB is configured"""
+    global _indexed
+    db = bar_store.get_database()
+    if db is None:
+        return None
+    if not _indexed:
+        # MongoDB removes entries once expires_at has passed
+        db[LLM_CACHE_COLLECTION].create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        _indexed = True
+    return db[LLM_CACHE_COLLECTION]
+
+def _now():
+    return pd.Timestamp.now(tz="UTC").tz_localize(None).to_pydatetime()
+
+def _load_response(key):
+    """Get a stored response that has not expired yet"""
+    try:
+        collection = _collection()
+        if collection is None:
+            return None
+        # The TTL monitor runs once a minute, so expired entries may still be there
+        doc = collection.find_one({"_id": key, "expires_at": {"$gt": _now()}})
+    except PyMongoError as e:
+        logger.warning("LLM response cache unavailable: %s", e)
+        return None
+    return None if doc is None else doc["response"]
+
+def _save_response(key, response):
+    try:
+        collection = _collection()
+        if collection is None:
+            return
+        now = _now()
+        collection.replace_one({"_id": key}, {
+            "response": response,
+            "created_at": now,
+            "expires_at": now + pd.Timedelta(seconds=LLM_CACHE_TTL_SECONDS).to_pytimedelta()
+        }, upsert=True)
+    except PyMongoError as e:
+        logger.warning("Could not save LLM response: %s", e)
+
+def _complete(key, template, inputs):
+    response = _load_response(key)
+    if response is None:
+        response = get_chain(template).invoke(inputs)
+        _save_response(key, response)
+    return response
+
+def cached_completion(template, inputs):
+    """Answer a prompt, reusing a cached response for the same normalized inputs and settings.
+
+    Responses are kept in memory and, when MongoDB is configured, next to the stored bars.
+    Concurrent identical prompts share one model call.
+    """
+    key = prompt_key(template, inputs)
+    return llm_cache.get_or_load(key, lambda: _complete(key, template, inputs), LLM_CACHE_TTL_SECONDS)
+
+class _StreamFlight:
+    """A streamed completion in progress that every stream of the same prompt follows"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+        self.task = None
+
+async def _produce(flight, key, template, inputs):
+    """Stream a completion into a flight, apart from its clients so that none can cut it short by disconnecting"""
+    response = None
+    try:
+        async for chunk in get_chain(template).astream(inputs):
+            async with flight.changed:
+                flight.chunks.append(chunk)
+                flight.changed.notify_all()
+        response = "".join(flight.chunks)
+        # Cached before the flight ends, so later streams never miss both
+        llm_cache.set(key, response, LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        flight.error = e
+    finally:
+        _streams.pop(key, None)
+        async with flight.changed:
+            flight.done = True
+            flight.changed.notify_all()
+    if response is not None:
+        await run_blocking(_save_response, key, response)
+
+async def stream_completion(template, inputs):
+    """Stream the answer to a prompt token by token, from the cache when it was answered before.
+
+    Concurrent streams of the same prompt share one model call: later streams replay the tokens
+    produced so far, then follow the rest. A completed stream is cached like cached_completion, so
+    later requests of either kind reuse it, but a stream and a cached_completion running at the
+    same time for the same prompt each call the model.
+    """
+    key = prompt_key(template, inputs)
+    flight = _streams.get(key)
+    if flight is None:
+        response = llm_cache.get(key)
+        if response is None:
+            response = await run_blocking(_load_response, key)
+            if response is not None:
+                llm_cache.set(key, response, LLM_CACHE_TTL_SECONDS)
+        if response is not None:
+            yield response
+            return
+        # Another stream may have started while the store was read
+        flight = _streams.get(key)
+        if flight is None:
+            flight = _streams[key] = _StreamFlight()
+            flight.task = asyncio.create_task(_produce(flight, key, template, inputs))
+    sent = 0
+    while True:
+        async with flight.changed:
+            await flight.changed.wait_for(lambda: len(flight.chunks) > sent or flight.done)
+            chunks = flight.chunks[sent:]
+            done = flight.done
+        for chunk in chunks:
+            yield chunk
+        sent += len(chunks)
+        if done:
+            if flight.error is not None:
+                raise flight.error
+            return
@@ -0,0 +1,224 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from app.utils.cache import cache_stats
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CACHE_COUNTERS = ["hits", "misses", "coalesced", "evictions", "expirations"]
+CACHE_GAUGES = ["entries", "bytes", "hit_ratio"]
+
+_metrics = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _header(name, kind, documentation):
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+
+class _Metric:
+    """A metric family whose series are keyed by their label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _add(self, labels, amount):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+    def render(self):
+        return _header(self.name, self.kind, self.documentation) + self.samples()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._add(labels, amount)
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, *labels, amount=1):
+        self._add(labels, amount)
+
+    def dec(self, *labels, amount=1):
+        self._add(labels, -amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, *labels):
+        """Count a value into the first bucket whose upper bound it does not exceed"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * len(self.buckets), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer HTTP requests, until the last byte of the body",
+    ["method", "route", "status"]
+)
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being answered")
+upstream_seconds = Histogram(
+    "upstream_request_duration_seconds",
+    "Time of market data provider calls",
+    ["provider", "call"]
+)
+upstream_errors = Counter(
+    "upstream_errors_total",
+    "Market data provider calls that raised, by exception type",
+    ["provider", "call", "error"]
+)
+upstream_in_flight = Gauge("upstream_requests_in_flight", "Market data provider calls in progress")
+stage_seconds = Histogram(
+    "stage_duration_seconds",
+    "Time of compute stages: fetch, indicators, charts, tests and serialization",
+    ["stage"]
+)
+
+def timed(stage):
+    """Record the duration of every call of the decorated function as a compute stage"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_seconds.observe(time.perf_counter() - started, stage)
+        return wrapper
+    return decorate
+
+@contextmanager
+def upstream_call(provider, call):
+    """Time a market data provider call and count its failures"""
+    upstream_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        upstream_errors.inc(provider, call, type(e).__name__)
+        raise
+    finally:
+        upstream_in_flight.dec()
+        upstream_seconds.observe(time.perf_counter() - started, provider, call)
+
+def _cache_metrics():
+    """Expose the counters the caches keep anyway, so lookups pay nothing extra"""
+    stats = cache_stats()
+    lines = []
+    for field in CACHE_COUNTERS:
+        name = f"cache_{field}_total"
+        lines += _header(name, "counter", f"Cache {field} since the cache was last cleared")
+        lines += [f'{name}{{cache="{_escape(cache)}"}} {values[field]}' for cache, values in stats.items()]
+    for field in CACHE_GAUGES:
+        name = f"cache_{field}"
+        lines += _header(name, "gauge", f"Current cache {field.replace('_', ' ')}")
+        lines += [f'{name}{{cache="{_escape(cache)}"}} {_format_value(values[field])}' for cache, values in stats.items()]
+    return lines
+
+def render():
+    """Render every metric of this process in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    lines += _cache_metrics()
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status.
+
+    Routes are labelled by their path template, so path parameters cannot multiply the series;
+    requests that match no route share the "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            # The router stores the matched route in the scope it was given
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            )
@@ -0,0 +1,43 @@
+import base64
+import json
+import pandas as pd
+from app.utils.intervals import period_start, to_utc
+
+MAX_PAGE_SIZE = 100_000
+
+def encode_cursor(symbol, interval, ts):
+    """Encode the position after a bar as an opaque cursor"""
+    payload = {"symbol": symbol.upper(), "interval": interval, "after": int(to_utc(ts).value // 1_000_000)}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+def decode_cursor(cursor, symbol, interval):
+    """Decode a cursor into the timestamp of the last bar already returned"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        after = pd.Timestamp(payload["after"], unit="ms", tz="UTC")
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if payload.get("symbol") != symbol.upper() or payload.get("interval") != interval:
+        raise ValueError("The cursor belongs to a different symbol or interval")
+    return after
+
+def is_range_request(request):
+    """Check whether a request asks for a date range or a page rather than a whole period"""
+    return any(value is not None for value in (request.start, request.end, request.limit, request.cursor))
+
+def resolve_range(request):
+    """Get the UTC [start, end) bounds of a range request, defaulting to its period up to now"""
+    now = pd.Timestamp.now(tz="UTC")
+    end = now if request.end is None else to_utc(request.end)
+    if request.start is not None:
+        start = to_utc(request.start)
+    else:
+        start = period_start(request.period, now)
+        start = pd.Timestamp(0, tz="UTC") if start is None else start
+    if start >= end:
+        raise ValueError("start must be before end")
+    if request.limit is not None and not 1 <= request.limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if request.limit is not None and request.max_points is not None:
+        raise ValueError("max_points cannot be combined with limit")
+    return start, end
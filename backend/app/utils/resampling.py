@@ -0,0 +1,112 @@
+import numpy as np
+from app.utils import concurrency
+
+TRADING_DAYS = 252
+# Resamples drawn at once; bounds the memory of the (resamples x observations) arrays
+CHUNK_SIZE = 500
+MAX_RESAMPLES = 1_000_000
+STATISTICS = ["mean_difference", "correlation", "sharpe"]
+
+def default_block_length(n):
+    """Block length of the order n^(1/3) used for the block bootstrap"""
+    return max(1, int(round(n ** (1 / 3))))
+
+def permuted_rows(rng, values, size):
+    """Draw `size` random permutations of values, one per row"""
+    rows = np.tile(values, (size, 1))
+    rng.permuted(rows, axis=1, out=rows)
+    return rows
+
+def block_bootstrap_indices(rng, size, n, block_length):
+    """Draw `size` circular block bootstrap samples of range(n), one per row"""
+    n_blocks = -(-n // block_length)
+    starts = rng.integers(0, n, (size, n_blocks))
+    indices = (starts[:, :, None] + np.arange(block_length)).reshape(size, -1)[:, :n]
+    return indices % n
+
+def _sharpe(x):
+    return x.mean(axis=-1) / x.std(axis=-1, ddof=1) * np.sqrt(TRADING_DAYS)
+
+def batch_statistic(statistic, a, b=None):
+    """Compute a statistic for every row of (resamples x observations) arrays"""
+    if statistic == "mean_difference":
+        return a.mean(axis=-1) - b.mean(axis=-1)
+    if statistic == "correlation":
+        a = a - a.mean(axis=-1, keepdims=True)
+        b = b - b.mean(axis=-1, keepdims=True)
+        return (a * b).sum(axis=-1) / np.sqrt((a * a).sum(axis=-1) * (b * b).sum(axis=-1))
+    if statistic == "sharpe":
+        return _sharpe(a) if b is None else _sharpe(a) - _sharpe(b)
+    raise ValueError(f"Unknown statistic: {statistic}. Supported statistics: {', '.join(STATISTICS)}")
+
+def _resample_chunk(kind, statistic, a, b, block_length, seed, size):
+    """Draw one chunk of resamples and compute their statistics"""
+    rng = np.random.default_rng(seed)
+    n = len(a)
+    if kind == "bootstrap":
+        indices = block_bootstrap_indices(rng, size, n, block_length)
+        return batch_statistic(statistic, a[indices], None if b is None else b[indices])
+    if statistic == "correlation":
+        # Shuffling one series breaks the pairing under the null of no association
+        return batch_statistic(statistic, np.broadcast_to(a, (size, n)), permuted_rows(rng, b, size))
+    # Two-sample statistics shuffle the group labels of the pooled observations
+    pooled = permuted_rows(rng, np.concatenate([a, b]), size)
+    return batch_statistic(statistic, pooled[:, :n], pooled[:, n:])
+
+def _resample_task(kind, statistic, a, b, block_length, chunks):
+    return np.concatenate([
+        _resample_chunk(kind, statistic, a, b, block_length, seed, size)
+        for seed, size in chunks
+    ])
+
+def resample(kind, statistic, a, b=None, n_resamples=10000, seed=None, block_length=None):
+    """Compute a statistic on permuted or block-bootstrapped samples, spread over the process pool.
+
+    Resamples are drawn in fixed-size chunks seeded from one SeedSequence, so a seed gives the
+    same distribution whatever the number of processes.
+    """
+    if not 1 <= n_resamples <= MAX_RESAMPLES:
+        raise ValueError(f"n_resamples must be between 1 and {MAX_RESAMPLES}")
+    a = np.asarray(a, dtype=float)
+    b = None if b is None else np.asarray(b, dtype=float)
+    block_length = block_length or default_block_length(len(a))
+    sizes = [CHUNK_SIZE] * (n_resamples // CHUNK_SIZE)
+    if n_resamples % CHUNK_SIZE:
+        sizes.append(n_resamples % CHUNK_SIZE)
+    seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    chunks = list(zip(seeds.spawn(len(sizes)), sizes))
+
+    processes = concurrency.RESAMPLING_PROCESSES
+    if processes <= 1 or len(chunks) == 1:
+        return _resample_task(kind, statistic, a, b, block_length, chunks)
+    n_tasks = min(len(chunks), processes * 2)
+    pool = concurrency.process_pool()
+    futures = [
+        pool.submit(_resample_task, kind, statistic, a, b, block_length, chunks[i::n_tasks])
+        for i in range(n_tasks)
+    ]
+    results = [future.result() for future in futures]
+    # Interleave the tasks' chunks back into seeding order
+    ordered = np.empty(n_resamples)
+    offset = 0
+    positions = [0] * n_tasks
+    for i, (_, size) in enumerate(chunks):
+        task = i % n_tasks
+        ordered[offset:offset + size] = results[task][positions[task]:positions[task] + size]
+        positions[task] += size
+        offset += size
+    return ordered
+
+def permutation_test(statistic, a, b, n_resamples=10000, seed=None):
+    """Two-sided permutation p-value of a statistic that is zero under the null"""
+    observed = batch_statistic(statistic, np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    null = resample("permutation", statistic, a, b, n_resamples, seed)
+    p_value = (1 + np.count_nonzero(np.abs(null) >= np.abs(observed))) / (n_resamples + 1)
+    return float(observed), float(p_value)
+
+def bootstrap_interval(statistic, a, b=None, n_resamples=10000, confidence=0.95, seed=None, block_length=None):
+    """Percentile confidence interval of a statistic from the circular block bootstrap"""
+    distribution = resample("bootstrap", statistic, a, b, n_resamples, seed, block_length)
+    tail = (1 - confidence) / 2
+    low, high = np.nanquantile(distribution, [tail, 1 - tail])
+    return float(low), float(high), distribution
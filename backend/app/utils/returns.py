@@ -0,0 +1,42 @@
+import pandas as pd
+from app.utils.intervals import interval_seconds
+
+JOINS = ["inner", "outer"]
+
+def calendar_index(index, interval="1d"):
+    """Map bar timestamps onto a calendar shared by every exchange.
+
+    Daily and longer bars are keyed by their local trading date, intraday bars by their UTC time.
+    """
+    index = pd.DatetimeIndex(index)
+    if interval_seconds(interval) >= 86400:
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize()
+    if index.tz is None:
+        return index.tz_localize("UTC")
+    return index.tz_convert("UTC")
+
+def return_series(df, interval="1d"):
+    """Simple returns of a stock frame on the shared calendar, without the undefined first return"""
+    close = pd.Series(df['Close'].to_numpy(dtype=float), index=calendar_index(df.index, interval))
+    close = close[~close.index.duplicated(keep="last")]
+    return close.pct_change(fill_method=None).iloc[1:]
+
+def return_matrix(frames, join="inner", interval="1d"):
+    """Align the returns of several stock frames by date into a (calendar x symbols) frame.
+
+    An inner join keeps only the dates on which every symbol has a return, an outer join keeps
+    every date and leaves NaN where a symbol did not trade.
+    """
+    if join not in JOINS:
+        raise ValueError(f"Unknown join: {join}. Supported joins: {', '.join(JOINS)}")
+    matrix = pd.concat(
+        {symbol: return_series(df, interval) for symbol, df in frames.items()},
+        axis=1,
+        join=join
+    ).sort_index()
+    if join == "inner":
+        matrix = matrix.dropna()
+    matrix.index.name = "Date"
+    return matrix
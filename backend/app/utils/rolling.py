@@ -0,0 +1,72 @@
+import numpy as np
+from app.utils.intervals import interval_seconds
+
+TRADING_DAYS = 252
+TRADING_SECONDS_PER_DAY = 6.5 * 3600
+DEFAULT_ROLLING_WINDOWS = [20, 60]
+MAX_ROLLING_WINDOWS = 10
+
+def periods_per_year(interval):
+    """Number of bars of an interval in a trading year, used to annualize statistics"""
+    seconds = interval_seconds(interval)
+    if seconds < 86400:
+        return TRADING_DAYS * TRADING_SECONDS_PER_DAY / seconds
+    return TRADING_DAYS * 86400 / seconds if seconds < 7 * 86400 else 365.25 * 86400 / seconds
+
+def validate_windows(windows, n):
+    """Check rolling windows and drop duplicates, keeping their order"""
+    windows = list(dict.fromkeys(windows or DEFAULT_ROLLING_WINDOWS))
+    if len(windows) > MAX_ROLLING_WINDOWS:
+        raise ValueError(f"At most {MAX_ROLLING_WINDOWS} rolling windows are supported")
+    for window in windows:
+        if int(window) != window or window < 2:
+            raise ValueError("Rolling windows must be integers of at least 2")
+        if window > n:
+            raise ValueError(f"Rolling window {window} is longer than the {n} aligned returns")
+    return [int(window) for window in windows]
+
+def _cumulative(x):
+    """Cumulative sums along time with a leading zero row"""
+    return np.vstack([np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)])
+
+def _window_sum(cumulative, window):
+    """Sums over every trailing window, NaN until the window is full"""
+    out = np.full((len(cumulative) - 1,) + cumulative.shape[1:], np.nan)
+    np.subtract(cumulative[window:], cumulative[:-window], out=out[window - 1:])
+    return out
+
+def drawdown(returns):
+    """Drawdown of every column from its running peak of compounded returns"""
+    wealth = np.cumprod(1 + returns, axis=0)
+    return wealth / np.maximum.accumulate(wealth, axis=0) - 1
+
+def rolling_statistics(returns, benchmark, windows, annualization):
+    """Rolling volatility, Sharpe ratio, and correlation and beta against a benchmark.
+
+    returns is a (time x symbols) array and benchmark a time series aligned with it. Every window
+    comes from one set of running sums, so the cost is O(n) whatever the window lengths.
+    """
+    # Centering keeps the sums of squares precise
+    x = returns - returns.mean(axis=0)
+    y = (benchmark - benchmark.mean())[:, None]
+    sums_x, sums_y = _cumulative(x), _cumulative(y)
+    squares_x, squares_y = _cumulative(x * x), _cumulative(y * y)
+    products = _cumulative(x * y)
+    mean_x = returns.mean(axis=0)
+
+    result = {}
+    for window in windows:
+        sx, sy = _window_sum(sums_x, window), _window_sum(sums_y, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var_x = (_window_sum(squares_x, window) - sx * sx / window) / (window - 1)
+            var_y = (_window_sum(squares_y, window) - sy * sy / window) / (window - 1)
+            covariance = (_window_sum(products, window) - sx * sy / window) / (window - 1)
+            var_x, var_y = np.maximum(var_x, 0), np.maximum(var_y, 0)
+            std_x = np.sqrt(var_x)
+            result[window] = {
+                "volatility": std_x * np.sqrt(annualization),
+                "sharpe": (sx / window + mean_x) / std_x * np.sqrt(annualization),
+                "correlation": covariance / np.sqrt(var_x * var_y),
+                "beta": covariance / var_y,
+            }
+    return result
@@ -0,0 +1,189 @@
+import json
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from app.utils.metrics import timed
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+FORMATS = ["records", "columnar", "msgpack", "arrow"]
+
+MEDIA_TYPES = {
+    "records": "application/json",
+    "columnar": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+ACCEPT_FORMATS = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+
+def negotiate_format(requested=None, accept=None):
+    """Pick a response format from an explicit request field or the Accept header"""
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unknown format: {requested}. Supported formats: {', '.join(FORMATS)}")
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    return "records"
+
+def epoch_ms(index):
+    """Convert a DatetimeIndex to epoch milliseconds"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return (index.asi8 // 1_000_000).tolist()
+
+def timezone_name(index):
+    """Get the time zone of a DatetimeIndex, or None when it is naive"""
+    tz = getattr(index, "tz", None)
+    return str(tz) if tz is not None else None
+
+def column_values(values):
+    """Convert a column to a list, replacing NaN with None"""
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+def frame_to_columns(df):
+    """Serialize a Date-indexed frame as column arrays with epoch-millisecond dates"""
+    columns = {"Date": epoch_ms(df.index)}
+    for col in df.columns:
+        columns[col] = column_values(df[col].values)
+    return columns
+
+def sse_event(event, data):
+    """Encode one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def _json_bytes(content):
+    return json.dumps(content, separators=(",", ":"), allow_nan=False).encode()
+
+def _msgpack_bytes(content):
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ValueError("The msgpack format requires the msgpack package") from e
+    return msgpack.packb(content, use_bin_type=True)
+
+def _arrow_bytes(table, metadata):
+    import pyarrow as pa
+    table = table.replace_schema_metadata({
+        key: json.dumps(value) for key, value in metadata.items()
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ValueError("The arrow format requires the pyarrow package") from e
+    return pyarrow
+
+def encode(content, fmt, table=None, metadata=None):
+    """Build a response for a columnar payload in the requested format"""
+    if fmt == "arrow":
+        if table is None:
+            raise ValueError("The arrow format is not available for this response")
+        return Response(_arrow_bytes(table, metadata or {}), media_type=MEDIA_TYPES[fmt])
+    if fmt == "msgpack":
+        return Response(_msgpack_bytes(content), media_type=MEDIA_TYPES[fmt])
+    return Response(_json_bytes(content), media_type=MEDIA_TYPES[fmt])
+
+@timed("serialization")
+def stock_data_response(symbol, df, info, fmt, extra=None):
+    """Encode historical stock data and info, plus any pagination or delta fields, as a columnar, msgpack or arrow response"""
+    content = {
+        "symbol": symbol,
+        "format": fmt,
+        "timezone": timezone_name(df.index),
+        "data": frame_to_columns(df),
+        "info": info,
+        **(extra or {}),
+    }
+    table = None
+    if fmt == "arrow":
+        pa = _require_pyarrow()
+        table = pa.table({
+            "Date": pa.array(content["data"]["Date"], type=pa.timestamp("ms", tz="UTC")),
+            **{col: pa.array(df[col].values) for col in df.columns},
+        })
+    return encode(content, fmt, table, {
+        "symbol": symbol,
+        "timezone": content["timezone"],
+        "info": info,
+        **(extra or {}),
+    })
+
+@timed("serialization")
+def chart_bundle_response(symbol, df, indicators, info, fmt):
+    """Encode price bars together with their indicators as a columnar, msgpack or arrow response"""
+    bars = df[[col for col in OHLCV_COLUMNS if col in df.columns]]
+    content = {
+        "symbol": symbol,
+        "format": fmt,
+        "timezone": timezone_name(df.index),
+        "data": frame_to_columns(bars),
+        "indicators": indicators,
+    }
+    if info is not None:
+        content["info"] = info
+    table = None
+    if fmt == "arrow":
+        pa = _require_pyarrow()
+        table = pa.table({
+            "Date": pa.array(content["data"]["Date"], type=pa.timestamp("ms", tz="UTC")),
+            **{col: pa.array(bars[col].values) for col in bars.columns},
+            **{name: pa.array(values, type=pa.float64()) for name, values in indicators.items()},
+        })
+    metadata = {"symbol": symbol, "timezone": content["timezone"]}
+    if info is not None:
+        metadata["info"] = info
+    return encode(content, fmt, table, metadata)
+
+@timed("serialization")
+def chart_data_response(chart_data, fmt):
+    """Encode visualization data as a columnar, msgpack or arrow response"""
+    table = None
+    if fmt == "arrow":
+        table = _chart_table(chart_data)
+    metadata = {key: value for key, value in chart_data.items() if key != "data"}
+    if isinstance(chart_data.get("data"), dict):
+        metadata["matrix"] = {key: value for key, value in chart_data["data"].items() if key != "values"}
+    return encode(chart_data, fmt, table, metadata)
+
+def _chart_table(chart_data):
+    """Flatten visualization series into one long Arrow table"""
+    pa = _require_pyarrow()
+    items = chart_data.get("data") or []
+    if isinstance(items, dict):
+        return pa.table({"value": pa.array(items["values"], type=pa.float64())})
+    if not items or "dates" not in items[0]:
+        return pa.Table.from_pylist(items)
+    tables = []
+    for item in items:
+        columns = {
+            "symbol": pa.array([item["symbol"]] * len(item["dates"]), type=pa.string()),
+            "Date": pa.array(item["dates"], type=pa.timestamp("ms", tz="UTC")),
+        }
+        for key, values in item.items():
+            if key in ("symbol", "dates", "timezone"):
+                continue
+            if isinstance(values, dict):
+                for name, series in values.items():
+                    columns[name] = pa.array(series, type=pa.float64())
+            elif isinstance(values, list):
+                columns[key] = pa.array(values)
+        tables.append(pa.table(columns))
+    return pa.concat_tables(tables, promote_options="default")
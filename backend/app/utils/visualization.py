@@ -1,8 +1,55 @@
-from app.utils.data_collector import get_stock_data
-from app.utils.data_preprocessor import calculate_technical_indicators
-import pandas as pd
+from app.utils.data_collector import get_stock_data_many, format_dates
+from app.utils.data_preprocessor import calculate_technical_indicators_many
+from app.utils.downsampling import downsample_indices, frame_indices, take, validate_downsampling
+from app.utils.metrics import timed
+from app.utils.returns import return_matrix
+from app.utils.rolling import drawdown, periods_per_year, rolling_statistics, validate_windows
+from app.utils.serialization import column_values, epoch_ms, timezone_name
+import numpy as np
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
 
-def generate_chart_data(symbols, chart_type, period="1y", interval="1d", indicators=None):
+MATRIX_LAYOUTS = ["flat", "upper"]
+MATRIX_ORDERS = ["input", "cluster"]
+CHART_TYPES = ["price", "returns", "correlation", "rolling"]
+
+def _chart_dates(index, date_format):
+    """Encode chart dates as formatted strings or, with their time zone, as epoch milliseconds"""
+    if date_format == "epoch_ms":
+        return {"dates": epoch_ms(index), "timezone": timezone_name(index)}
+    return {"dates": format_dates(index)}
+
+def cluster_order(corr):
+    """Order a correlation matrix by average-linkage clustering so correlated symbols sit together"""
+    if len(corr) < 3:
+        return np.arange(len(corr))
+    distance = np.sqrt(np.clip((1 - np.nan_to_num(corr)) / 2, 0, None))
+    np.fill_diagonal(distance, 0)
+    return leaves_list(linkage(squareform(distance, checks=False), method="average"))
+
+def correlation_matrix_data(returns, matrix_layout="flat", order="input"):
+    """Correlate aligned returns and pack the matrix as a symbol list and a flat or upper-triangular buffer"""
+    if matrix_layout not in MATRIX_LAYOUTS:
+        raise ValueError(f"Unknown matrix layout: {matrix_layout}. Supported layouts: {', '.join(MATRIX_LAYOUTS)}")
+    if order not in MATRIX_ORDERS:
+        raise ValueError(f"Unknown matrix order: {order}. Supported orders: {', '.join(MATRIX_ORDERS)}")
+    symbols = list(returns.columns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.atleast_2d(np.corrcoef(returns.to_numpy(), rowvar=False))
+    if order == "cluster":
+        positions = cluster_order(corr)
+        corr = corr[np.ix_(positions, positions)]
+        symbols = [symbols[i] for i in positions]
+    values = corr[np.triu_indices(len(symbols))] if matrix_layout == "upper" else corr.ravel()
+    return {
+        "symbols": symbols,
+        "layout": matrix_layout,
+        "values": column_values(np.round(values, 2))
+    }
+
+def generate_chart_data(symbols, chart_type, period="1y", interval="1d", indicators=None, date_format="string",
+                        matrix_layout="flat", order="input", benchmark="SPY", rolling_windows=None,
+                        max_points=None, downsample="lttb"):
     """Create data for visualization"""
     result = {
         "chart_type": chart_type,
@@ -13,76 +60,84 @@ def generate_chart_data(symbols, chart_type, period="1y", interval="1d", indicat
     }
 
     try:
-        if chart_type == "price":
-            for symbol in symbols:
-                data = get_stock_data(symbol, period, interval)
-                df = pd.DataFrame(data)
-
-                if indicators:
-                    tech_indicators = calculate_technical_indicators(data, indicators)
-                    indicator_data = {}
-                    for indicator_name, indicator_values in tech_indicators.items():
-                        indicator_data[indicator_name] = indicator_values
-
-                    result["data"].append({
-                        "symbol": symbol,
-                        "dates": df['Date'].tolist(),
-                        "prices": df['Close'].tolist(),
-                        "volumes": df['Volume'].tolist(),
-                        "indicators": indicator_data
-                    })
-                else:
-                    result["data"].append({
-                        "symbol": symbol,
-                        "dates": df['Date'].tolist(),
-                        "prices": df['Close'].tolist(),
-                        "volumes": df['Volume'].tolist()
-                    })
-
-        elif chart_type == "returns":
-            for symbol in symbols:
-                data = get_stock_data(symbol, period, interval)
-                df = pd.DataFrame(data)
-                df['Date'] = pd.to_datetime(df['Date'])
-                df.set_index('Date', inplace=True)
-                df['Returns'] = df['Close'].pct_change().fillna(0)
-                df['Cumulative_Returns'] = (1 + df['Returns']).cumprod() - 1
-
-                df = df.reset_index()
-                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        validate_downsampling(max_points, downsample)
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f"Unknown chart type: {chart_type}")
+        # Rolling statistics compare every symbol with the benchmark
+        fetched = symbols + [benchmark] if chart_type == "rolling" else symbols
+        all_data = get_stock_data_many(fetched, period, interval)
+        all_indicators = (
+            calculate_technical_indicators_many(all_data, indicators) if chart_type == "price" and indicators else {}
+        )
+        _chart_series(result, all_data, all_indicators, symbols, chart_type, interval, date_format,
+                      matrix_layout, order, benchmark, rolling_windows, max_points, downsample)
+    except Exception as e:
+        result["error"] = str(e)
 
-                result["data"].append({
-                    "symbol": symbol,
-                    "dates": df['Date'].tolist(),
-                    "daily_returns": df['Returns'].round(4).tolist(),
-                    "cumulative_returns": df['Cumulative_Returns'].round(4).tolist()
-                })
+    return result
 
-        elif chart_type == "correlation":
-            all_returns = pd.DataFrame()
+@timed("charts")
+def _chart_series(result, all_data, all_indicators, symbols, chart_type, interval, date_format,
+                  matrix_layout, order, benchmark, rolling_windows, max_points, downsample):
+    """Fill in the series of a chart from loaded stock data and indicators"""
+    if chart_type == "price":
+        for symbol in symbols:
+            df = all_data[symbol]
+            chart = {
+                "symbol": symbol,
+                **_chart_dates(df.index, date_format),
+                "prices": df['Close'].tolist(),
+                "volumes": df['Volume'].tolist()
+            }
+            if all_indicators:
+                chart["indicators"] = all_indicators[symbol]
+            # Indicators are computed on every bar, then thinned with the prices
+            result["data"].append(take(chart, frame_indices(df, max_points, downsample), len(df)))
 
-            for symbol in symbols:
-                data = get_stock_data(symbol, period, interval)
-                df = pd.DataFrame(data)
-                df['Date'] = pd.to_datetime(df['Date'])
-                df.set_index('Date', inplace=True)
-                all_returns[symbol] = df['Close'].pct_change().fillna(0)
-            corr_matrix = all_returns.corr().round(2)
-            corr_data = []
-            for i, symbol1 in enumerate(symbols):
-                for j, symbol2 in enumerate(symbols):
-                    corr_data.append({
-                        "x": symbol1,
-                        "y": symbol2,
-                        "value": corr_matrix.iloc[i, j]
-                    })
+    elif chart_type == "returns":
+        for symbol in symbols:
+            close = all_data[symbol]['Close']
+            returns = close.pct_change().fillna(0)
+            cumulative_returns = (1 + returns).cumprod() - 1
 
-            result["data"] = corr_data
+            chart = {
+                "symbol": symbol,
+                **_chart_dates(close.index, date_format),
+                "daily_returns": returns.round(4).tolist(),
+                "cumulative_returns": cumulative_returns.round(4).tolist()
+            }
+            indices = downsample_indices(
+                cumulative_returns.to_numpy(), max_points, downsample, close.index.asi8
+            )
+            result["data"].append(take(chart, indices, len(close)))
 
-        else:
-            raise ValueError(f"Unknown chart type: {chart_type}")
+    elif chart_type == "correlation":
+        returns = return_matrix(all_data, "inner", interval)[list(dict.fromkeys(symbols))]
+        result["data"] = correlation_matrix_data(returns, matrix_layout, order)
 
-    except Exception as e:
-        result["error"] = str(e)
-
-    return result
+    elif chart_type == "rolling":
+        unique_symbols = list(dict.fromkeys(symbols))
+        aligned = return_matrix(all_data, "inner", interval)
+        windows = validate_windows(rolling_windows, len(aligned))
+        returns = aligned[unique_symbols].to_numpy()
+        statistics = rolling_statistics(
+            returns, aligned[benchmark].to_numpy(), windows, periods_per_year(interval)
+        )
+        drawdowns = drawdown(returns)
+        dates = _chart_dates(aligned.index, date_format)
+        result["benchmark"] = benchmark
+        result["windows"] = windows
+        for column, symbol in enumerate(unique_symbols):
+            indices = downsample_indices(
+                drawdowns[:, column], max_points, downsample, aligned.index.asi8
+            )
+            result["data"].append(take({
+                "symbol": symbol,
+                **dates,
+                "drawdown": column_values(np.round(drawdowns[:, column], 4)),
+                "rolling": {
+                    f"{name}_{window}": column_values(np.round(values[:, column], 4))
+                    for window in windows
+                    for name, values in statistics[window].items()
+                }
+            }, indices, len(aligned)))
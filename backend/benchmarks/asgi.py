@@ -0,0 +1,58 @@
+import json
+import asyncio
+
+async def asgi_request(app, method, path, body=None, headers=None, on_body=None):
+    """Send one HTTP request to an ASGI app in-process and return (status, headers, body).
+
+    on_body, when given, is called with every body chunk as it is sent, e.g. to time streamed tokens.
+    """
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    request_headers = [
+        (b"host", b"benchmark"),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode()),
+    ]
+    for name, value in (headers or {}).items():
+        request_headers.append((name.lower().encode(), value.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": request_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    response = {"status": None, "headers": {}, "body": []}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                name.decode().lower(): value.decode() for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if on_body is not None:
+                on_body(message.get("body", b""))
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return response["status"], response["headers"], b"".join(response["body"])
@@ -0,0 +1,48 @@
+"""Measure how technical analysis throughput scales with concurrent clients.
+
+Downloads come from the synthetic market data provider with a fixed latency, and every
+client asks for a different symbol so neither the cache nor single-flight can
+hide the upstream calls. Run from the backend directory:
+
+    python -m benchmarks.concurrency --latency 0.2 --clients 1 2 4 8 16
+"""
+import os
+import time
+import asyncio
+import argparse
+
+os.environ.pop("MONGODB_URI", None)
+
+from app.main import app
+from app.providers import SyntheticProvider, set_provider
+from benchmarks.asgi import asgi_request
+
+async def run_round(n_clients, round_id):
+    payload = lambda i: {
+        "symbol": f"SYM{round_id}_{i}",
+        "period": "1y",
+        "interval": "1d",
+        "indicators": ["sma", "ema", "rsi", "macd"],
+    }
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        asgi_request(app, "POST", "/api/stocks/technical-analysis", payload(i))
+        for i in range(n_clients)
+    ])
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for status, _, _ in results if status != 200)
+    return elapsed, errors
+
+async def main(args):
+    set_provider(SyntheticProvider(latency=args.latency))
+    print(f"upstream latency {args.latency * 1000:.0f} ms, 1y of daily bars per symbol")
+    print(f"{'clients':>8} {'wall s':>8} {'req/s':>8} {'errors':>7}")
+    for round_id, n_clients in enumerate(args.clients):
+        elapsed, errors = await run_round(n_clients, round_id)
+        print(f"{n_clients:>8} {elapsed:>8.3f} {n_clients / elapsed:>8.1f} {errors:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="upstream latency in seconds")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    asyncio.run(main(parser.parse_args()))
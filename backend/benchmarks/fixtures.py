@@ -0,0 +1,42 @@
+import threading
+import pandas as pd
+from app.providers import MarketDataProvider, SyntheticProvider
+
+# Intervals from coarsest to finest, with the bars they have per trading day
+FIXTURE_INTERVALS = [("1d", 1), ("1h", 7), ("5m", 78), ("1m", 390)]
+# Synthetic paths start in 2000, so a fixture spans fewer trading days than that
+MAX_FIXTURE_DAYS = 6000
+
+def synthetic_frame(n_bars, symbol="SYN", seed=0):
+    """Build n_bars reproducible OHLCV bars of a symbol from the synthetic provider.
+
+    The coarsest interval that fits is used, so 1k to 1M bars stay cheap to build.
+    """
+    provider = SyntheticProvider(seed=seed)
+    for interval, per_day in FIXTURE_INTERVALS:
+        days = -(-n_bars // per_day)
+        if days <= MAX_FIXTURE_DAYS:
+            break
+    # Calendar days cover about 5/7 trading days, plus a margin for holidays and today
+    start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=int(days * 1.45) + 10)
+    return provider.history(symbol, interval, start=start).tail(n_bars).round(2)
+
+class FixtureProvider(MarketDataProvider):
+    """Serves the same number of synthetic bars for any symbol and period, built once per symbol"""
+
+    name = "fixture"
+
+    def __init__(self, n_bars, seed=0):
+        self.n_bars = n_bars
+        self.seed = seed
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def history(self, symbol, interval="1d", period=None, start=None, end=None):
+        with self._lock:
+            if symbol not in self._frames:
+                self._frames[symbol] = synthetic_frame(self.n_bars, symbol, self.seed)
+            return self._frames[symbol].copy()
+
+    def info(self, symbol):
+        return {"shortName": symbol}
@@ -0,0 +1,40 @@
+"""Time technical indicators on a frame that gains one bar per call, resumed versus recomputed.
+
+Every call appends one bar to a frame with a fixed start, as a max period or a range with a
+fixed start does. The exactness of the resumed values is covered by tests/test_indicator_state.py.
+Run from the backend directory:
+
+    python -m benchmarks.indicator_state --bars 2520 --appends 200
+"""
+import os
+import time
+import argparse
+
+os.environ.pop("MONGODB_URI", None)
+
+from app.providers import SyntheticProvider
+from app.utils.data_preprocessor import calculate_technical_indicators
+from app.utils.indicator_state import incremental_indicators
+from app.utils.indicators import INDICATORS
+
+def main(args):
+    df = SyntheticProvider().history("SYN", "1d", period="max").iloc[-(args.bars + args.appends):]
+    incremental_indicators("SYN", "1d", df.iloc[:args.bars], INDICATORS)
+
+    started = time.perf_counter()
+    for i in range(1, args.appends + 1):
+        incremental_indicators("SYN", "1d", df.iloc[:args.bars + i], INDICATORS)
+    incremental = (time.perf_counter() - started) / args.appends
+
+    started = time.perf_counter()
+    for i in range(1, args.appends + 1):
+        calculate_technical_indicators(df.iloc[:args.bars + i], INDICATORS)
+    batch = (time.perf_counter() - started) / args.appends
+    print(f"append one bar to {args.bars} bars: resumed {incremental * 1e6:.0f} us, "
+          f"batch recompute {batch * 1e6:.0f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=2520, help="bars in the frame before the appends (default: 10 years daily)")
+    parser.add_argument("--appends", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,290 @@
+"""Load-test the backend with a realistic request mix and find where throughput saturates.
+
+Virtual users send requests back to back for --duration seconds at every --users level, picking
+routes by weight and symbols with a skew towards popular ones. Requests run in-process through
+the ASGI app, or against uvicorn servers started with each --workers count (--spawn) or already
+running at --url. Market data comes from the synthetic provider unless --provider says otherwise.
+Run from the backend directory:
+
+    python -m benchmarks.load --users 1 4 16 64 --duration 10
+    python -m benchmarks.load --spawn --workers 1 2 4 --users 4 16 64 --duration 20 --histogram
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Latency histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf")]
+# Throughput within this share of the peak counts as saturated
+SATURATION_SHARE = 0.9
+REQUEST_TIMEOUT = 60
+
+def _data(pick):
+    return "POST", "/api/stocks/data", {"symbol": pick(1)[0], "period": "1y"}
+
+def _data_get(pick):
+    return "GET", f"/api/stocks/data?symbol={pick(1)[0]}&period=1y&format=columnar", None
+
+def _technical_analysis(pick):
+    return "POST", "/api/stocks/technical-analysis", {"symbol": pick(1)[0], "period": "1y"}
+
+def _chart_bundle(pick):
+    return "POST", "/api/stocks/chart-bundle", {"symbol": pick(1)[0], "period": "1y", "format": "columnar", "max_points": 2000}
+
+def _price_chart(pick):
+    return "POST", "/api/stocks/visualization", {"symbols": pick(3), "chart_type": "price", "period": "1y", "max_points": 2000}
+
+def _correlation(pick):
+    return "POST", "/api/stocks/visualization", {"symbols": pick(10), "chart_type": "correlation", "period": "1y"}
+
+def _hypothesis_test(pick):
+    return "POST", "/api/stocks/hypothesis-test", {"symbols": pick(2), "test_type": "correlation", "period": "1y"}
+
+def _available(pick):
+    return "GET", "/api/stocks/available", None
+
+# (route, weight, request builder) of the traffic the dashboard generates
+REQUEST_MIX = [
+    ("data", 30, _data),
+    ("data-get", 10, _data_get),
+    ("technical-analysis", 20, _technical_analysis),
+    ("chart-bundle", 15, _chart_bundle),
+    ("visualization-price", 10, _price_chart),
+    ("visualization-correlation", 5, _correlation),
+    ("hypothesis-test", 5, _hypothesis_test),
+    ("available", 5, _available),
+]
+
+class RequestMix:
+    """Draws requests by route weight, with symbol popularity falling off like 1/rank"""
+
+    def __init__(self, n_symbols):
+        self.symbols = [f"SYM{i:03d}" for i in range(n_symbols)]
+        self.popularity = [1 / (rank + 1) for rank in range(n_symbols)]
+        self.weights = [weight for _, weight, _ in REQUEST_MIX]
+
+    def next(self, rng):
+        def pick(count):
+            chosen = []
+            while len(chosen) < min(count, len(self.symbols)):
+                symbol = rng.choices(self.symbols, self.popularity)[0]
+                if symbol not in chosen:
+                    chosen.append(symbol)
+            return chosen
+
+        name, _, build = rng.choices(REQUEST_MIX, self.weights)[0]
+        return (name, *build(pick))
+
+class InProcessClient:
+    """Sends requests straight to the ASGI app on this event loop"""
+
+    def __init__(self):
+        from app.main import app
+        from benchmarks.asgi import asgi_request
+        self.app = app
+        self.asgi_request = asgi_request
+
+    async def request(self, method, path, body):
+        status, _, _ = await self.asgi_request(self.app, method, path, body)
+        return status
+
+    def close(self):
+        pass
+
+class HttpClient:
+    """Sends requests to a running server over pooled keep-alive connections"""
+
+    def __init__(self, url, max_users):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_users))
+        self.executor = ThreadPoolExecutor(max_workers=max_users, thread_name_prefix="load")
+
+    async def request(self, method, path, body):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self.executor, partial(
+            self.session.request, method, f"{self.url}{path}", json=body, timeout=REQUEST_TIMEOUT
+        ))
+        return response.status_code
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+async def run_level(client, mix, users, duration, seed):
+    """Run users back-to-back clients for duration seconds and collect latencies per route"""
+    samples = {name: [] for name, _, _ in REQUEST_MIX}
+    errors = {name: 0 for name, _, _ in REQUEST_MIX}
+    deadline = time.monotonic() + duration
+
+    async def user(index):
+        rng = random.Random(seed * 100003 + index)
+        while time.monotonic() < deadline:
+            name, method, path, body = mix.next(rng)
+            started = time.perf_counter()
+            try:
+                status = await client.request(method, path, body)
+            except Exception:
+                status = None
+            samples[name].append(time.perf_counter() - started)
+            if status not in (200, 304):
+                errors[name] += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*[user(i) for i in range(users)])
+    return summarize(samples, errors, time.monotonic() - started, users)
+
+def histogram(latencies):
+    """Count latencies into BUCKETS_MS"""
+    counts, _ = np.histogram(np.asarray(latencies) * 1000, bins=[0] + BUCKETS_MS)
+    return counts.tolist()
+
+def latency_stats(latencies, errors):
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+def summarize(samples, errors, elapsed, users):
+    every = [latency for latencies in samples.values() for latency in latencies]
+    total = latency_stats(every, sum(errors.values()))
+    return {
+        "users": users,
+        "seconds": elapsed,
+        "throughput": total["count"] / elapsed,
+        "error_rate": total["errors"] / total["count"] if total["count"] else 0.0,
+        "total": total,
+        "histogram": histogram(every),
+        "routes": {name: latency_stats(samples[name], errors[name]) for name in samples if samples[name]},
+    }
+
+def print_level(level, show_histogram):
+    total = level["total"]
+    print(f"\n{level['users']} users: {level['throughput']:.1f} req/s, "
+          f"p50 {total['p50_ms']:.0f} ms, p95 {total['p95_ms']:.0f} ms, p99 {total['p99_ms']:.0f} ms, "
+          f"errors {level['error_rate']:.1%}")
+    print(f"  {'route':<27} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in level["routes"].items():
+        print(f"  {name:<27} {stats['count']:>7} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['errors']:>7}")
+    if show_histogram:
+        peak = max(level["histogram"]) or 1
+        lower = 0
+        for upper, count in zip(BUCKETS_MS, level["histogram"]):
+            label = f"{lower:g}-{upper:g} ms" if upper != float("inf") else f">{lower:g} ms"
+            print(f"  {label:>14} {count:>7} {'#' * round(40 * count / peak)}")
+            lower = upper
+
+def saturation(levels):
+    """Get the smallest level reaching SATURATION_SHARE of the peak throughput"""
+    peak = max(level["throughput"] for level in levels)
+    return next(level for level in levels if level["throughput"] >= SATURATION_SHARE * peak)
+
+def wait_until_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if requests.get(f"{url}/api/stocks/available", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not answer within {timeout} seconds")
+
+@contextmanager
+def uvicorn_server(workers, port):
+    """Start app.main:app under uvicorn with the given worker processes"""
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=os.environ.copy()
+    )
+    try:
+        wait_until_ready(url, process)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+async def run_levels(client, args):
+    mix = RequestMix(args.symbols)
+    levels = []
+    for seed, users in enumerate(args.users):
+        level = await run_level(client, mix, users, args.duration, seed)
+        print_level(level, args.histogram)
+        levels.append(level)
+    knee = saturation(levels)
+    print(f"\nthroughput saturates at {knee['users']} users: {knee['throughput']:.1f} req/s, "
+          f"p95 {knee['total']['p95_ms']:.0f} ms")
+    return levels
+
+def run(client, args):
+    try:
+        return asyncio.run(run_levels(client, args))
+    finally:
+        client.close()
+
+def main(args):
+    # Settings are read when the app is imported, by this process or the spawned servers
+    os.environ["MARKET_DATA_PROVIDER"] = args.provider
+    os.environ["SYNTHETIC_LATENCY_SECONDS"] = str(args.upstream_latency)
+    if not args.mongo:
+        os.environ.pop("MONGODB_URI", None)
+    print(f"provider {args.provider}, upstream latency {args.upstream_latency * 1000:.0f} ms, "
+          f"{args.symbols} symbols, {args.duration:g} s per level")
+    runs = []
+    if args.spawn:
+        for workers in args.workers:
+            print(f"\n=== uvicorn with {workers} workers ===")
+            with uvicorn_server(workers, args.port) as url:
+                runs.append({"workers": workers, "levels": run(HttpClient(url, max(args.users)), args)})
+    elif args.url:
+        print(f"\n=== {args.url} ===")
+        runs.append({"url": args.url, "levels": run(HttpClient(args.url, max(args.users)), args)})
+    else:
+        print("\n=== in-process ===")
+        runs.append({"workers": 1, "levels": run(InProcessClient(), args)})
+    if len(runs) > 1:
+        print(f"\n{'workers':>8} {'saturation users':>17} {'req/s':>8} {'p95 ms':>8}")
+        for result in runs:
+            knee = saturation(result["levels"])
+            print(f"{result['workers']:>8} {knee['users']:>17} {knee['throughput']:>8.1f} {knee['total']['p95_ms']:>8.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"buckets_ms": BUCKETS_MS[:-1], "runs": runs}, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16, 64], help="concurrent users per level")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per level")
+    parser.add_argument("--symbols", type=int, default=50, help="size of the symbol universe")
+    parser.add_argument("--provider", default="synthetic", help="market data provider of the backend")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="latency of the synthetic provider in seconds")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn for every --workers count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="uvicorn worker counts with --spawn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="load a server already running at this URL")
+    parser.add_argument("--mongo", action="store_true", help="keep MONGODB_URI for the bar store")
+    parser.add_argument("--histogram", action="store_true", help="print a latency histogram per level")
+    parser.add_argument("--json", help="write every level's statistics and histogram to this file")
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""Compare time-to-first-token of the streaming NLP endpoint with the blocking one.
+
+The chat model is the local fake with a fixed latency before the first token and a delay
+between tokens, and every client sends a different query so the response cache never
+answers. Run from the backend directory:
+
+    python -m benchmarks.nlp_streaming --latency 0.5 --token-delay 0.02 --clients 1 8 32
+"""
+import os
+import time
+import asyncio
+import argparse
+
+os.environ.pop("MONGODB_URI", None)
+
+from app.main import app
+from app.providers import SyntheticProvider, set_provider
+from app.utils import llm
+from benchmarks.asgi import asgi_request
+
+async def timed_request(path, payload):
+    """Send one request and return (status, seconds to the first token, seconds to the end)"""
+    started = time.perf_counter()
+    first = None
+
+    def on_body(chunk):
+        nonlocal first
+        if first is None and b"event: token" in chunk:
+            first = time.perf_counter() - started
+
+    status, _, body = await asgi_request(app, "POST", path, payload, on_body=on_body)
+    total = time.perf_counter() - started
+    # The blocking endpoint delivers every token at once
+    return status, total if first is None else first, total
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def run_round(path, n_clients, round_id):
+    payload = lambda i: {
+        "query": f"Round {round_id} question {i}",
+        "symbols": ["AAPL", "MSFT"],
+        "period": "1y",
+    }
+    results = await asyncio.gather(*[timed_request(path, payload(i)) for i in range(n_clients)])
+    errors = sum(1 for status, _, _ in results if status != 200)
+    first = [ttft for _, ttft, _ in results]
+    total = [seconds for _, _, seconds in results]
+    return percentile(first, 0.5), percentile(first, 0.95), percentile(total, 0.5), errors
+
+async def main(args):
+    set_provider(SyntheticProvider())
+    llm.set_chat_model(llm.FakeChatModel(latency=args.latency, token_delay=args.token_delay))
+    print(f"model latency {args.latency * 1000:.0f} ms, {args.token_delay * 1000:.0f} ms per token")
+    print(f"{'endpoint':>10} {'clients':>8} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'errors':>7}")
+    round_id = 0
+    for name, path in [("blocking", "/api/stocks/nlp-analysis"), ("streaming", "/api/stocks/nlp-analysis/stream")]:
+        for n_clients in args.clients:
+            p50, p95, total, errors = await run_round(path, n_clients, round_id)
+            round_id += 1
+            print(f"{name:>10} {n_clients:>8} {p50 * 1000:>7.0f}ms {p95 * 1000:>7.0f}ms {total * 1000:>8.0f}ms {errors:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="model latency before the first token in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="model delay between tokens in seconds")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    asyncio.run(main(parser.parse_args()))
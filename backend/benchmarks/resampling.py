@@ -0,0 +1,54 @@
+"""Time permutation tests and block-bootstrap intervals across process counts.
+
+Run from the backend directory:
+
+    python -m benchmarks.resampling --resamples 100000 --bars 2520 --processes 1 2 4 8
+"""
+import time
+import argparse
+import numpy as np
+from app.utils import concurrency
+from app.utils.resampling import permutation_test, bootstrap_interval
+
+def use_processes(n):
+    """Restart the process pool with n workers"""
+    if concurrency._process_pool is not None:
+        concurrency._process_pool.shutdown()
+        concurrency._process_pool = None
+    concurrency.RESAMPLING_PROCESSES = n
+
+def main(args):
+    rng = np.random.default_rng(0)
+    a = rng.standard_t(4, args.bars) * 0.01 + 0.0004
+    b = 0.6 * a + rng.standard_t(4, args.bars) * 0.008
+    jobs = [
+        ("permutation mean difference", lambda: permutation_test("mean_difference", a, b, args.resamples, 1)),
+        ("permutation correlation", lambda: permutation_test("correlation", a, b, args.resamples, 1)),
+        ("bootstrap sharpe", lambda: bootstrap_interval("sharpe", a, None, args.resamples, seed=1)[:2]),
+    ]
+    print(f"{args.resamples} resamples of {args.bars} observations")
+    print(f"{'processes':>9} " + " ".join(f"{name:>28}" for name, _ in jobs))
+    reference = None
+    for n in args.processes:
+        use_processes(n)
+        if n > 1:
+            # Start the workers before timing
+            permutation_test("mean_difference", a[:10], b[:10], 1000, 0)
+        timings, results = [], []
+        for _, job in jobs:
+            started = time.perf_counter()
+            results.append(job())
+            timings.append(time.perf_counter() - started)
+        if reference is None:
+            reference = results
+        elif results != reference:
+            raise AssertionError("Results depend on the number of processes")
+        print(f"{n:>9} " + " ".join(f"{t:>27.2f}s" for t in timings))
+    use_processes(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resamples", type=int, default=100000)
+    parser.add_argument("--bars", type=int, default=2520, help="observations per series (default: 10 years daily)")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+"""Compare serialization time and payload size of /stocks/data response formats.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization --bars 8820 --repeat 5
+"""
+import json
+import time
+import argparse
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from app.utils.data_collector import frame_to_records
+from app.utils.serialization import FORMATS, stock_data_response
+from app.providers import SyntheticProvider
+
+def encode_records(df, info):
+    """Encode the legacy payload the way FastAPI does for a returned dict"""
+    content = {"symbol": "SYN", "data": frame_to_records(df), "info": info}
+    return json.dumps(jsonable_encoder(content)).encode()
+
+def decode(fmt, body):
+    """Decode a payload into a DataFrame the way a client would"""
+    if fmt == "records":
+        return pd.DataFrame(json.loads(body)["data"])
+    if fmt == "columnar":
+        return pd.DataFrame(json.loads(body)["data"])
+    if fmt == "msgpack":
+        import msgpack
+        return pd.DataFrame(msgpack.unpackb(body)["data"])
+    import pyarrow as pa
+    return pa.ipc.open_stream(body).read_all().to_pandas()
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main(args):
+    df = SyntheticProvider().history("SYN", "1h", period="max").tail(args.bars).round(2)
+    info = {"shortName": "Synthetic"}
+    print(f"{args.bars} bars, best of {args.repeat}")
+    print(f"{'format':>9} {'encode ms':>10} {'decode ms':>10} {'bytes':>10}")
+    for fmt in FORMATS:
+        if fmt == "records":
+            encode_time, body = best_of(args.repeat, encode_records, df, info)
+        else:
+            encode_time, response = best_of(args.repeat, stock_data_response, "SYN", df, info, fmt)
+            body = response.body
+        decode_time, _ = best_of(args.repeat, decode, fmt, body)
+        print(f"{fmt:>9} {encode_time * 1000:>10.1f} {decode_time * 1000:>10.1f} {len(body):>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=5 * 252 * 7, help="number of bars (default: 5 years of 1h bars)")
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
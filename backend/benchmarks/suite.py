@@ -0,0 +1,172 @@
+"""Time the analytics hot paths on synthetic fixtures and compare them with a saved baseline.
+
+Frame cases run on one symbol for every --bars size, symbol cases on every --symbols count with
+--symbol-bars bars per symbol. A comparison exits with status 1 when a case got slower than the
+baseline by more than --threshold. Run from the backend directory:
+
+    python -m benchmarks.suite --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --compare benchmarks/baselines/local.json --threshold 0.1
+
+The largest fixtures take minutes: add them with --bars 1000 1000000 --symbols 1 10 100 500.
+"""
+import os
+import re
+import sys
+import json
+import time
+import platform
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+os.environ.pop("MONGODB_URI", None)
+# scipy warns that Shapiro-Wilk p-values are approximate beyond 5000 observations
+warnings.filterwarnings("ignore", category=UserWarning)
+
+from app.providers import set_provider
+from app.utils import data_collector
+from app.utils.data_preprocessor import calculate_technical_indicators, calculate_technical_indicators_many
+from app.utils.hypothesis_testing import run_hypothesis_test, run_pairwise_tests
+from app.utils.indicators import INDICATORS
+from app.utils.serialization import stock_data_response, chart_data_response
+from app.utils.visualization import generate_chart_data
+from benchmarks.fixtures import FixtureProvider, synthetic_frame
+from benchmarks.serialization import encode_records
+
+CHART_TYPES = ["price", "returns", "correlation", "rolling"]
+# Symbols each hypothesis test type compares
+TEST_SYMBOLS = {"normality": ["SYN"], "correlation": ["SYN", "ALT"], "mean_comparison": ["SYN", "ALT"]}
+BINARY_FORMATS = ["columnar", "msgpack", "arrow"]
+
+def checked(result):
+    """Fail a case whose result reports an error rather than timing the error path"""
+    if isinstance(result, dict) and result.get("error"):
+        raise RuntimeError(result["error"])
+    return result
+
+def use_fixture(n_bars):
+    """Serve n_bars per symbol from the fixture provider, starting from a cold cache"""
+    set_provider(FixtureProvider(n_bars))
+    data_collector.stock_data_cache.clear()
+
+def frame_cases(n_bars):
+    """Yield (name, function) for the cases over one symbol's bars"""
+    df = synthetic_frame(n_bars)
+    info = {"shortName": "SYN"}
+    use_fixture(n_bars)
+    # get_stock_data post-processing: rounding and date formatting
+    yield "records", lambda: data_collector.frame_to_records(data_collector._round_prices(df.copy()))
+    yield "indicators", lambda: calculate_technical_indicators(df, INDICATORS)
+    for test_type, symbols in TEST_SYMBOLS.items():
+        yield f"hypothesis-{test_type}", lambda test_type=test_type, symbols=symbols: checked(
+            run_hypothesis_test(symbols, test_type)
+        )
+    yield "serialize-records", lambda: encode_records(df, info)
+    for fmt in BINARY_FORMATS:
+        yield f"serialize-{fmt}", lambda fmt=fmt: stock_data_response("SYN", df, info, fmt)
+
+def symbol_cases(n_symbols, n_bars):
+    """Yield (name, function) for the cases over several symbols"""
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+    use_fixture(n_bars)
+    frames = data_collector.get_stock_data_many(symbols)
+    yield "indicators-many", lambda: calculate_technical_indicators_many(frames, INDICATORS)
+    for chart_type in CHART_TYPES:
+        if chart_type == "correlation" and n_symbols < 2:
+            continue
+        yield f"chart-{chart_type}", lambda chart_type=chart_type: checked(generate_chart_data(
+            symbols, chart_type, indicators=INDICATORS if chart_type == "price" else None
+        ))
+    if n_symbols >= 2:
+        yield "hypothesis-pairwise", lambda: checked(run_pairwise_tests(symbols, "correlation"))
+    chart_data = checked(generate_chart_data(symbols, "price", date_format="epoch_ms"))
+    for fmt in BINARY_FORMATS:
+        yield f"serialize-chart-{fmt}", lambda fmt=fmt: chart_data_response(chart_data, fmt)
+
+def measure(func, repeat):
+    """Run a case once to warm caches, then time it repeat times"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {"best_ms": min(timings) * 1000, "median_ms": float(np.median(timings)) * 1000}
+
+def run(args):
+    pattern = re.compile(args.filter) if args.filter else None
+    groups = [(f"bars={n}", frame_cases, (n,)) for n in args.bars]
+    groups += [(f"symbols={n}", symbol_cases, (n, args.symbol_bars)) for n in args.symbols]
+    results = {}
+    print(f"{'case':<44} {'best ms':>10} {'median ms':>10}")
+    for label, cases, params in groups:
+        for name, func in cases(*params):
+            key = f"{name}/{label}"
+            if pattern is not None and not pattern.search(key):
+                continue
+            results[key] = measure(func, args.repeat)
+            print(f"{key:<44} {results[key]['best_ms']:>10.2f} {results[key]['median_ms']:>10.2f}")
+    return results
+
+def environment(args):
+    return {
+        "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+    }
+
+def compare(results, baseline, threshold):
+    """Print every case against the baseline and return the cases that got slower than the threshold"""
+    if baseline["environment"]["platform"] != platform.platform():
+        print(f"note: baseline was recorded on {baseline['environment']['platform']}")
+    regressions = []
+    print(f"{'case':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, result in results.items():
+        base = baseline["results"].get(key)
+        if base is None:
+            print(f"{key:<44} {'':>10} {result['best_ms']:>10.2f} {'':>8}  new")
+            continue
+        # Best times are the least disturbed by other load on the machine
+        change = result["best_ms"] / base["best_ms"] - 1
+        status = "REGRESSION" if change > threshold else "faster" if change < -threshold else "ok"
+        if status == "REGRESSION":
+            regressions.append(key)
+        print(f"{key:<44} {base['best_ms']:>10.2f} {result['best_ms']:>10.2f} {change:>+8.1%}  {status}")
+    return regressions
+
+def main(args):
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    results = run(args)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(args), "results": results}, f, indent=2)
+        print(f"saved {len(results)} cases to {args.save}")
+    if baseline is not None:
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} cases regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="bar counts of the frame cases (fixtures support up to 1M)")
+    parser.add_argument("--symbols", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--symbol-bars", type=int, default=2520, help="bars per symbol (default: 10 years daily)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", help="regular expression selecting cases by name, e.g. 'chart-|/bars=1000$'")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare the results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown flagged as a regression (default: 10%%)")
+    main(parser.parse_args())
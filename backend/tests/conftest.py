@@ -0,0 +1,32 @@
+import os
+
+# Tests never reach a real MongoDB or market data provider
+os.environ.pop("MONGODB_URI", None)
+os.environ["MARKET_DATA_PROVIDER"] = "synthetic"
+
+import mongomock
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils import bar_store
+from app.utils.cache import _caches
+
+@pytest.fixture
+def mongo():
+    """Point the bar store at an in-memory mongomock database"""
+    bar_store.set_client(mongomock.MongoClient())
+    yield bar_store.get_database()
+    bar_store.set_client(None)
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test from empty in-process caches"""
+    for cache in _caches:
+        cache.clear()
+    yield
+
+@pytest.fixture(scope="session")
+def client():
+    """Call the API within one application lifespan, as its shutdown stops the shared executors"""
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,170 @@
+import pandas as pd
+import pytest
+from app.providers import SyntheticProvider
+from app.utils import bar_store
+
+class FakeDownload:
+    """Serves one symbol's synthetic daily bars and records how the store asked for them"""
+
+    def __init__(self, hidden=0):
+        self.frame = SyntheticProvider().history("SYN", "1d", period="1y")
+        self.frame.index.name = "Date"
+        # The newest bars the provider does not have yet
+        self.hidden = hidden
+        self.dividend = False
+        self.empty = False
+        self.calls = []
+
+    def available(self):
+        return self.frame.iloc[:len(self.frame) - self.hidden].copy()
+
+    def __call__(self, period=None, start=None):
+        self.calls.append("period" if start is None else "tail")
+        if self.empty:
+            return pd.DataFrame()
+        df = self.available()
+        if start is not None:
+            df = df[df.index >= start]
+            if self.dividend:
+                df.loc[df.index[-1], "Dividends"] = 0.5
+        return df
+
+def test_serves_stored_bars_without_downloading(mongo):
+    download = FakeDownload()
+    first = bar_store.get_bars("SYN", "1y", "1d", download)
+    second = bar_store.get_bars("SYN", "1y", "1d", download)
+    assert download.calls == ["period"]
+    assert len(first) == len(download.frame)
+    pd.testing.assert_frame_equal(first, second)
+
+def test_fetches_only_the_missing_tail(mongo, monkeypatch):
+    download = FakeDownload(hidden=5)
+    bar_store.get_bars("SYN", "1y", "1d", download)
+    last_ts = mongo[bar_store.COVERAGE_COLLECTION].find_one({"symbol": "SYN"})["end"]
+
+    monkeypatch.setattr(bar_store, "REFRESH_SECONDS", 0)
+    download.hidden = 0
+    bars = bar_store.get_bars("SYN", "1y", "1d", download)
+    assert download.calls == ["period", "tail"]
+    assert len(bars) == len(download.frame)
+    assert bars.index[-1] == download.frame.index[-1]
+    coverage = mongo[bar_store.COVERAGE_COLLECTION].find_one({"symbol": "SYN"})
+    assert coverage["end"] > last_ts
+
+def test_bulk_upserts_are_idempotent(mongo):
+    df = FakeDownload().frame
+    bar_store._write_bars(mongo, "SYN", "1d", df)
+    bar_store._write_bars(mongo, "SYN", "1d", df)
+    bars = mongo[bar_store.BARS_COLLECTION]
+    assert bars.count_documents({"symbol": "SYN"}) == len(df)
+
+    revised = df.copy()
+    revised["Close"] += 1
+    bar_store._write_bars(mongo, "SYN", "1d", revised)
+    assert bars.count_documents({"symbol": "SYN"}) == len(df)
+    stored = bars.find_one({"symbol": "SYN", "ts": bar_store._stored_ts(df.index[0])})
+    assert stored["Close"] == pytest.approx(revised["Close"].iloc[0])
+
+def test_resets_history_on_dividends_and_splits(mongo, monkeypatch):
+    download = FakeDownload(hidden=5)
+    bar_store.get_bars("SYN", "1y", "1d", download)
+
+    monkeypatch.setattr(bar_store, "REFRESH_SECONDS", 0)
+    download.hidden = 0
+    download.dividend = True
+    bars = bar_store.get_bars("SYN", "1y", "1d", download)
+    # The tail revealed a dividend, so the whole period was downloaded again
+    assert download.calls == ["period", "tail", "period"]
+    assert len(bars) == len(download.frame)
+    assert mongo[bar_store.BARS_COLLECTION].count_documents({"symbol": "SYN"}) == len(download.frame)
+
+def test_failed_redownload_leaves_no_coverage(mongo, monkeypatch):
+    download = FakeDownload(hidden=5)
+    bar_store.get_bars("SYN", "1y", "1d", download)
+
+    monkeypatch.setattr(bar_store, "REFRESH_SECONDS", 0)
+    download.hidden = 0
+    download.dividend = True
+    original = download.__call__
+
+    def failing(period=None, start=None):
+        # The tail reveals the dividend, then the full download comes back empty
+        download.empty = start is None
+        return original(period, start)
+
+    assert bar_store.get_bars("SYN", "1y", "1d", failing).empty
+    assert mongo[bar_store.BARS_COLLECTION].count_documents({"symbol": "SYN"}) == 0
+    assert mongo[bar_store.COVERAGE_COLLECTION].find_one({"symbol": "SYN"}) is None
+
+    # The next call downloads the whole period instead of trusting a tail fetch
+    download.empty = False
+    download.dividend = False
+    download.calls.clear()
+    bars = bar_store.get_bars("SYN", "1y", "1d", download)
+    assert download.calls == ["period"]
+    assert len(bars) == len(download.frame)
+
+class FakeRangeDownload:
+    """Serves synthetic daily bars chunk by chunk for ranges and records the ranges asked for"""
+
+    def __init__(self):
+        self.frame = SyntheticProvider().history("SYN", "1d", period="1y")
+        self.frame.index.name = "Date"
+        self.dividend = False
+        self.calls = []
+
+    def ts(self, i):
+        return self.frame.index[i].tz_convert("UTC")
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        df = self.frame[(self.frame.index >= start) & (self.frame.index < end)].copy()
+        if self.dividend and not df.empty:
+            df.loc[df.index[-1], "Dividends"] = 0.5
+        # Two chunks, as the data collector yields them
+        middle = len(df) // 2
+        return iter([df.iloc[:middle], df.iloc[middle:]])
+
+def test_range_downloads_only_the_missing_head_and_tail(mongo, monkeypatch):
+    download = FakeRangeDownload()
+    frame = download.frame
+    bars = bar_store.get_range("SYN", "1d", download.ts(100), download.ts(200), download)
+    pd.testing.assert_index_equal(bars.index, frame.index[100:200])
+    assert download.calls == [(download.ts(100), download.ts(200))]
+
+    # An earlier start fetches only the head
+    bars = bar_store.get_range("SYN", "1d", download.ts(50), download.ts(200), download)
+    pd.testing.assert_index_equal(bars.index, frame.index[50:200])
+    assert download.calls[1] == (download.ts(50), download.ts(100))
+
+    # A later end fetches only the tail, from the last stored bar on
+    monkeypatch.setattr(bar_store, "REFRESH_SECONDS", 0)
+    bars = bar_store.get_range("SYN", "1d", download.ts(50), download.ts(220), download)
+    pd.testing.assert_index_equal(bars.index, frame.index[50:220])
+    assert download.calls[2] == (download.ts(199), download.ts(220))
+    assert len(download.calls) == 3
+    assert mongo[bar_store.BARS_COLLECTION].count_documents({"symbol": "SYN"}) == 170
+    pd.testing.assert_series_equal(bars["Close"], frame["Close"].iloc[50:220])
+
+def test_range_resets_history_on_dividends_and_splits(mongo, monkeypatch):
+    download = FakeRangeDownload()
+    bar_store.get_range("SYN", "1d", download.ts(50), download.ts(200), download)
+
+    monkeypatch.setattr(bar_store, "REFRESH_SECONDS", 0)
+    download.dividend = True
+    bars = bar_store.get_range("SYN", "1d", download.ts(50), download.ts(220), download)
+    # The tail revealed a dividend, so the whole range was downloaded again
+    assert download.calls[1:] == [
+        (download.ts(199), download.ts(220)),
+        (download.ts(50), download.ts(220)),
+    ]
+    pd.testing.assert_index_equal(bars.index, download.frame.index[50:220])
+    assert mongo[bar_store.BARS_COLLECTION].count_documents({"symbol": "SYN"}) == 170
+
+def test_range_reads_only_the_requested_slice(mongo):
+    download = FakeRangeDownload()
+    frame = download.frame
+    bars = bar_store.get_range(
+        "SYN", "1d", download.ts(50), download.ts(200), download, after=download.ts(59), limit=10
+    )
+    pd.testing.assert_index_equal(bars.index, frame.index[60:70])
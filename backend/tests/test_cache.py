@@ -0,0 +1,118 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.providers import SyntheticProvider, set_provider
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache
+from app.utils.data_collector import get_stock_frame
+
+CALLERS = 50
+
+@pytest.fixture
+def cache():
+    cache = TTLCache("test")
+    yield cache
+    cache_module._caches.remove(cache)
+
+def concurrently(func):
+    """Call func from CALLERS threads released at the same moment"""
+    barrier = threading.Barrier(CALLERS)
+
+    def call(_):
+        barrier.wait()
+        try:
+            return func()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        return list(pool.map(call, range(CALLERS)))
+
+def test_concurrent_identical_loads_run_once(cache):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.2)
+        return {"bars": 42}
+
+    results = concurrently(lambda: cache.get_or_load("AAPL", loader, 60))
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == CALLERS - 1
+    assert cache.get_or_load("AAPL", loader, 60) is results[0]
+    assert len(loads) == 1
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached(cache):
+    loads = []
+
+    def failing():
+        loads.append(1)
+        time.sleep(0.2)
+        raise RuntimeError("upstream down")
+
+    results = concurrently(lambda: cache.get_or_load("AAPL", failing, 60))
+    assert len(loads) == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream down" for result in results)
+    assert cache.get("AAPL") is None
+    # The next call loads again
+    assert cache.get_or_load("AAPL", lambda: "bars", 60) == "bars"
+
+def test_expired_entries_are_loaded_again(cache):
+    cache.set("AAPL", "old", 0.05)
+    time.sleep(0.1)
+    assert cache.get_or_load("AAPL", lambda: "new", 60) == "new"
+    assert cache.stats()["expirations"] == 1
+
+def test_least_recently_used_entries_are_evicted_beyond_max_entries():
+    cache = TTLCache("test_entries", max_entries=3)
+    try:
+        for key in "abc":
+            cache.set(key, key, 60)
+        cache.get("a")
+        cache.set("d", "d", 60)
+        assert cache.get("b") is None
+        assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+        assert cache.stats()["evictions"] == 1
+    finally:
+        cache_module._caches.remove(cache)
+
+def test_entries_are_evicted_beyond_max_bytes():
+    cache = TTLCache("test_bytes", max_entries=100, max_bytes=250, sizeof=len)
+    try:
+        for key in "abc":
+            cache.set(key, "x" * 100, 60)
+        stats = cache.stats()
+        assert stats["bytes"] == 200
+        assert stats["entries"] == 2
+        assert cache.get("a") is None
+        # Replacing an entry frees its old size first
+        cache.set("c", "x" * 50, 60)
+        assert cache.stats()["bytes"] == 150
+        assert cache.get("b") is not None
+    finally:
+        cache_module._caches.remove(cache)
+
+class CountingProvider(SyntheticProvider):
+    """Synthetic provider that counts its history downloads"""
+
+    def __init__(self):
+        super().__init__(latency=0.2)
+        self.downloads = 0
+
+    def history(self, *args, **kwargs):
+        self.downloads += 1
+        return super().history(*args, **kwargs)
+
+def test_concurrent_requests_for_a_frame_download_it_once():
+    provider = CountingProvider()
+    set_provider(provider)
+    try:
+        frames = concurrently(lambda: get_stock_frame("AAPL", "1y", "1d"))
+    finally:
+        set_provider(None)
+    assert provider.downloads == 1
+    assert all(frame is frames[0] for frame in frames)
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from app.providers import SyntheticProvider
+from app.utils.delta import data_version, delta_frame
+
+@pytest.fixture
+def frame():
+    return SyntheticProvider().history("SYN", "1d", period="1y")
+
+def test_new_bars_are_sent_alone(frame):
+    held = frame.iloc[:-3]
+    delta, reset = delta_frame(frame, held.index[-1], data_version(held))
+    assert not reset
+    pd.testing.assert_frame_equal(delta, frame.iloc[-3:])
+
+def test_up_to_date_client_gets_nothing(frame):
+    delta, reset = delta_frame(frame, frame.index[-1], data_version(frame))
+    assert not reset
+    assert delta.empty
+
+def test_revised_last_bar_is_sent_again(frame):
+    held = frame.iloc[:-3].copy()
+    # The client saw the last bar while it was still forming
+    held.iloc[-1, held.columns.get_loc("Close")] -= 1
+    delta, reset = delta_frame(frame, held.index[-1], data_version(held))
+    assert not reset
+    pd.testing.assert_frame_equal(delta, frame.iloc[-4:])
+
+def test_without_version_the_bar_at_since_is_always_sent(frame):
+    delta, reset = delta_frame(frame, frame.index[-4])
+    assert not reset
+    pd.testing.assert_frame_equal(delta, frame.iloc[-4:])
+
+def test_changed_settled_bars_reset_the_client(frame):
+    held = frame.iloc[:-3].copy()
+    # Dividend adjustments rewrite the settled bars
+    held["Close"] *= 1.01
+    delta, reset = delta_frame(frame, held.index[-1], data_version(held))
+    assert reset
+    pd.testing.assert_frame_equal(delta, frame)
+
+def test_stale_version_resets_the_client(frame):
+    # A version of an earlier poll does not describe the bar at since
+    stale = data_version(frame.iloc[:-10])
+    delta, reset = delta_frame(frame, frame.index[-4], stale)
+    assert reset
+    pd.testing.assert_frame_equal(delta, frame)
+
+def test_since_outside_the_period_resets_the_client(frame):
+    delta, reset = delta_frame(frame, frame.index[0] - pd.Timedelta(days=400), data_version(frame))
+    assert reset
+    assert len(delta) == len(frame)
+
+def test_naive_since_is_read_in_the_exchange_time_zone(frame):
+    assert frame.index.tz is not None
+    held = frame.iloc[:-3]
+    local = held.index[-1].tz_localize(None)
+    delta, reset = delta_frame(frame, local, data_version(held))
+    assert not reset
+    pd.testing.assert_frame_equal(delta, frame.iloc[-3:])
+    # The same wall time read as UTC is not a bar of the frame
+    _, reset = delta_frame(frame, local.tz_localize("UTC"), data_version(held))
+    assert reset
+
+def test_invalid_version_is_rejected(frame):
+    with pytest.raises(ValueError):
+        delta_frame(frame, frame.index[-1], "abc")
+
+def test_polling_over_the_api(client):
+    payload = {"symbol": "SYN", "period": "1y", "format": "columnar"}
+    full = client.post("/api/stocks/data", json=payload).json()
+    last = pd.Timestamp(full["data"]["Date"][-1], unit="ms", tz="UTC")
+    poll = client.post("/api/stocks/data", json={**payload, "since": last.isoformat(), "version": full["version"]})
+    assert poll.status_code == 200
+    body = poll.json()
+    assert body["reset"] is False
+    assert body["data"]["Date"] == []
+    assert body["version"] == full["version"]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from app.utils.downsampling import lttb_indices, minmax_indices
+
+def series(seed, n):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0, 1, n))
+    # A spike that smoothing methods tend to lose
+    values[int(rng.integers(1, n - 1))] += 50
+    return values
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_points", [3, 4, 5, 10, 101, 999])
+def test_lttb_keeps_the_endpoints_within_max_points(seed, max_points):
+    y = series(seed, 1000)
+    indices = lttb_indices(np.arange(len(y)), y, max_points)
+    assert len(indices) <= max_points
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert (np.diff(indices) > 0).all()
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_points", [3, 4, 5, 10, 101, 999])
+def test_minmax_keeps_the_endpoints_within_max_points(seed, max_points):
+    y = series(seed, 1000)
+    indices = minmax_indices(y, max_points=max_points)
+    assert len(indices) <= max_points
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert (np.diff(indices) > 0).all()
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_points", [4, 5, 10, 101])
+def test_minmax_keeps_the_global_extremes(seed, max_points):
+    y = series(seed, 1000)
+    y[::97] = np.nan
+    low, high = y - 1, y + 1
+    indices = minmax_indices(low, high, max_points)
+    assert np.nanargmin(low) in indices
+    assert np.nanargmax(high) in indices
+
+def test_minmax_with_three_points_keeps_the_larger_extreme():
+    y = np.zeros(100)
+    y[30], y[60] = -1, 5
+    assert minmax_indices(y, max_points=3).tolist() == [0, 60, 99]
+
+def test_short_series_are_kept_whole():
+    y = series(0, 10)
+    assert lttb_indices(np.arange(10), y, 10).tolist() == list(range(10))
+    assert minmax_indices(y, max_points=20).tolist() == list(range(10))
+
+@pytest.mark.parametrize("downsample", ["lttb", "minmax"])
+def test_stock_data_returns_at_most_max_points(client, downsample):
+    response = client.post("/api/stocks/data", json={
+        "symbol": "AAPL", "period": "1y", "max_points": 3, "downsample": downsample, "format": "columnar"
+    })
+    assert response.status_code == 200
+    assert len(response.json()["data"]["Date"]) == 3
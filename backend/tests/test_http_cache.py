@@ -0,0 +1,90 @@
+import pytest
+from app.providers import SyntheticProvider, set_provider
+from app.services import stocks_chart_bundle_service, stocks_technical_analysis_service
+from app.utils.cache import _caches
+from app.utils.data_collector import RANGE_TTL_SECONDS, data_ttl
+
+ENDPOINTS = {
+    "/api/stocks/data": {"symbol": "SYN", "period": "1y", "format": "columnar"},
+    "/api/stocks/technical-analysis": {"symbol": "SYN", "period": "1y"},
+    "/api/stocks/chart-bundle": {"symbol": "SYN", "period": "1y", "format": "columnar"},
+}
+
+@pytest.fixture
+def indicator_calls(monkeypatch):
+    """Count the indicator computations of the single-symbol services"""
+    calls = []
+    for service in (stocks_technical_analysis_service, stocks_chart_bundle_service):
+        compute = service.incremental_indicators
+
+        def counting(*args, compute=compute, **kwargs):
+            calls.append(args[0])
+            return compute(*args, **kwargs)
+
+        monkeypatch.setattr(service, "incremental_indicators", counting)
+    return calls
+
+@pytest.fixture
+def provider():
+    """Serve other bars than the default provider, restoring it afterwards"""
+    yield set_provider
+    set_provider(None)
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_matching_etag_is_answered_with_304_before_any_work(client, indicator_calls, path):
+    first = client.post(path, json=ENDPOINTS[path])
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    computed = len(indicator_calls)
+    assert computed == (path != "/api/stocks/data")
+
+    second = client.post(path, json=ENDPOINTS[path], headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert len(indicator_calls) == computed
+
+    # Weak and listed validators match too
+    third = client.post(path, json=ENDPOINTS[path], headers={"If-None-Match": f'"other", W/{etag}'})
+    assert third.status_code == 304
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_etag_changes_with_the_request(client, path):
+    etag = client.post(path, json=ENDPOINTS[path]).headers["etag"]
+    other = client.post(path, json={**ENDPOINTS[path], "period": "6mo"})
+    assert other.headers["etag"] != etag
+    assert client.post(path, json=ENDPOINTS[path], headers={"If-None-Match": other.headers["etag"]}).status_code == 200
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_etag_changes_with_the_bars(client, provider, path):
+    etag = client.post(path, json=ENDPOINTS[path]).headers["etag"]
+    provider(SyntheticProvider(seed=1))
+    for cache in _caches:
+        cache.clear()
+    response = client.post(path, json=ENDPOINTS[path], headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+@pytest.mark.parametrize("interval", ["1m", "5m", "1h", "1d"])
+def test_max_age_follows_the_interval(client, interval):
+    response = client.post("/api/stocks/data", json={"symbol": "SYN", "period": "5d", "interval": interval})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == f"public, max-age={data_ttl(interval)}"
+
+def test_ranges_that_ended_are_kept_longer(client):
+    response = client.post("/api/stocks/data", json={
+        "symbol": "SYN", "interval": "1d", "start": "2024-01-01T00:00:00Z", "end": "2024-03-01T00:00:00Z"
+    })
+    assert response.headers["cache-control"] == f"public, max-age={RANGE_TTL_SECONDS}"
+
+@pytest.mark.parametrize("path, query", [
+    ("/api/stocks/data", "symbol=SYN&period=1y&format=columnar"),
+    ("/api/stocks/technical-analysis", "symbol=SYN&period=1y"),
+])
+def test_get_and_post_share_the_etag(client, path, query):
+    posted = client.post(path, json=ENDPOINTS[path])
+    fetched = client.get(f"{path}?{query}")
+    assert fetched.status_code == 200
+    assert fetched.headers["etag"] == posted.headers["etag"]
+    assert fetched.content == posted.content
+    assert client.get(f"{path}?{query}", headers={"If-None-Match": posted.headers["etag"]}).status_code == 304
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from app.providers import SyntheticProvider
+from app.utils import indicator_state
+from app.utils.data_preprocessor import calculate_technical_indicators
+from app.utils.indicator_state import IndicatorState, incremental_indicators
+from app.utils.indicators import INDICATORS, compute_indicator_matrix
+
+CUSTOM_WINDOWS = {"sma": [3, 7], "ema": [5], "rsi": [4, 9], "macd": [3, 8, 4], "bollinger": [6, 1.5]}
+
+@pytest.fixture
+def frame():
+    return SyntheticProvider().history("SYN", "1d", period="2y")
+
+@pytest.fixture
+def updates(monkeypatch):
+    """Record how many closes every IndicatorState.update call processes"""
+    sizes = []
+    update = IndicatorState.update
+
+    def counting(self, closes):
+        sizes.append(len(closes))
+        return update(self, closes)
+
+    monkeypatch.setattr(IndicatorState, "update", counting)
+    return sizes
+
+def batch(df, windows=None):
+    return calculate_technical_indicators(df, INDICATORS, windows)
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("windows", [None, CUSTOM_WINDOWS])
+def test_update_matches_batch_engine_over_random_chunks(seed, windows):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 400))
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    # Leading and interior gaps
+    close[:int(rng.integers(0, 20))] = np.nan
+    close[rng.integers(0, n, 3)] = np.nan
+    expected = compute_indicator_matrix(close, INDICATORS, windows)
+
+    state = IndicatorState(INDICATORS, windows)
+    parts = {name: [] for name in expected}
+    start = 0
+    while start < n:
+        step = int(rng.integers(0, 40))
+        for name, values in state.update(close[start:start + step]).items():
+            parts[name].append(values)
+        # Round-trip through persistence between chunks
+        state = IndicatorState.from_dict(state.to_dict())
+        start += step
+    for name, values in expected.items():
+        np.testing.assert_array_equal(np.concatenate(parts[name]), values[:, 0])
+
+@pytest.mark.parametrize("windows", [None, CUSTOM_WINDOWS])
+def test_first_call_matches_batch(frame, windows):
+    assert incremental_indicators("SYN", "1d", frame, INDICATORS, windows) == batch(frame, windows)
+
+def test_appended_bars_are_processed_alone(frame, updates):
+    incremental_indicators("SYN", "1d", frame.iloc[:400], INDICATORS)
+    updates.clear()
+    result = incremental_indicators("SYN", "1d", frame.iloc[:403], INDICATORS)
+    assert result == batch(frame.iloc[:403])
+    # The previous provisional bar and two new ones are committed, then the new last bar is provisional
+    assert updates == [3, 1]
+
+def test_provisional_last_bar_is_never_committed(frame):
+    incremental_indicators("SYN", "1d", frame.iloc[:400], INDICATORS)
+    revised = frame.iloc[:400].copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] *= 1.05
+    assert incremental_indicators("SYN", "1d", revised, INDICATORS) == batch(revised)
+    assert incremental_indicators("SYN", "1d", frame.iloc[:401], INDICATORS) == batch(frame.iloc[:401])
+
+def test_rolling_period_matches_batch_over_the_frame(frame):
+    # A 1y window moving forward one bar per call, as a 1y period does every trading day
+    for start in range(60):
+        window = frame.iloc[start:start + 252]
+        assert incremental_indicators("SYN", "1d", window, INDICATORS) == batch(window)
+
+def test_frame_inside_a_longer_history_matches_batch(frame):
+    incremental_indicators("SYN", "1d", frame.iloc[:300], INDICATORS)
+    assert incremental_indicators("SYN", "1d", frame.iloc[100:301], INDICATORS) == batch(frame.iloc[100:301])
+
+def test_frame_starting_before_history_starts_a_new_one(frame):
+    incremental_indicators("SYN", "1d", frame.iloc[100:300], INDICATORS)
+    assert incremental_indicators("SYN", "1d", frame.iloc[:300], INDICATORS) == batch(frame.iloc[:300])
+
+def test_adjusted_history_starts_a_new_one(frame):
+    incremental_indicators("SYN", "1d", frame.iloc[:300], INDICATORS)
+    adjusted = frame.iloc[:301].copy()
+    adjusted["Close"] *= 0.9
+    assert incremental_indicators("SYN", "1d", adjusted, INDICATORS) == batch(adjusted)
+
+def test_stale_frame_is_answered_from_history(frame):
+    incremental_indicators("SYN", "1d", frame.iloc[:300], INDICATORS)
+    # A frame ending at the last committed bar, e.g. a cached frame another request refreshed past
+    assert incremental_indicators("SYN", "1d", frame.iloc[:299], INDICATORS) == batch(frame.iloc[:299])
+
+def test_memory_cache_is_bounded_by_bytes(frame, monkeypatch):
+    monkeypatch.setattr(indicator_state._state_cache, "max_bytes", 200_000)
+    for start in range(20):
+        incremental_indicators("SYN", "1d", frame.iloc[start:start + 300], INDICATORS)
+    stats = indicator_state._state_cache.stats()
+    assert 0 < stats["bytes"] <= 200_000
+    assert stats["evictions"] > 0
+
+def test_history_is_stored_in_chunks(frame, mongo, monkeypatch):
+    monkeypatch.setattr(indicator_state, "CHUNK_BARS", 64)
+    chunks = mongo[indicator_state.SERIES_COLLECTION]
+    incremental_indicators("SYN", "1d", frame.iloc[:300], INDICATORS)
+    assert chunks.count_documents({}) == 5
+    chunks.update_many({"chunk": {"$lt": 4}}, {"$set": {"untouched": True}})
+
+    # A fresh process reads the history back from the bar store
+    indicator_state._state_cache.clear()
+    result = incremental_indicators("SYN", "1d", frame.iloc[:310], INDICATORS)
+    assert result == batch(frame.iloc[:310])
+    assert chunks.count_documents({"untouched": True}) == 4
+    assert chunks.count_documents({}) == 5
+    # Every chunk expires with the state
+    expires = {doc["expires_at"] for doc in chunks.find()}
+    expires.add(mongo[indicator_state.STATE_COLLECTION].find_one()["expires_at"])
+    assert len(expires) == 1
@@ -0,0 +1,61 @@
+import time
+import asyncio
+import pandas as pd
+import pytest
+from app.utils import jobs
+from app.utils.jobs import submit_job
+
+def finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job["status"] in jobs.PENDING:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return job
+
+@pytest.fixture(params=[False, True], ids=["memory", "mongo"])
+def store(request):
+    if request.param:
+        yield request.getfixturevalue("mongo")
+    else:
+        yield None
+
+def test_identical_submissions_share_a_job_while_its_data_is_fresh(store):
+    runs = []
+    first = finished(submit_job("test", {"n": 1}, lambda: runs.append(1) or len(runs), fresh_seconds=60))
+    second = submit_job("test", {"n": 1}, lambda: runs.append(1) or len(runs), fresh_seconds=60)
+    assert second["_id"] == first["_id"]
+    assert second["result"] == 1
+    assert runs == [1]
+
+def test_jobs_run_again_once_their_data_is_stale(store):
+    runs = []
+    first = finished(submit_job("test", {"n": 2}, lambda: runs.append(1) or len(runs), fresh_seconds=0.05))
+    time.sleep(0.1)
+    second = finished(submit_job("test", {"n": 2}, lambda: runs.append(1) or len(runs), fresh_seconds=0.05))
+    assert second["_id"] == first["_id"]
+    assert second["result"] == 2
+
+def test_jobs_left_pending_by_a_crashed_process_run_again(mongo):
+    key = jobs.job_id("test", {"n": 3})
+    started = jobs._now() - pd.Timedelta(seconds=jobs.JOB_TIMEOUT_SECONDS + 60).to_pytimedelta()
+    # What a process that crashed while running the job left behind
+    mongo[jobs.JOBS_COLLECTION].insert_one({
+        "_id": key,
+        "kind": "test",
+        "status": "running",
+        "submitted_at": started,
+        "started_at": started,
+        "fresh_seconds": 60,
+        "deadline": jobs._after(started, jobs.JOB_TIMEOUT_SECONDS),
+        "expires_at": jobs._expires_at(jobs._now()),
+    })
+
+    # Pollers are told it failed instead of waiting until it expires
+    lost = asyncio.run(jobs.wait_for_job(key, timeout=1))
+    assert lost["status"] == "failed"
+    assert "did not finish" in lost["error"]
+
+    job = finished(submit_job("test", {"n": 3}, lambda: "done", fresh_seconds=60))
+    assert job["_id"] == key
+    assert job["result"] == "done"
+    assert mongo[jobs.JOBS_COLLECTION].find_one({"_id": key})["status"] == "succeeded"
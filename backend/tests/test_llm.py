@@ -0,0 +1,118 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.utils import llm
+from app.utils.llm import FakeChatModel, cached_completion, prompt_key, stream_completion
+
+TEMPLATE = "Stock data:\n{data_summary}\n\nUser request: {query}"
+INPUTS = {"data_summary": "Symbol: AAPL\nChange: 1.5%", "query": "How did it do?"}
+
+class CountingChatModel(FakeChatModel):
+    """Fake chat model that counts the completions it generates"""
+
+    calls: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+async def collect(inputs=INPUTS):
+    return "".join([chunk async for chunk in stream_completion(TEMPLATE, inputs)])
+
+@pytest.fixture
+def model():
+    model = CountingChatModel()
+    llm.set_chat_model(model)
+    yield model
+    llm.set_chat_model(None)
+
+def test_repeated_prompt_is_answered_from_cache(model):
+    first = cached_completion(TEMPLATE, INPUTS)
+    second = cached_completion(TEMPLATE, INPUTS)
+    assert first == second
+    assert "AAPL changed by 1.5%" in first
+    assert model.calls == 1
+
+def test_whitespace_differences_share_an_entry(model):
+    cached_completion(TEMPLATE, INPUTS)
+    spaced = {"data_summary": "  Symbol: AAPL\n\n  Change: 1.5%  ", "query": "How   did it\tdo?"}
+    cached_completion(TEMPLATE, spaced)
+    assert prompt_key(TEMPLATE, spaced) == prompt_key(TEMPLATE, INPUTS)
+    assert model.calls == 1
+
+def test_other_inputs_or_model_settings_are_answered_again(model, monkeypatch):
+    cached_completion(TEMPLATE, INPUTS)
+    cached_completion(TEMPLATE, {**INPUTS, "query": "And tomorrow?"})
+    assert model.calls == 2
+    monkeypatch.setattr(llm, "LLM_TEMPERATURE", 0.0)
+    cached_completion(TEMPLATE, INPUTS)
+    monkeypatch.setattr(llm, "LLM_MODEL", "another-model")
+    cached_completion(TEMPLATE, INPUTS)
+    assert model.calls == 4
+
+def test_entries_expire_after_the_ttl(model, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_CACHE_TTL_SECONDS", 0.05)
+    cached_completion(TEMPLATE, INPUTS)
+    time.sleep(0.1)
+    cached_completion(TEMPLATE, INPUTS)
+    assert model.calls == 2
+
+def test_responses_persist_in_the_bar_store(model, mongo, monkeypatch):
+    cached_completion(TEMPLATE, INPUTS)
+    # Another process starts with an empty memory cache
+    llm.llm_cache.clear()
+    cached_completion(TEMPLATE, INPUTS)
+    assert model.calls == 1
+
+    # Expired documents are ignored even before the TTL monitor removes them
+    monkeypatch.setattr(llm, "LLM_CACHE_TTL_SECONDS", -1)
+    llm.llm_cache.clear()
+    cached_completion(TEMPLATE, {**INPUTS, "query": "Expired"})
+    llm.llm_cache.clear()
+    cached_completion(TEMPLATE, {**INPUTS, "query": "Expired"})
+    assert model.calls == 3
+
+def test_concurrent_identical_prompts_make_one_model_call(model):
+    model.latency = 0.2
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        answers = list(pool.map(lambda _: cached_completion(TEMPLATE, INPUTS), range(16)))
+    assert len(set(answers)) == 1
+    assert model.calls == 1
+    stats = llm.llm_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] + stats["hits"] == 15
+
+def test_concurrent_identical_streams_make_one_model_call(model):
+    model.token_delay = 0.01
+
+    async def run():
+        first = asyncio.create_task(collect())
+        # Streams joining late replay the tokens produced so far
+        await asyncio.sleep(0.03)
+        rest = await asyncio.gather(*[collect() for _ in range(7)])
+        return [await first, *rest]
+
+    answers = asyncio.run(run())
+    assert len(set(answers)) == 1
+    assert model.calls == 1
+    assert cached_completion(TEMPLATE, INPUTS) == answers[0]
+    assert model.calls == 1
+
+def test_disconnecting_stream_does_not_cut_the_others_short(model):
+    model.token_delay = 0.01
+
+    async def run():
+        stream = stream_completion(TEMPLATE, INPUTS)
+        await stream.__anext__()
+        follower = asyncio.create_task(collect())
+        await stream.aclose()
+        return await follower
+
+    assert asyncio.run(run()) == cached_completion(TEMPLATE, INPUTS)
+    assert model.calls == 1
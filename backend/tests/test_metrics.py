@@ -0,0 +1,44 @@
+import time
+import pytest
+from app.utils import hypothesis_testing, visualization
+from app.utils.metrics import stage_seconds
+
+LOAD_SECONDS = 0.2
+
+def stage_total(stage):
+    series = stage_seconds._values.get((stage,))
+    return (sum(series[0]), series[1]) if series is not None else (0, 0.0)
+
+@pytest.fixture
+def slow_loads(monkeypatch):
+    """Make loading stock data take LOAD_SECONDS"""
+    def slowed(load):
+        def wrapper(*args, **kwargs):
+            time.sleep(LOAD_SECONDS)
+            return load(*args, **kwargs)
+        return wrapper
+
+    for module in (visualization, hypothesis_testing):
+        monkeypatch.setattr(module, "get_stock_data_many", slowed(module.get_stock_data_many))
+
+@pytest.mark.parametrize("chart_type", visualization.CHART_TYPES)
+def test_charts_stage_excludes_loading(slow_loads, chart_type):
+    count, total = stage_total("charts")
+    result = visualization.generate_chart_data(["AAPL", "MSFT"], chart_type, indicators=["sma"])
+    assert "error" not in result
+    after_count, after_total = stage_total("charts")
+    assert after_count == count + 1
+    assert after_total - total < LOAD_SECONDS
+
+@pytest.mark.parametrize("run", [
+    lambda: hypothesis_testing.run_hypothesis_test(["AAPL", "MSFT"], "correlation"),
+    lambda: hypothesis_testing.run_pairwise_tests(["AAPL", "MSFT", "GOOGL"], "correlation"),
+    lambda: hypothesis_testing.run_resampling_test(["AAPL", "MSFT"], "correlation", n_resamples=200, seed=1),
+])
+def test_tests_stage_excludes_loading(slow_loads, run):
+    count, total = stage_total("tests")
+    result = run()
+    assert "error" not in result
+    after_count, after_total = stage_total("tests")
+    assert after_count == count + 1
+    assert after_total - total < LOAD_SECONDS
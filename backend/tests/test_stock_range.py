@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from app.utils import data_collector
+from app.utils.data_collector import get_stock_range, iter_range, stock_data_cache
+
+START = pd.Timestamp("2024-01-01", tz="UTC")
+END = pd.Timestamp("2024-07-01", tz="UTC")
+
+@pytest.fixture(params=["memory", "mongo"])
+def store(request):
+    """Read ranges with and without the bar store"""
+    if request.param == "mongo":
+        request.getfixturevalue("mongo")
+    return request.param
+
+def test_after_and_limit_select_a_slice(store):
+    full = get_stock_range("SYN", "1d", START, END)
+    assert full.index[0] >= START and full.index[-1] < END
+    page = get_stock_range("SYN", "1d", START, END, after=full.index[9], limit=5)
+    pd.testing.assert_index_equal(page.index, full.index[10:15])
+    pd.testing.assert_series_equal(page["Close"], full["Close"].iloc[10:15])
+
+def test_cursor_pages_add_up_to_the_range(client, store):
+    payload = {"symbol": "SYN", "interval": "1d", "start": START.isoformat(), "end": END.isoformat(),
+               "format": "columnar"}
+    whole = client.post("/api/stocks/data", json=payload).json()["data"]
+
+    dates, cursor, pages = [], None, 0
+    while True:
+        page = client.post("/api/stocks/data", json={**payload, "limit": 30, "cursor": cursor}).json()
+        assert len(page["data"]["Date"]) <= 30
+        dates.extend(page["data"]["Date"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert dates == whole["Date"]
+    assert pages == -(-len(whole["Date"]) // 30)
+
+def test_cursor_of_another_symbol_is_rejected(client):
+    payload = {"symbol": "SYN", "interval": "1d", "start": START.isoformat(), "end": END.isoformat(), "limit": 10}
+    cursor = client.post("/api/stocks/data", json=payload).json()["next_cursor"]
+    response = client.post("/api/stocks/data", json={**payload, "symbol": "OTHER", "cursor": cursor})
+    assert response.status_code == 400
+
+def test_chunks_older_than_the_provider_keeps_are_skipped(monkeypatch):
+    loaded = []
+
+    def load_chunk(symbol, interval, start, end):
+        loaded.append((start, end))
+        return pd.DataFrame()
+
+    monkeypatch.setattr(data_collector, "_load_chunk", load_chunk)
+    now = pd.Timestamp.now(tz="UTC")
+    assert list(iter_range("SYN", "1m", now - pd.Timedelta(days=365), now)) == []
+    earliest = data_collector.earliest_start("1m")
+    assert loaded and all(end > earliest for _, end in loaded)
+    # A year of 1m chunks would be 53 entries; only the last 29 days are asked for
+    assert stock_data_cache.stats()["entries"] == len(loaded) <= 6
@@ -38,6 +38,7 @@ def main():
         2. Use "Technical Analysis" to calculate indicators
         3. Visualize data on the "Visualization" page
         4. Check hypotheses on the "Hypothesis Testing" page
+        5. Ask questions about stocks in plain language on the "NLP Analysis" page
         """
     )
 
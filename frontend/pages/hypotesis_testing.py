@@ -10,7 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.app_client import (
     get_available_stocks,
     run_hypothesis_test,
-    get_stock_data,  
+    get_stock_data,
+    run_parallel,
 )
 
 st.set_page_config(
@@ -80,9 +81,16 @@ with st.sidebar:
 if test_button:
     with st.spinner("Running statistical test..."):
         
-        test_result = run_hypothesis_test(
-            selected_symbols, test_type, selected_period, alpha
-        )
+        if test_type == "normality":
+            # The distribution chart needs the prices, so fetch them alongside the test
+            test_result, data = run_parallel(
+                (run_hypothesis_test, selected_symbols, test_type, selected_period, alpha),
+                (get_stock_data, selected_symbols[0], selected_period, "1d"),
+            )
+        else:
+            test_result = run_hypothesis_test(
+                selected_symbols, test_type, selected_period, alpha
+            )
 
     if test_result and "error" not in test_result:
         st.subheader("Test results")
@@ -109,46 +117,42 @@ if test_button:
 
             
             st.subheader("Distribution visualization")
-            with st.spinner("Loading data for chart..."):
-                data = get_stock_data(
-                    selected_symbols[0], selected_period, "1d"
-                )
-                if data:
-                    df = pd.DataFrame(data["data"])
-                    df["Returns"] = df["Close"].pct_change().dropna()
-                    returns = df["Returns"].fillna(0)
+            if data:
+                df = pd.DataFrame(data["data"])
+                df["Returns"] = df["Close"].pct_change().dropna()
+                returns = df["Returns"].fillna(0)
 
-                    
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.hist(
-                        returns,
-                        bins=50,
-                        density=True,
-                        alpha=0.6,
-                        color="g",
-                        label="Return histogram",
-                    )
+                
+                fig, ax = plt.subplots(figsize=(10, 6))
+                ax.hist(
+                    returns,
+                    bins=50,
+                    density=True,
+                    alpha=0.6,
+                    color="g",
+                    label="Return histogram",
+                )
 
-                    
-                    mu, std = stats.norm.fit(returns)
-                    xmin, xmax = plt.xlim()
-                    x = np.linspace(xmin, xmax, 100)
-                    p = stats.norm.pdf(x, mu, std)
-                    ax.plot(
-                        x,
-                        p,
-                        "k",
-                        linewidth=2,
-                        label="Normal distribution",
-                    )
+                
+                mu, std = stats.norm.fit(returns)
+                xmin, xmax = plt.xlim()
+                x = np.linspace(xmin, xmax, 100)
+                p = stats.norm.pdf(x, mu, std)
+                ax.plot(
+                    x,
+                    p,
+                    "k",
+                    linewidth=2,
+                    label="Normal distribution",
+                )
 
-                    ax.set_title(
-                        f"Return distribution {selected_symbols[0]}"
-                    )
-                    ax.set_xlabel("Daily return")
-                    ax.set_ylabel("Density")
-                    ax.legend()
-                    st.pyplot(fig)
+                ax.set_title(
+                    f"Return distribution {selected_symbols[0]}"
+                )
+                ax.set_xlabel("Daily return")
+                ax.set_ylabel("Density")
+                ax.legend()
+                st.pyplot(fig)
 
             
             st.info(
@@ -0,0 +1,57 @@
+import streamlit as st
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.app_client import get_available_stocks, stream_nlp_analysis
+
+st.set_page_config(page_title="NLP Analysis", page_icon="💬", layout="wide")
+st.title("💬 NLP Analysis")
+
+with st.sidebar:
+    st.header("Parameters")
+    available_stocks = get_available_stocks()
+    stock_options = {f"{stock['symbol']} - {stock['name']}": stock['symbol'] for stock in available_stocks}
+    selected_stocks_display = st.multiselect(
+        "Select stocks",
+        options=list(stock_options.keys()),
+        default=list(stock_options.keys())[:2]
+    )
+    selected_stocks = [stock_options[display] for display in selected_stocks_display]
+    period_options = {
+        "1 month": "1mo",
+        "3 months": "3mo",
+        "6 months": "6mo",
+        "1 year": "1y",
+        "2 years": "2y",
+        "5 years": "5y"
+    }
+    selected_period_display = st.selectbox(
+        "Select period",
+        options=list(period_options.keys()),
+        index=3
+    )
+    selected_period = period_options[selected_period_display]
+
+query = st.text_area(
+    "Your question",
+    value="Compare the performance of these stocks and highlight the main risks."
+)
+analyze = st.button("Analyze")
+
+if analyze:
+    if not selected_stocks:
+        st.warning("Select at least one stock.")
+    elif not query.strip():
+        st.warning("Enter a question.")
+    else:
+        st.subheader("Analysis")
+        # Tokens are rendered as the model produces them
+        st.session_state['nlp_analysis'] = st.write_stream(
+            stream_nlp_analysis(query, selected_stocks, selected_period)
+        )
+elif 'nlp_analysis' in st.session_state:
+    st.subheader("Analysis")
+    st.markdown(st.session_state['nlp_analysis'])
+else:
+    st.info("Select stocks, enter a question and click 'Analyze'.")
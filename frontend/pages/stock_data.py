@@ -3,13 +3,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import FuncFormatter
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
 from io import BytesIO
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.app_client import get_available_stocks, get_stock_data
+from utils.app_client import get_available_stocks, get_stock_data, refresh_stock_data
 
 st.set_page_config(page_title="Stock Data", page_icon="📊", layout="wide")
 st.title("📊 Stock Data")
@@ -79,12 +79,19 @@ with st.sidebar:
     )
     selected_period = period_options[selected_period_display]
 
+    use_date_range = st.checkbox("Custom date range")
+    start_date, end_date = None, None
+    if use_date_range:
+        start_date = st.date_input("Start date", value=datetime.now().date() - timedelta(days=30))
+        end_date = st.date_input("End date", value=datetime.now().date())
+        selected_period_display = f"{start_date} - {end_date}"
+
     interval_options = {
         "1 day": "1d",
         "1 week": "1wk",
         "1 month": "1mo"
     }
-    if selected_period in ["1d", "5d", "1mo"]:
+    if selected_period in ["1d", "5d", "1mo"] or use_date_range:
         interval_options.update({
             "1 minute": "1m",
             "5 minutes": "5m",
@@ -105,9 +112,22 @@ with st.sidebar:
 if fetch_data or 'stock_data' in st.session_state:
     with st.spinner("Loading data..."):
         if fetch_data or 'stock_data' not in st.session_state:
-            stock_data = get_stock_data(selected_stock, selected_period, selected_interval)
+            request_key = (selected_stock, selected_period, selected_interval, start_date, end_date)
+            previous = st.session_state.get('stock_data')
+            if previous and previous.get('version') and st.session_state.get('stock_data_key') == request_key:
+                # Same request as last time: only fetch the bars added since
+                stock_data = refresh_stock_data(previous, selected_stock, selected_period, selected_interval)
+            else:
+                stock_data = get_stock_data(
+                    selected_stock,
+                    selected_period,
+                    selected_interval,
+                    start_date,
+                    end_date + timedelta(days=1) if end_date else None
+                )
             if stock_data:
                 st.session_state['stock_data'] = stock_data
+                st.session_state['stock_data_key'] = request_key
         else:
             stock_data = st.session_state['stock_data']
 
@@ -133,6 +153,8 @@ if fetch_data or 'stock_data' in st.session_state:
         df_plot = df.copy()
         df_plot.set_index('Date', inplace=True)
         st.subheader(f"Price chart {stock_data['symbol']}")
+        if stock_data.get('bars_per_row', 1) > 1:
+            st.caption(f"Long range: every bar merges {stock_data['bars_per_row']} bars of the selected interval.")
         fig_candle = plot_candlestick(df_plot, f"{stock_data['symbol']} - {selected_period_display}")
         st.pyplot(fig_candle)
         st.subheader(f"Trading volume {stock_data['symbol']}")
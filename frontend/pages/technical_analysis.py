@@ -7,8 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.app_client import (
     get_available_stocks,
-    get_stock_data,
-    get_technical_analysis,
+    get_chart_bundle,
 )
 
 st.set_page_config(
@@ -122,16 +121,14 @@ with st.sidebar:
 
 if analyze_button:
     with st.spinner("Выполнение технического анализа..."):
-        stock_data = get_stock_data(selected_stock, selected_period, "1d")
-        tech_analysis = get_technical_analysis(
+        chart_bundle = get_chart_bundle(
             selected_stock, selected_period, "1d", selected_indicators
         )
 
-    if stock_data and tech_analysis:
-        df = pd.DataFrame(stock_data["data"])
-        df["Date"] = pd.to_datetime(df["Date"])
+    if chart_bundle:
+        df = pd.DataFrame(chart_bundle["data"])
         df.set_index("Date", inplace=True)
-        indicators = tech_analysis["indicators"]
+        indicators = chart_bundle["indicators"]
 
         num_subplots = 1 + use_rsi + use_macd
         height_ratios = [0.6] + [0.2] * (num_subplots - 1)
@@ -6,7 +6,11 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.app_client import get_available_stocks, get_visualization_data
+from utils.app_client import (
+    correlation_frame,
+    get_available_stocks,
+    get_visualization_data,
+)
 
 st.set_page_config(
     page_title="Visualization", page_icon="📊", layout="wide"
@@ -24,11 +28,12 @@ with st.sidebar:
     }
     chart_type = st.selectbox(
         "Chart type",
-        options=["price", "returns", "correlation"],
+        options=["price", "returns", "correlation", "rolling"],
         format_func=lambda x: {
             "price": "Price chart",
             "returns": "Return chart",
             "correlation": "Correlation matrix",
+            "rolling": "Rolling statistics",
         }.get(x, x),
     )
     selected_symbols = st.multiselect(
@@ -42,12 +47,28 @@ with st.sidebar:
         "Select period", options=list(period_options.keys()), index=0
     )
     selected_period = period_options[selected_period_display]
+    cluster_order = chart_type == "correlation" and st.checkbox(
+        "Group correlated stocks", value=len(selected_symbols) > 10
+    )
+    benchmark = "SPY"
+    rolling_windows = None
+    if chart_type == "rolling":
+        benchmark = st.text_input("Benchmark", value="SPY").strip().upper()
+        rolling_windows = st.multiselect(
+            "Rolling windows (days)", options=[20, 60, 120, 250], default=[20, 60]
+        )
     visualize_button = st.button("Create visualization")
 
 if visualize_button and selected_symbols:
     with st.spinner("Creating visualization..."):
         visualization_data = get_visualization_data(
-            selected_symbols, chart_type, selected_period, "1d"
+            selected_symbols,
+            chart_type,
+            selected_period,
+            "1d",
+            order="cluster" if cluster_order else "input",
+            benchmark=benchmark,
+            rolling_windows=rolling_windows,
         )
 
     if visualization_data and "error" not in visualization_data:
@@ -122,21 +143,18 @@ if visualize_button and selected_symbols:
             if len(selected_symbols) < 2:
                 st.warning("Select at least two stocks.")
             else:
-                corr_matrix = pd.DataFrame(
-                    index=selected_symbols, columns=selected_symbols
-                )
-                for item in visualization_data["data"]:
-                    corr_matrix.loc[item["x"], item["y"]] = item["value"]
-                corr_matrix = corr_matrix.astype(float)
+                corr_matrix = correlation_frame(visualization_data["data"])
+                matrix_symbols = list(corr_matrix.index)
+                size = max(6, 0.3 * len(matrix_symbols))
 
-                fig, ax = plt.subplots(figsize=(8, 6))
+                fig, ax = plt.subplots(figsize=(size + 2, size))
                 im = ax.imshow(corr_matrix, cmap="coolwarm", vmin=-1, vmax=1)
 
                 fig.colorbar(im, ax=ax)
-                ax.set_xticks(np.arange(len(selected_symbols)))
-                ax.set_yticks(np.arange(len(selected_symbols)))
-                ax.set_xticklabels(selected_symbols)
-                ax.set_yticklabels(selected_symbols)
+                ax.set_xticks(np.arange(len(matrix_symbols)))
+                ax.set_yticks(np.arange(len(matrix_symbols)))
+                ax.set_xticklabels(matrix_symbols)
+                ax.set_yticklabels(matrix_symbols)
                 plt.setp(
                     ax.get_xticklabels(),
                     rotation=45,
@@ -144,20 +162,58 @@ if visualize_button and selected_symbols:
                     rotation_mode="anchor",
                 )
 
-                for i in range(len(selected_symbols)):
-                    for j in range(len(selected_symbols)):
-                        ax.text(
-                            j,
-                            i,
-                            f"{corr_matrix.iloc[i, j]:.2f}",
-                            ha="center",
-                            va="center",
-                            color="w",
-                        )
+                # Cell labels become unreadable on large matrices
+                if len(matrix_symbols) <= 15:
+                    for i in range(len(matrix_symbols)):
+                        for j in range(len(matrix_symbols)):
+                            ax.text(
+                                j,
+                                i,
+                                f"{corr_matrix.iloc[i, j]:.2f}",
+                                ha="center",
+                                va="center",
+                                color="w",
+                            )
 
                 ax.set_title("Return correlation matrix")
                 plt.tight_layout()
                 st.pyplot(fig)
+        elif chart_type == "rolling":
+            st.subheader(f"Rolling statistics against {visualization_data['benchmark']}")
+            panels = [
+                ("volatility", "Annualized volatility"),
+                ("sharpe", "Annualized Sharpe ratio"),
+                ("correlation", "Correlation"),
+                ("beta", "Beta"),
+            ]
+            fig, axes = plt.subplots(
+                len(panels) + 1, 1, figsize=(12, 14), sharex=True
+            )
+            fig.suptitle(
+                f"Rolling statistics - {selected_period_display}", fontsize=16
+            )
+
+            for stock_data in visualization_data["data"]:
+                symbol = stock_data["symbol"]
+                dates = pd.to_datetime(stock_data["dates"])
+                for ax, (name, title) in zip(axes, panels):
+                    for k, window in enumerate(visualization_data["windows"]):
+                        ax.plot(
+                            dates,
+                            pd.to_numeric(stock_data["rolling"][f"{name}_{window}"]),
+                            label=f"{symbol} ({window}d)",
+                            linestyle=["-", "--", ":", "-."][k % 4],
+                        )
+                    ax.set_title(title)
+                axes[-1].plot(dates, pd.to_numeric(stock_data["drawdown"]), label=symbol)
+
+            axes[-1].set_title("Drawdown")
+            for ax in axes:
+                ax.legend(loc="upper left", fontsize="small")
+                ax.grid(True)
+            plt.xlabel("Date")
+            plt.tight_layout(rect=[0, 0, 1, 0.97])
+            st.pyplot(fig)
     else:
         st.error("Не удалось получить данные для визуализации.")
 else:
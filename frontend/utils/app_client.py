@@ -1,44 +1,333 @@
 import requests
 import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+REQUEST_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT_SECONDS", "20"))
+CACHE_TTL_SECONDS = int(os.getenv("FRONTEND_CACHE_TTL_SECONDS", "60"))
+STOCK_LIST_TTL_SECONDS = 3600
+POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "16"))
+# Responses kept for revalidation with If-None-Match
+VALIDATED_RESPONSES = int(os.getenv("FRONTEND_ETAG_ENTRIES", "128"))
+# Points per series the charts need; longer histories are thinned by the backend
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+# Bars per page when reading a date range
+PAGE_SIZE = int(os.getenv("BACKEND_PAGE_SIZE", "5000"))
+# Rows held for a date range; longer ranges are merged into coarser bars as pages arrive
+RANGE_MAX_BARS = int(os.getenv("FRONTEND_RANGE_MAX_BARS", "20000"))
+# How merged bars combine their columns; other columns keep the last value
+BAR_AGGREGATIONS = {
+    "Date": "first", "Open": "first", "High": "max", "Low": "min", "Close": "last",
+    "Volume": "sum", "Dividends": "sum", "Stock Splits": "max", "_bars": "sum"
+}
+# Heavy analyses run as backend jobs, polled until they finish or this many seconds pass
+JOB_TIMEOUT = float(os.getenv("FRONTEND_JOB_TIMEOUT_SECONDS", "600"))
+# Each poll waits on the backend for at most this long, well within REQUEST_TIMEOUT
+JOB_POLL_SECONDS = min(10.0, REQUEST_TIMEOUT / 2)
+
+# Response format of bar data. Columnar JSON is the smallest over the wire; msgpack is about 30%
+# larger and decodes barely faster (benchmarks/serialization.py), so it is only used when asked for
+DATA_FORMAT = os.getenv("BACKEND_DATA_FORMAT", "columnar")
+if DATA_FORMAT not in ("columnar", "msgpack") or (DATA_FORMAT == "msgpack" and msgpack is None):
+    DATA_FORMAT = "columnar"
+
+class BackendError(Exception):
+    """A non-200 response from the backend"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Backend returned {status_code}")
+        self.status_code = status_code
+
+class JobError(Exception):
+    """A backend job that failed or did not finish in time"""
+
+@st.cache_resource
+def _session():
+    """Get a keep-alive session shared by every script run"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class _ValidatedResponses:
+    """Bodies of earlier responses with their ETags, reused within max-age and revalidated after"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, max_age, content_type, content):
+        with self._lock:
+            self._entries[key] = {
+                "etag": etag,
+                "expires_at": time.monotonic() + max_age,
+                "content_type": content_type,
+                "content": content
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def _validated_responses():
+    """Get the response store shared by every script run"""
+    return _ValidatedResponses(VALIDATED_RESPONSES)
+
+def _max_age(headers):
+    """Read the max-age of a Cache-Control header, or 0"""
+    match = re.search(r"max-age=(\d+)", headers.get("cache-control", ""))
+    return int(match.group(1)) if match else 0
+
+def _decode(content_type, content):
+    """Decode a columnar JSON or MessagePack response body"""
+    if content_type.startswith("application/msgpack"):
+        return msgpack.unpackb(content)
+    return json.loads(content)
+
+def _request(method, path, payload=None):
+    """Call the backend and decode the response, raising BackendError on failure.
+
+    Responses with an ETag are reused while their max-age lasts and then revalidated, so an
+    unchanged response costs a 304 without a body.
+    """
+    store = _validated_responses()
+    key = (method, path, json.dumps(payload, sort_keys=True, default=str))
+    entry = store.get(key)
+    if entry is not None and entry["expires_at"] > time.monotonic():
+        return _decode(entry["content_type"], entry["content"])
+    response = _session().request(
+        method,
+        f"{BACKEND_URL}{path}",
+        json=payload,
+        headers={"If-None-Match": entry["etag"]} if entry is not None else None,
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code == 304 and entry is not None:
+        store.put(key, entry["etag"], _max_age(response.headers), entry["content_type"], entry["content"])
+        return _decode(entry["content_type"], entry["content"])
+    # 202 Accepted answers a job submission
+    if response.status_code not in (200, 202):
+        raise BackendError(response.status_code)
+    content_type = response.headers.get("content-type", "")
+    if "etag" in response.headers:
+        store.put(key, response.headers["etag"], _max_age(response.headers), content_type, response.content)
+    return _decode(content_type, response.content)
+
+# Errors are raised rather than returned, so failed calls are never memoized
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=256)
+def _cached_request(method, path, payload=None):
+    return _request(method, path, payload)
+
+def _run_job(kind, payload):
+    """Submit a backend job and poll it until it finishes, raising JobError when it fails"""
+    job = _request("POST", f"/api/jobs/{kind}", payload)
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while job["status"] in ("queued", "running"):
+        if time.monotonic() >= deadline:
+            raise JobError(f"Job {job['job_id']} did not finish within {JOB_TIMEOUT:g} seconds")
+        job = _request("GET", f"/api/jobs/{job['job_id']}?wait={JOB_POLL_SECONDS:g}")
+    if job["status"] == "failed":
+        raise JobError(job["error"])
+    return job["result"]
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=256)
+def _cached_job(kind, payload):
+    return _run_job(kind, payload)
+
+@st.cache_data(ttl=STOCK_LIST_TTL_SECONDS, show_spinner=False)
+def _cached_stock_list():
+    return _request("GET", "/api/stocks/available")
+
+def run_parallel(*calls):
+    """Run several client calls concurrently and return their results in order.
+
+    Each call is a (function, arg, ...) tuple, e.g. run_parallel((get_stock_data, "AAPL"), ...).
+    """
+    ctx = get_script_run_ctx()
+
+    def attach():
+        # Lets worker threads use st.error and the data cache of this script run
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=len(calls), initializer=attach) as pool:
+        futures = [pool.submit(call[0], *call[1:]) for call in calls]
+        return [future.result() for future in futures]
+
+def _local_dates(epoch_ms, timezone):
+    """Convert epoch milliseconds to naive datetimes in the exchange time zone"""
+    dates = pd.to_datetime(epoch_ms, unit="ms", utc=True)
+    if timezone:
+        dates = dates.tz_convert(timezone)
+    return dates.tz_localize(None)
+
+def correlation_frame(matrix_data):
+    """Rebuild a correlation matrix from its symbol list and flat or upper-triangular values"""
+    symbols = matrix_data["symbols"]
+    n = len(symbols)
+    values = np.array(matrix_data["values"], dtype=float)
+    if matrix_data.get("layout") == "upper":
+        matrix = np.empty((n, n))
+        upper = np.triu_indices(n)
+        matrix[upper] = values
+        matrix.T[upper] = values
+    else:
+        matrix = values.reshape(n, n)
+    return pd.DataFrame(matrix, index=symbols, columns=symbols)
 
 def get_available_stocks():
     """Get the list of available stocks"""
     try:
-        response = requests.get(f"{BACKEND_URL}/api/stocks/available", timeout=20)
-        if response.status_code == 200:
-            return response.json()["stocks"]
-        else:
-            st.error(f"Error retrieving stock list: {response.status_code}")
-            return []
+        return _cached_stock_list()["stocks"]
+    except BackendError as e:
+        st.error(f"Error retrieving stock list: {e.status_code}")
+        return []
     except Exception as e:
         st.error(f"API connection error: {e}")
         return []
 
-def get_stock_data(symbol, period="1y", interval="1d"):
-    """Get stock data"""
+def iter_stock_pages(symbol, interval="1d", start=None, end=None, page_size=PAGE_SIZE, request=_request):
+    """Yield the pages of a date range in order, following the backend's cursors.
+
+    Each page holds at most page_size bars, so a long history can be processed page by page
+    without holding it in memory.
+    """
+    cursor = None
+    while True:
+        payload = {
+            "symbol": symbol,
+            "interval": interval,
+            "start": start.isoformat() if start is not None else None,
+            "end": end.isoformat() if end is not None else None,
+            "limit": page_size,
+            "cursor": cursor,
+            "format": DATA_FORMAT
+        }
+        page = request("POST", "/api/stocks/data", payload)
+        page["data"]["Date"] = _local_dates(page["data"]["Date"], page.get("timezone"))
+        yield page
+        cursor = page.get("next_cursor")
+        if cursor is None:
+            return
+
+def _merge_bars(bars, factor):
+    """Merge bars into groups of factor consecutive bars, counted from the first bar of the range"""
+    # Rows already merged at a smaller factor stay aligned, as factors are powers of two
+    first = bars["_bars"].cumsum() - bars["_bars"]
+    aggregations = {column: BAR_AGGREGATIONS.get(column, "last") for column in bars.columns}
+    return bars.groupby((first // factor).to_numpy(), sort=False).agg(aggregations).reset_index(drop=True)
+
+def read_stock_range(symbol, interval="1d", start=None, end=None, max_bars=RANGE_MAX_BARS, request=_request):
+    """Read a date range page by page, holding at most max_bars rows.
+
+    Longer ranges are merged into coarser OHLCV bars as the pages arrive, so memory stays bounded
+    however long the range is. bars_per_row tells how many bars every row merges.
+    """
+    stock_data, held, factor = None, None, 1
+    for page in iter_stock_pages(symbol, interval, start, end, request=request):
+        bars = pd.DataFrame(page.pop("data"))
+        bars["_bars"] = 1
+        if stock_data is None:
+            stock_data = page
+        held = bars if held is None else pd.concat([held, bars], ignore_index=True)
+        if factor > 1:
+            held = _merge_bars(held, factor)
+        while len(held) > max_bars:
+            factor *= 2
+            held = _merge_bars(held, factor)
+    held = held.drop(columns="_bars")
+    stock_data["data"] = {column: held[column].to_numpy() for column in held.columns}
+    stock_data["data"]["Date"] = pd.DatetimeIndex(held["Date"])
+    stock_data["bars_per_row"] = factor
+    return stock_data
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=32)
+def _cached_stock_range(symbol, interval, start, end):
+    # Only the bounded result is cached, not the pages it was read from
+    return read_stock_range(symbol, interval, start, end)
+
+def get_stock_data(symbol, period="1y", interval="1d", start=None, end=None):
+    """Get stock data for a period, or for a date range when start or end is given"""
     try:
+        if start is not None or end is not None:
+            return _cached_stock_range(symbol, interval, start, end)
         payload = {
             "symbol": symbol,
             "period": period,
-            "interval": interval
+            "interval": interval,
+            "format": DATA_FORMAT
         }
-        response = requests.post(
-            f"{BACKEND_URL}/api/stocks/data",
-            json=payload,
-            timeout=20
+        stock_data = _cached_request("POST", "/api/stocks/data", payload)
+        stock_data["data"]["Date"] = _local_dates(
+            stock_data["data"]["Date"], stock_data.get("timezone")
         )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error retrieving stock data: {response.status_code}")
-            return None
+        return stock_data
+    except BackendError as e:
+        st.error(f"Error retrieving stock data: {e.status_code}")
+        return None
     except Exception as e:
         st.error(f"API connection error: {e}")
         return None
 
+def refresh_stock_data(stock_data, symbol, period="1y", interval="1d"):
+    """Bring stock data from get_stock_data up to date, downloading only the bars it is missing.
+
+    The backend answers with the new bars, the last bar again if it was revised, or the whole
+    period when older bars were corrected.
+    """
+    try:
+        dates = stock_data["data"]["Date"]
+        payload = {
+            "symbol": symbol,
+            "period": period,
+            "interval": interval,
+            "since": dates[-1].isoformat(),
+            "version": stock_data["version"],
+            "format": DATA_FORMAT
+        }
+        # Not memoized: polling must see new bars
+        delta = _request("POST", "/api/stocks/data", payload)
+        new_dates = _local_dates(delta["data"]["Date"], delta.get("timezone"))
+        data = {"Date": new_dates}
+        if delta["reset"]:
+            data.update({column: values for column, values in delta["data"].items() if column != "Date"})
+        else:
+            kept = dates.searchsorted(new_dates[0]) if len(new_dates) else len(dates)
+            data["Date"] = dates[:kept].append(new_dates)
+            for column, values in stock_data["data"].items():
+                if column != "Date":
+                    data[column] = list(values[:kept]) + list(delta["data"].get(column, []))
+        return {**stock_data, "data": data, "version": delta["version"]}
+    except BackendError as e:
+        st.error(f"Error retrieving stock data: {e.status_code}")
+        return stock_data
+    except Exception as e:
+        st.error(f"API connection error: {e}")
+        return stock_data
+
 def get_technical_analysis(symbol, period="1y", interval="1d", indicators=None):
     """Get technical analysis for a stock"""
     if indicators is None:
@@ -51,16 +340,37 @@ def get_technical_analysis(symbol, period="1y", interval="1d", indicators=None):
             "interval": interval,
             "indicators": indicators
         }
-        response = requests.post(
-            f"{BACKEND_URL}/api/stocks/technical-analysis",
-            json=payload,
-            timeout=20
+        return _cached_request("POST", "/api/stocks/technical-analysis", payload)
+    except BackendError as e:
+        st.error(f"Error retrieving technical analysis: {e.status_code}")
+        return None
+    except Exception as e:
+        st.error(f"API connection error: {e}")
+        return None
+
+def get_chart_bundle(symbol, period="1y", interval="1d", indicators=None, include_info=False):
+    """Get price bars and technical indicators for a stock in one request"""
+    if indicators is None:
+        indicators = ["sma", "ema", "rsi", "macd"]
+
+    try:
+        payload = {
+            "symbol": symbol,
+            "period": period,
+            "interval": interval,
+            "indicators": indicators,
+            "include_info": include_info,
+            "max_points": CHART_MAX_POINTS,
+            "format": DATA_FORMAT
+        }
+        bundle = _cached_request("POST", "/api/stocks/chart-bundle", payload)
+        bundle["data"]["Date"] = _local_dates(
+            bundle["data"]["Date"], bundle.get("timezone")
         )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error retrieving technical analysis: {response.status_code}")
-            return None
+        return bundle
+    except BackendError as e:
+        st.error(f"Error retrieving chart data: {e.status_code}")
+        return None
     except Exception as e:
         st.error(f"API connection error: {e}")
         return None
@@ -73,20 +383,56 @@ def get_nlp_analysis(query, symbols, period="1y"):
             "symbols": symbols,
             "period": period
         }
-        response = requests.post(
-            f"{BACKEND_URL}/api/stocks/nlp-analysis",
-            json=payload,
-            timeout=20
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error retrieving NLP analysis: {response.status_code}")
-            return None
+        return _run_job("nlp-analysis", payload)
+    except BackendError as e:
+        st.error(f"Error retrieving NLP analysis: {e.status_code}")
+        return None
+    except JobError as e:
+        st.error(f"Error retrieving NLP analysis: {e}")
+        return None
     except Exception as e:
         st.error(f"API connection error: {e}")
         return None
 
+def _sse_events(response):
+    """Parse a Server-Sent Events response into (event, data) pairs as they arrive"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def stream_nlp_analysis(query, symbols, period="1y"):
+    """Stream the NLP analysis of stocks as text chunks, e.g. for st.write_stream"""
+    payload = {
+        "query": query,
+        "symbols": symbols,
+        "period": period
+    }
+    try:
+        with _session().request(
+            "POST",
+            f"{BACKEND_URL}/api/stocks/nlp-analysis/stream",
+            json=payload,
+            stream=True,
+            timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"Error retrieving NLP analysis: {response.status_code}")
+                return
+            for event, data in _sse_events(response):
+                if event == "token":
+                    yield data["text"]
+                elif event == "error":
+                    st.error(f"Error retrieving NLP analysis: {data['detail']}")
+    except Exception as e:
+        st.error(f"API connection error: {e}")
+
 def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
     """Run a hypothesis test"""
     try:
@@ -96,16 +442,13 @@ def run_hypothesis_test(symbols, test_type, period="1y", alpha=0.05):
             "period": period,
             "alpha": alpha
         }
-        response = requests.post(
-            f"{BACKEND_URL}/api/stocks/hypothesis-test",
-            json=payload,
-            timeout=20
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error running hypothesis test: {response.status_code}")
-            return None
+        return _cached_job("hypothesis-test", payload)
+    except BackendError as e:
+        st.error(f"Error running hypothesis test: {e.status_code}")
+        return None
+    except JobError as e:
+        st.error(f"Error running hypothesis test: {e}")
+        return None
     except Exception as e:
         st.error(f"API connection error: {e}")
         return None
@@ -115,7 +458,10 @@ def get_visualization_data(
     chart_type,
     period="1y",
     interval="1d",
-    indicators=None
+    indicators=None,
+    order="input",
+    benchmark="SPY",
+    rolling_windows=None
 ):
     """Get data for visualization"""
     try:
@@ -124,18 +470,28 @@ def get_visualization_data(
             "chart_type": chart_type,
             "period": period,
             "interval": interval,
-            "indicators": indicators
+            "indicators": indicators,
+            "matrix_layout": "upper",
+            "order": order,
+            "benchmark": benchmark,
+            "rolling_windows": rolling_windows,
+            "max_points": CHART_MAX_POINTS,
+            # Job results are JSON
+            "format": "columnar"
         }
-        response = requests.post(
-            f"{BACKEND_URL}/api/stocks/visualization",
-            json=payload,
-            timeout=20
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Error retrieving data for visualization: {response.status_code}")
-            return None
+        visualization_data = _cached_job("visualization", payload)
+        if isinstance(visualization_data.get("data"), dict):
+            return visualization_data
+        for item in visualization_data.get("data", []):
+            if "dates" in item:
+                item["dates"] = _local_dates(item["dates"], item.get("timezone"))
+        return visualization_data
+    except BackendError as e:
+        st.error(f"Error retrieving data for visualization: {e.status_code}")
+        return None
+    except JobError as e:
+        st.error(f"Error retrieving data for visualization: {e}")
+        return None
     except Exception as e:
         st.error(f"API connection error: {e}")
         return None